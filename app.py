@@ -1,12 +1,32 @@
 from __future__ import annotations
 
 import ast
+import bisect
+import functools
+import gzip
+import hashlib
+import itertools
+import math
+import queue
 import re
+import struct
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import NamedTuple
+from urllib.parse import urlsplit
 
+import numpy as np
 import requests
-from bs4 import BeautifulSoup
-from flask import Flask, jsonify, render_template, request  
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context
 import json
 import os
 from openai import OpenAI
@@ -16,13 +36,17 @@ import sqlite3
 
 app = Flask(__name__)
 
-DB_PATH = "candles.db"
+DB_PATH = os.environ.get("DB_PATH", "candles.db")
 PUSH_TOKEN = os.environ.get("PUSH_TOKEN")
 
 
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
+    # 워커 여러 개가 동시에 import 해도 안전하게: 스키마/마이그레이션 전체를 BEGIN IMMEDIATE 한 트랜잭션으로
+    # (먼저 잡은 워커가 끝낼 때까지 나머지는 busy timeout 안에서 기다렸다가 이미 된 상태를 확인만 함)
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")  # DB 파일에 영구 적용
     cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
     cur.execute("""
         CREATE TABLE IF NOT EXISTS candles (
             code TEXT NOT NULL,
@@ -33,10 +57,88 @@ def init_db():
             l REAL NOT NULL,
             c REAL NOT NULL,
             v REAL NOT NULL,
+            ts INTEGER,
             PRIMARY KEY (code, timeframe, t)
         )
     """)
-    
+
+    # ts(epoch 초) 컬럼 마이그레이션: 읽기 경로에서 행마다 ISO 파싱하지 않도록 저장 시점에 변환
+    cols = {r[1] for r in cur.execute("PRAGMA table_info(candles)")}
+    if "ts" not in cols:
+        cur.execute("ALTER TABLE candles ADD COLUMN ts INTEGER")
+    missing = cur.execute("SELECT rowid, t FROM candles WHERE ts IS NULL").fetchall()
+    if missing:
+        cur.executemany(
+            "UPDATE candles SET ts=? WHERE rowid=?",
+            [(int(datetime.fromisoformat(t).timestamp()), rowid) for rowid, t in missing],
+        )
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_candles_code_tf_ts
+        ON candles (code, timeframe, ts)
+    """)
+
+    # 1d/1w/1M 저장 범위(start)와 마지막 업스트림 동기화 시각
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS candle_sync (
+            code TEXT NOT NULL,
+            timeframe TEXT NOT NULL,
+            start TEXT NOT NULL,
+            synced_at INTEGER NOT NULL,
+            PRIMARY KEY (code, timeframe)
+        )
+    """)
+
+    # (code, timeframe)별 저장본 버전: 쓰기마다 +1, 캔들 응답 ETag 로 사용 (워커 여러 개가 같은 값을 봄)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS candle_versions (
+            code TEXT NOT NULL,
+            timeframe TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            PRIMARY KEY (code, timeframe)
+        ) WITHOUT ROWID
+    """)
+
+    # 캘린더: (date, id) PK가 날짜 범위 인덱스 역할, rowid = 입력 순서
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS calendar_events (
+            date TEXT NOT NULL,
+            id TEXT NOT NULL,
+            title TEXT NOT NULL,
+            time TEXT NOT NULL DEFAULT '',
+            note TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (date, id)
+        )
+    """)
+    # 쓰기마다 version 증가 → 워커별 읽기 캐시 무효화 기준
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS calendar_meta (
+            k TEXT PRIMARY KEY,
+            v INTEGER NOT NULL
+        )
+    """)
+    cur.execute("INSERT OR IGNORE INTO calendar_meta (k, v) VALUES ('version', 0)")
+
+    # 뉴스 히스토리: link_key(정규화 링크)로 dedup, seq가 cursor
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS news_articles (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            link_key TEXT NOT NULL UNIQUE,
+            title TEXT NOT NULL,
+            link TEXT NOT NULL,
+            press TEXT,
+            ts TEXT,
+            first_seen INTEGER NOT NULL
+        )
+    """)
+    # 업스트림 조건부 요청용 validator (워커 간 공유)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS upstream_validators (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT
+        )
+    """)
+
     cur.execute("""
         CREATE TABLE IF NOT EXISTS subscriptions (
             code TEXT PRIMARY KEY,
@@ -44,12 +146,370 @@ def init_db():
             updated_at TEXT NOT NULL
         )
     """)
+    # 종목별 최근 조회 시각 (수집기 우선순위)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS code_access (
+            code TEXT PRIMARY KEY,
+            last_access INTEGER NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+    """)
     
     conn.commit()
     conn.close()
 
-init_db()
+# ---------------------------------------------------------------------
+# Metrics (프로세스 메모리 counter/histogram → Prometheus text, /api/internal/metrics)
+# ---------------------------------------------------------------------
+# 관측 1회 = perf_counter 2번 + lock 1번 (~1µs) 이라 운영에서 켜 둔 채로 쓴다.
+# label 값은 route 패턴 / host / 파서 이름 / SQL 종류+테이블 처럼 개수가 고정된 것만.
+#
+# gunicorn 워커 여러 개 + collector 처럼 프로세스가 나뉘면 METRICS_DIR(공유 디렉터리)를 지정한다.
+# 각 프로세스가 METRICS_FLUSH_INTERVAL 마다 자기 값을 <host>-<pid>.json 으로 덮어쓰고, scrape 를 받은
+# 프로세스가 디렉터리 전체를 합산해 응답한다 (다른 프로세스 값은 최대 flush 주기만큼 늦음).
+# 종료한 프로세스 파일도 남겨 counter 가 줄지 않게 하고, gunicorn 시작 때 디렉터리를 비운다.
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "1"))
+METRICS_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRICS_LLM_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+_METRIC_LABEL_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n"})
+
+def _metric_labels(names: tuple, values: tuple, le: str | None = None) -> str:
+    pairs = [f'{k}="{str(v).translate(_METRIC_LABEL_ESCAPES)}"' for k, v in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _metric_value(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+class Counter:
+    def __init__(self, name: str, doc: str, labelnames: tuple = ()):
+        self.name, self.doc, self.labelnames = name, doc, labelnames
+        self._lock = threading.Lock()
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), n: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + n
+
+    def value(self, labels: tuple = ()) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            series = [[list(k), v] for k, v in self._values.items()]
+        return {"type": "counter", "doc": self.doc, "labelnames": list(self.labelnames), "series": series}
+
+    def merge(self, snap: dict) -> None:
+        with self._lock:
+            for k, v in snap["series"]:
+                k = tuple(k)
+                self._values[k] = self._values.get(k, 0) + v
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        out = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        out += [f"{self.name}{_metric_labels(self.labelnames, k)} {_metric_value(v)}" for k, v in values]
+        return out
+
+class Histogram:
+    """series마다 [bucket별 개수..., +Inf 개수, 합계] (구간 개수로 저장, 출력 때 누적)"""
+
+    def __init__(self, name: str, doc: str, labelnames: tuple = (), buckets: tuple = METRICS_LATENCY_BUCKETS):
+        self.name, self.doc, self.labelnames, self.buckets = name, doc, labelnames, buckets
+        self._lock = threading.Lock()
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)  # le 경계값은 그 bucket 에 포함
+        with self._lock:
+            s = self._series.get(labels)
+            if s is None:
+                s = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            s[i] += 1
+            s[-1] += value
+
+    def count(self, labels: tuple = ()) -> int:
+        with self._lock:
+            s = self._series.get(labels)
+            return sum(s[:-1]) if s else 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            series = [[list(k), list(v)] for k, v in self._series.items()]
+        return {"type": "histogram", "doc": self.doc, "labelnames": list(self.labelnames),
+                "buckets": list(self.buckets), "series": series}
+
+    def merge(self, snap: dict) -> None:
+        if tuple(snap["buckets"]) != self.buckets:
+            return  # 배포 중 bucket 정의가 다른 프로세스 → 합칠 수 없으니 제외
+        with self._lock:
+            for k, v in snap["series"]:
+                s = self._series.setdefault(tuple(k), [0] * len(v))
+                for i, n in enumerate(v):
+                    s[i] += n
+
+    def render(self) -> list[str]:
+        with self._lock:
+            series = sorted((k, list(v)) for k, v in self._series.items())
+        out = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        for labels, s in series:
+            acc = 0
+            for le, n in zip((*self.buckets, "+Inf"), s[:-1]):
+                acc += n
+                out.append(f"{self.name}_bucket{_metric_labels(self.labelnames, labels, le)} {acc}")
+            out.append(f"{self.name}_sum{_metric_labels(self.labelnames, labels)} {_metric_value(s[-1])}")
+            out.append(f"{self.name}_count{_metric_labels(self.labelnames, labels)} {acc}")
+        return out
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: list = []
+        self._flusher_pid: int | None = None
+
+    def counter(self, name: str, doc: str, labelnames: tuple = ()) -> Counter:
+        m = Counter(name, doc, labelnames)
+        self._metrics.append(m)
+        return m
+
+    def histogram(self, name: str, doc: str, labelnames: tuple = (), buckets: tuple = METRICS_LATENCY_BUCKETS) -> Histogram:
+        m = Histogram(name, doc, labelnames, buckets)
+        self._metrics.append(m)
+        return m
+
+    def collector(self, fn):
+        """fn() → 스크레이프 시점에 읽는 값 [Counter/Histogram 처럼 render() 가능한 객체, ...]"""
+        self._collectors.append(fn)
+        return fn
+
+    def _collect(self) -> list:
+        out = list(self._metrics)
+        for fn in self._collectors:
+            try:
+                out += fn()
+            except Exception:
+                pass  # 수집 실패한 항목만 빠짐
+        return out
+
+    def snapshot(self) -> dict:
+        return {m.name: m.snapshot() for m in self._collect()}
+
+    def write_snapshot(self, directory: str) -> None:
+        """이 프로세스 값을 directory/<host>-<pid>.json 으로 교체 (쓰는 도중 읽히지 않게 rename)"""
+        path = os.path.join(directory, f"{os.uname().nodename}-{os.getpid()}.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def start_flusher(self, directory: str = "", interval: float = 0) -> None:
+        """프로세스(워커)마다 한 번: 주기적으로 write_snapshot. directory 가 비어 있으면 아무것도 안 함"""
+        directory = directory or METRICS_DIR
+        if not directory or self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+        os.makedirs(directory, exist_ok=True)
+        interval = interval or METRICS_FLUSH_INTERVAL
+
+        def loop():
+            while True:
+                try:
+                    self.write_snapshot(directory)
+                except OSError:
+                    pass  # 다음 주기에 재시도
+                time.sleep(interval)
+
+        threading.Thread(target=loop, name="metrics-flush", daemon=True).start()
+
+    def merged(self, directory: str) -> list:
+        """directory 의 모든 프로세스 snapshot 을 합산한 Counter/Histogram 목록 (이름 순)"""
+        self.write_snapshot(directory)  # scrape 받은 프로세스 자신은 최신 값으로
+        out: dict[str, Counter | Histogram] = {}
+        for entry in os.scandir(directory):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                with open(entry.path, encoding="utf-8") as f:
+                    snap = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, m in snap.items():
+                agg = out.get(name)
+                if agg is None:
+                    if m["type"] == "histogram":
+                        agg = Histogram(name, m["doc"], tuple(m["labelnames"]), tuple(m["buckets"]))
+                    else:
+                        agg = Counter(name, m["doc"], tuple(m["labelnames"]))
+                    out[name] = agg
+                agg.merge(m)
+        return [out[name] for name in sorted(out)]
+
+    def render(self, directory: str = "") -> str:
+        directory = directory or METRICS_DIR
+        lines = []
+        for m in (self.merged(directory) if directory else self._collect()):
+            lines += m.render()
+        return "\n".join(lines) + "\n"
+
+def timed(hist: Histogram, *labels):
+    """함수 실행 시간을 hist 에 기록하는 데코레이터"""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                hist.observe(labels, time.perf_counter() - t0)
+        return wrapper
+    return deco
+
+metrics = MetricsRegistry()
+route_latency = metrics.histogram(
+    "http_request_duration_seconds", "Route latency until response headers.", ("route", "method"))
+route_requests = metrics.counter("http_requests_total", "Responses by route and status.", ("route", "method", "status"))
+upstream_latency = metrics.histogram(
+    "upstream_request_duration_seconds", "Upstream HTTP fetch duration incl. retries.", ("host",))
+upstream_requests = metrics.counter("upstream_requests_total", "Upstream HTTP fetches by final status.", ("host", "status"))
+upstream_bytes = metrics.counter("upstream_response_bytes_total", "Upstream response body bytes.", ("host",))
+parse_latency = metrics.histogram("parse_duration_seconds", "Upstream payload parse time.", ("parser",))
+sqlite_latency = metrics.histogram(
+    "sqlite_query_duration_seconds", "SQLite execute time incl. lock/busy waits.", ("op", "table"))
+sqlite_fetch_seconds = metrics.counter("sqlite_fetch_seconds_total", "SQLite time spent stepping rows in fetch*.", ("op", "table"))
+sqlite_rows = metrics.counter("sqlite_rows_total", "Rows fetched (SELECT) or changed (DML).", ("op", "table"))
+llm_latency = metrics.histogram("llm_request_duration_seconds", "LLM call duration.", ("model", "outcome"), METRICS_LLM_BUCKETS)
+llm_first_token = metrics.histogram("llm_first_token_seconds", "LLM time to first output token.", ("model",), METRICS_LLM_BUCKETS)
+llm_tokens = metrics.counter("llm_tokens_total", "LLM tokens by kind (input/output).", ("model", "kind"))
+
+@app.before_request
+def _metrics_request_start():
+    request.environ["metrics.t0"] = time.perf_counter()
+
+@app.after_request
+def _metrics_request_end(response: Response) -> Response:
+    t0 = request.environ.get("metrics.t0")
+    if t0 is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        route_latency.observe((route, request.method), time.perf_counter() - t0)
+        route_requests.inc((route, request.method, str(response.status_code)))
+    return response
+
+# ---------------------------------------------------------------------
+# SQLite connections (thread별 1개 재사용 + WAL)
+# ---------------------------------------------------------------------
+# WAL: 읽기와 push 쓰기가 서로 막지 않음. synchronous=NORMAL은 WAL에서 커밋당 fsync를 생략(체크포인트 때만).
+SQLITE_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",       # KiB 단위 음수 → 약 16MB page cache
+    "PRAGMA mmap_size=268435456",     # 256MB
+    "PRAGMA temp_store=MEMORY",
+)
+SQLITE_BUSY_TIMEOUT = 5.0
+
+_SQL_TABLE_RE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE(?:\s+IF\s+NOT\s+EXISTS)?)\s+(\w+)", re.IGNORECASE)
+_sql_label_cache: dict[str, tuple[str, str]] = {}
+
+def _sql_labels(sql: str) -> tuple[str, str]:
+    """metrics label (문장 종류, 첫 테이블). SQL 문자열은 코드 상수라 결과를 캐시"""
+    labels = _sql_label_cache.get(sql)
+    if labels is None:
+        head = sql.split(None, 1)
+        m = _SQL_TABLE_RE.search(sql)
+        labels = (head[0].upper() if head else "", m.group(1) if m else "")
+        if len(_sql_label_cache) < 1024:
+            _sql_label_cache[sql] = labels
+    return labels
+
+class _TimedCursor(sqlite3.Cursor):
+    """execute 시간(락 대기 포함)과 fetch 시간/행 수를 metrics 에 기록 (for 문 순회 행은 세지 않음)"""
+
+    _labels = ("", "")
+
+    def execute(self, sql, parameters=()):
+        self._labels = _sql_labels(sql)
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            sqlite_latency.observe(self._labels, time.perf_counter() - t0)
+            if self.rowcount > 0:
+                sqlite_rows.inc(self._labels, self.rowcount)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._labels = _sql_labels(sql)
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            sqlite_latency.observe(self._labels, time.perf_counter() - t0)
+            if self.rowcount > 0:
+                sqlite_rows.inc(self._labels, self.rowcount)
+
+    def _fetched(self, t0: float, n: int) -> None:
+        sqlite_fetch_seconds.inc(self._labels, time.perf_counter() - t0)
+        if n:
+            sqlite_rows.inc(self._labels, n)
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(t0, int(row is not None))
+        return row
+
+    def fetchmany(self, size=None):
+        t0 = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(t0, len(rows))
+        return rows
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(t0, len(rows))
+        return rows
+
+class _TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=_TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+_db_local = threading.local()
+
+def get_db() -> sqlite3.Connection:
+    """
+    현재 스레드의 커넥션을 재사용한다 (DB_PATH별).
+    같은 커넥션을 계속 쓰므로 sqlite3의 statement cache가 prepared statement 역할을 한다.
+    쓰기는 `with conn:` 으로 감싸 커밋/롤백을 보장할 것.
+    """
+    conns = getattr(_db_local, "conns", None)
+    if conns is None:
+        conns = _db_local.conns = {}
+
+    conn = conns.get(DB_PATH)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=SQLITE_BUSY_TIMEOUT, cached_statements=256, factory=_TimedConnection)
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        conns[DB_PATH] = conn
+    return conn
+
+def close_db() -> None:
+    """현재 스레드의 커넥션 정리 (테스트/워커 종료용)"""
+    for conn in (getattr(_db_local, "conns", None) or {}).values():
+        conn.close()
+    _db_local.conns = {}
 
+init_db()
 
 
 def _require_push_token():
@@ -73,121 +533,481 @@ def _to_float(s: str) -> float:
     return float(str(s).replace(",", "").strip())
 
 # ---------------------------------------------------------------------
-# Index (KOSPI/KOSDAQ current)
+# HTTP caching (버전 기반 weak ETag + If-None-Match → 본문 생성 없이 304)
+# ---------------------------------------------------------------------
+# s-maxage: nginx micro-cache 가 사용자 간에 공유하는 시간, max-age=0: 브라우저는 매번 재검증(304)
+CACHE_CONTROL_NEWS = "public, max-age=0, s-maxage=10"
+CACHE_CONTROL_SUMMARY = "public, max-age=0, s-maxage=30"
+CACHE_CONTROL_CANDLES = "public, max-age=0, s-maxage=2"
+CACHE_CONTROL_CALENDAR = "no-cache"  # 편집 직후 바로 보여야 하므로 공유 캐시 없이 재검증만
+
+def etag_matches(etag: str, if_none_match: str | None) -> bool:
+    return bool(if_none_match) and parse_etags(if_none_match).contains_weak(etag)
+
+def cache_headers(etag: str, cache_control: str) -> dict:
+    return {"ETag": quote_etag(etag, weak=True), "Cache-Control": cache_control}
+
+def not_modified(etag: str, cache_control: str, **headers) -> Response | None:
+    """현재 요청의 If-None-Match 가 etag 와 맞으면 304 응답, 아니면 None (호출자가 본문 생성)"""
+    if not etag_matches(etag, request.headers.get("If-None-Match")):
+        return None
+    return Response(status=304, headers={**cache_headers(etag, cache_control), **headers})
+
+def with_cache_headers(resp: Response, etag: str, cache_control: str) -> Response:
+    resp.headers.update(cache_headers(etag, cache_control))
+    return resp
+
+# ---------------------------------------------------------------------
+# HTTP client (shared keep-alive session for every upstream fetcher)
+# ---------------------------------------------------------------------
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "10"))          # host당 커넥션 수
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "10"))
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", "2"))
+HTTP_BACKOFF = float(os.environ.get("HTTP_BACKOFF", "0.3"))           # 초, 지수 backoff + 같은 폭의 jitter
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+def make_http_session(
+    pool_size: int = HTTP_POOL_SIZE,
+    retries: int = HTTP_RETRIES,
+    backoff: float = HTTP_BACKOFF,
+) -> requests.Session:
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        backoff_jitter=backoff,
+        backoff_max=5.0,
+        status_forcelist=HTTP_RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=False,  # Retry-After가 길게 와도 요청 스레드를 오래 잡지 않도록
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+http_session = make_http_session()
+
+class HostRateLimiter:
+    """
+    host별 요청 간격 제한 (GCRA: 초당 rate개, burst개까지 몰아서 허용).
+    acquire() 는 자기 차례를 예약하고 그 시각까지 sleep 한다.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.interval = 1.0 / rate
+        self.tolerance = (burst - 1) * self.interval
+        self._lock = threading.Lock()
+        self._tat: dict[str, float] = {}  # host -> 다음 요청의 이론적 도착 시각
+
+    def acquire(self, host: str) -> float:
+        with self._lock:
+            now = time.monotonic()
+            tat = max(self._tat.get(host, now), now)
+            self._tat[host] = tat + self.interval
+        wait = tat - self.tolerance - now
+        if wait > 0:
+            time.sleep(wait)
+        return max(wait, 0.0)
+
+upstream_rate_limiter: HostRateLimiter | None = None  # 수집기 프로세스가 설정 (웹 요청 경로는 제한 없음)
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    kwargs.setdefault("timeout", (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+    host = urlsplit(url).netloc
+    if upstream_rate_limiter is not None:
+        upstream_rate_limiter.acquire(host)
+    t0 = time.perf_counter()
+    try:
+        r = http_session.get(url, **kwargs)
+    except Exception:
+        upstream_requests.inc((host, "error"))
+        raise
+    finally:
+        upstream_latency.observe((host,), time.perf_counter() - t0)
+    upstream_requests.inc((host, str(r.status_code)))
+    upstream_bytes.inc((host,), len(r.content))
+    return r
+
 # ---------------------------------------------------------------------
-NAVER_INDEX_URLS = {
-    "KOSPI": "https://finance.naver.com/sise/sise_index.naver?code=KOSPI",
-    "KOSDAQ": "https://finance.naver.com/sise/sise_index.naver?code=KOSDAQ",
+# Upstream cache (process-wide TTL + stale-while-revalidate + single-flight)
+# ---------------------------------------------------------------------
+class _SingleFlight:
+    """
+    같은 key로 동시에 들어온 호출은 한 번만 실행하고, 나머지는 그 결과를 기다려 공유.
+    """
+
+    class _Call:
+        __slots__ = ("event", "value", "error")
+
+        def __init__(self):
+            self.event = threading.Event()
+            self.value = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict = {}
+
+    def do(self, key, fn) -> tuple[object, bool]:
+        """
+        Returns: (value, shared)  shared=True 면 다른 호출의 결과를 받아온 것
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.value, False
+
+    def in_flight(self, key) -> bool:
+        with self._lock:
+            return key in self._calls
+
+
+class UpstreamCache:
+    """
+    source별 (ttl, stale) 초 단위 설정.
+    - age < ttl           : 캐시 그대로 반환 (hit)
+    - age < ttl + stale   : 캐시 반환 + 백그라운드 갱신 (stale)
+    - 그 외 / 없음         : 업스트림 호출 (miss), 동시 miss는 single-flight로 1회만 호출
+    실패한 결과는 캐시하지 않는다.
+    """
+
+    STAT_KEYS = ("hit", "stale", "miss", "coalesced", "refresh", "error")
+
+    def __init__(self, ttls: dict[str, tuple[float, float]]):
+        self._ttls = dict(ttls)
+        self._lock = threading.Lock()
+        self._entries: dict[tuple, tuple[float, object]] = {}
+        self._flight = _SingleFlight()
+        self._stats = {src: dict.fromkeys(self.STAT_KEYS, 0) for src in self._ttls}
+
+    def _count(self, source: str, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[source][name] += n
+
+    def get(self, source: str, key, loader):
+        ttl, stale = self._ttls[source]
+        full_key = (source, key)
+
+        with self._lock:
+            entry = self._entries.get(full_key)
+
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < ttl:
+                self._count(source, "hit")
+                return entry[1]
+            if age < ttl + stale:
+                self._count(source, "stale")
+                self._refresh_in_background(source, full_key, loader)
+                return entry[1]
+
+        self._count(source, "miss")
+        value, shared = self._flight.do(full_key, lambda: self._load(source, full_key, loader))
+        if shared:
+            self._count(source, "coalesced")
+        return value
+
+    def _load(self, source: str, full_key: tuple, loader):
+        try:
+            value = loader()
+        except Exception:
+            self._count(source, "error")
+            raise
+        with self._lock:
+            self._entries[full_key] = (time.monotonic(), value)
+            self._stats[source]["refresh"] += 1
+        return value
+
+    def _refresh_in_background(self, source: str, full_key: tuple, loader) -> None:
+        if self._flight.in_flight(full_key):
+            return
+
+        def run():
+            try:
+                self._flight.do(full_key, lambda: self._load(source, full_key, loader))
+            except Exception:
+                pass  # stale 값 계속 사용, 다음 요청에서 재시도
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {src: dict(v) for src, v in self._stats.items()}
+            for src, (ttl, stale) in self._ttls.items():
+                out[src]["ttl"] = ttl
+                out[src]["staleWindow"] = stale
+            entries = len(self._entries)
+        return {"sources": out, "entries": entries}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats = {src: dict.fromkeys(self.STAT_KEYS, 0) for src in self._ttls}
+
+
+UPSTREAM_CACHE_TTLS = {
+    # source: (ttl, stale-while-revalidate)
+    "index": (float(os.environ.get("CACHE_TTL_INDEX", "10")), 30.0),
+    "index_points": (float(os.environ.get("CACHE_TTL_INDEX_POINTS", "300")), 600.0),
+    "news": (float(os.environ.get("CACHE_TTL_NEWS", "60")), 120.0),
 }
 
+upstream_cache = UpstreamCache(UPSTREAM_CACHE_TTLS)
+
+@metrics.collector
+def _upstream_cache_metrics() -> list[Counter]:
+    events = Counter("upstream_cache_events_total", "Upstream cache lookups by outcome.", ("source", "event"))
+    for source, st in upstream_cache.stats()["sources"].items():
+        for event in UpstreamCache.STAT_KEYS:
+            events.inc((source, event), st[event])
+    return [events]
+
+# ---------------------------------------------------------------------
+# Fan-out (여러 업스트림 호출을 bounded thread pool에서 병렬 실행)
+# ---------------------------------------------------------------------
+FANOUT_WORKERS = int(os.environ.get("FANOUT_WORKERS", "8"))
+_fanout_pool = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="fanout")
+
+def fan_out(fn, keys, pool: ThreadPoolExecutor | None = None) -> dict:
+    """
+    fn(key)를 key마다 pool(기본: 지수 fan-out 풀)에서 병렬 실행.
+    Returns: {key: (result, None) | (None, exception)}  하나가 실패해도 나머지 결과는 유지
+    """
+    pool = pool or _fanout_pool
+    futures = {key: pool.submit(fn, key) for key in keys}
+    out = {}
+    for key, fut in futures.items():
+        try:
+            out[key] = (fut.result(), None)
+        except Exception as e:
+            out[key] = (None, e)
+    return out
+
+# ---------------------------------------------------------------------
+# Index (KOSPI/KOSDAQ current)
+# ---------------------------------------------------------------------
+NAVER_INDEX_URL = os.environ.get("NAVER_INDEX_URL", "https://finance.naver.com/sise/sise_index.naver?code={code}")
+
+# 예: INDEX_SYMBOLS=KOSPI,KOSDAQ,KPI200
+INDEX_SYMBOLS = [
+    s.strip() for s in os.environ.get("INDEX_SYMBOLS", "KOSPI,KOSDAQ").split(",") if s.strip()
+]
+
+NAVER_INDEX_URLS = {code: NAVER_INDEX_URL.format(code=code) for code in INDEX_SYMBOLS}
+
+# 시세 블록(<div id="quotient" class="quotient up|dn">)을 한 번만 찾고 그 조각에서만 값/부호를 읽는다.
+# 페이지 전체를 여러 번 훑지 않고, 사이드바 등 다른 곳의 no_down/하락 표시에 영향받지 않음.
+_INDEX_BLOCK_ANCHORS = ('id="quotient"', 'id="now_value"', "현재지수</span>")
+_INDEX_BLOCK_SPAN = 600          # 블록 끝(</div>)을 못 찾을 때 앵커 뒤로 볼 최대 길이
+_INDEX_NOW_RE = re.compile(r'id="now_value"[^>]*>\s*([0-9.,]+)|현재지수</span>\s*<em[^>]*>\s*<span[^>]*>([0-9.,]+)<')
+_INDEX_FLUC_RE = re.compile(
+    r'id="change_value_and_rate"[^>]*>\s*<span[^>]*>\s*([0-9.,]+)\s*</span>\s*([+-]?)([0-9.,]+)\s*%'
+)
+_INDEX_CHANGE_RE = re.compile(r'id="change_value"[^>]*>\s*([0-9.,]+)|전일대비</span>[^<]*<[^>]*class="tah">([0-9.,]+)<')
+_INDEX_RATE_RE = re.compile(r'id="change_rate"[^>]*>\s*[+-]?([0-9.,]+)|등락률</span>[^<]*<[^>]*class="tah">[+-]?([0-9.,]+)<')
+_INDEX_DOWN_RE = re.compile(r'class="quotient dn"|no_down|>하락<|\s-[0-9.,]+\s*%')
+
+def _index_quote_block(html: str) -> str:
+    for anchor in _INDEX_BLOCK_ANCHORS:
+        i = html.find(anchor)
+        if i >= 0:
+            end = html.find("</div>", i, i + _INDEX_BLOCK_SPAN)
+            return html[max(html.rfind("<", 0, i), 0): end if end >= 0 else i + _INDEX_BLOCK_SPAN]
+    return ""
+
+def _first_group(m):
+    return next(g for g in m.groups() if g is not None) if m else None
+
+@timed(parse_latency, "naver_index")
+def parse_naver_index(html: str) -> dict:
+    """sise_index 페이지 HTML -> dict(price, change, changeRate). 시세 블록만 파싱"""
+    block = _index_quote_block(html)
+    now = _first_group(_INDEX_NOW_RE.search(block))
+    if now is None:
+        raise RuntimeError("quote block not found")
+    price = _to_float(now)
+
+    m = _INDEX_FLUC_RE.search(block)
+    if m:
+        change, change_rate = _to_float(m.group(1)), _to_float(m.group(3))
+    else:
+        chg = _first_group(_INDEX_CHANGE_RE.search(block))
+        rate = _first_group(_INDEX_RATE_RE.search(block))
+        change = _to_float(chg) if chg is not None else None
+        change_rate = _to_float(rate) if rate is not None else None
+
+    if _INDEX_DOWN_RE.search(block):
+        change = -abs(change) if change else change
+        change_rate = -abs(change_rate) if change_rate else change_rate
+    return {"price": price, "change": change, "changeRate": change_rate}
+
 def fetch_naver_index(code: str) -> dict:
     """
     Returns: dict(price, change, changeRate)
     """
-    url = NAVER_INDEX_URLS[code]
-    r = requests.get(url, headers=HEADERS, timeout=10)
+    r = http_get(NAVER_INDEX_URLS[code])
     r.raise_for_status()
-    html = r.text
-
-    # 현재지수
-    m_now = re.search(r'id="now_value"[^>]*>\s*([0-9\.,]+)\s*<', html)
-    if not m_now:
-        m_now = re.search(
-            r'현재지수</span>\s*<em[^>]*>\s*<span[^>]*>([0-9\.,]+)</span>',
-            html,
-            re.S,
-        )
-    if not m_now:
-        raise RuntimeError(f"Failed to parse {code} now value")
-
-    price = _to_float(m_now.group(1))
-
-    # 전일대비
-    m_chg = re.search(r'id="change_value"[^>]*>\s*([0-9\.,]+)\s*<', html)
-    if not m_chg:
-        m_chg = re.search(r'전일대비</span>.*?<span[^>]*class="tah">([0-9\.,]+)</span>', html, re.S)
-    change = _to_float(m_chg.group(1)) if m_chg else None
-
-    # 등락률
-    m_rate = re.search(r'id="change_rate"[^>]*>\s*([0-9\.,]+)\s*<', html)
-    if not m_rate:
-        m_rate = re.search(r'등락률</span>.*?<span[^>]*class="tah">([0-9\.,]+)</span>', html, re.S)
-    change_rate = _to_float(m_rate.group(1)) if m_rate else None
-
-    # 부호 처리(간단): no_down 표시가 있으면 음수로
-    # (정확도를 높이려면 change 영역 주변의 class만 판별하도록 개선 가능)
-    if "no_down" in html:
-        if change is not None:
-            change = -abs(change)
-        if change_rate is not None:
-            change_rate = -abs(change_rate)
-
-    return {"price": price, "change": change, "changeRate": change_rate}
+    try:
+        return parse_naver_index(r.text)
+    except RuntimeError:
+        raise RuntimeError(f"Failed to parse {code} now value") from None
 
 # ---------------------------------------------------------------------
 # Index series (daily points via siseJson)
 # ---------------------------------------------------------------------
-NAVER_SISEJSON_URL = "https://api.finance.naver.com/siseJson.naver"
+NAVER_SISEJSON_URL = os.environ.get("NAVER_SISEJSON_URL", "https://api.finance.naver.com/siseJson.naver")
 
 def _yyyymmdd(d: datetime) -> str:
     return d.strftime("%Y%m%d")
 
-def fetch_naver_daily_points(symbol: str, days: int = 60) -> list[dict]:
+def _yyyymmdd_to_iso(d: int) -> str:
+    return f"{d // 10000:04d}-{d // 100 % 100:02d}-{d % 100:02d}"
+
+# siseJson 응답은 JS 배열 텍스트:
+#   [['날짜', '시가', ...],
+#   ["20240102", 78200.0, ...],
+#   ...]
+# 중첩 없는 행 단위로 잘라서 바로 숫자로 변환 (응답 전체를 ast.literal_eval 하지 않음)
+_SISE_ROW_RE = re.compile(r"\[([^\[\]]*)\]")
+_SISE_QUOTES = "\"' \t\r\n"
+
+@timed(parse_latency, "sisejson")
+def parse_sisejson(text: str, columns: dict[str, str]) -> dict:
     """
-    Returns: [{"t":"YYYY-MM-DD","v":float}, ...]
+    columns: {출력키: 헤더명} 예) {"c": "종가"}
+    Returns (columnar):
+      {"t": [20240102, ...], "c": array("d", [...]), ...}
+    - 헤더에 없는 컬럼은 결과에서 빠짐
+    - 날짜/숫자 변환이 안 되는 행은 건너뜀
     """
-    end = datetime.now()
-    start = end - timedelta(days=days * 2)
+    rows = _SISE_ROW_RE.finditer(text)
+    head = next(rows, None)
+    if head is None:
+        raise RuntimeError("siseJson: header row not found")
+
+    header = [h.strip(_SISE_QUOTES) for h in head.group(1).split(",")]
+    i_date = header.index("날짜")
+    present = [(key, header.index(name)) for key, name in columns.items() if name in header]
+
+    out = {"t": []}
+    cols = []
+    for key, i in present:
+        out[key] = array("d")
+        cols.append((out[key], i))
+    dates = out["t"]
+
+    width = len(header)
+    for m in rows:
+        body = m.group(1)
+        if body.count('"') + body.count("'") > 2:
+            # 날짜 외에 따옴표 문자열 셀이 있는 드문 경우("78,500")만 느린 경로
+            try:
+                cells = [str(c) for c in ast.literal_eval("[" + body + "]")]
+            except (ValueError, SyntaxError):
+                continue
+        else:
+            cells = body.split(",")
+        if len(cells) < width:
+            continue
+        try:
+            d = cells[i_date].strip(_SISE_QUOTES)
+            if len(d) != 8:
+                continue
+            vals = [float(cells[i]) for _, i in cols]
+        except ValueError:
+            try:
+                vals = [_to_float(cells[i].strip(_SISE_QUOTES)) for _, i in cols]
+            except ValueError:
+                continue
+        try:
+            dates.append(int(d))
+        except ValueError:
+            continue
+        for (dst, _), v in zip(cols, vals):
+            dst.append(v)
+
+    return out
 
-    params = {
+def sisejson_params(symbol: str, tf: str, start: datetime, end: datetime | None = None) -> dict:
+    return {
         "symbol": symbol,
         "requestType": "1",
         "startTime": _yyyymmdd(start),
-        "endTime": _yyyymmdd(end),
-        "timeframe": "day",
+        "endTime": _yyyymmdd(end or datetime.now()),
+        "timeframe": tf,  # "day" | "week" | "month"
     }
-    r = requests.get(NAVER_SISEJSON_URL, params=params, headers=HEADERS, timeout=10)
-    r.raise_for_status()
 
-    data = r.text.strip()
-    arr = ast.literal_eval(data)  # 네이버가 JS array 형태로 내려줘서 이렇게 파싱
-
-    header = arr[0]
-    rows = arr[1:]
-
-    i_date = header.index("날짜")
-    i_close = header.index("종가")
+def daily_points_from_sisejson(text: str, days: int) -> list[dict]:
+    cols = parse_sisejson(text, {"v": "종가"})
+    ts = cols["t"][-days:]
+    vs = cols["v"][-days:]
+    return [{"t": _yyyymmdd_to_iso(t), "v": v} for t, v in zip(ts, vs)]
 
-    pts = []
-    for row in rows:
-        d = row[i_date]   # "20220103"
-        c = row[i_close]  # "1234" or number-string
-        try:
-            t = datetime.strptime(d, "%Y%m%d").strftime("%Y-%m-%d")
-            v = _to_float(c)
-            pts.append({"t": t, "v": v})
-        except Exception:
-            continue
-
-    return pts[-days:]
+def fetch_naver_daily_points(symbol: str, days: int = 60) -> list[dict]:
+    """
+    Returns: [{"t":"YYYY-MM-DD","v":float}, ...]
+    """
+    start = datetime.now() - timedelta(days=days * 2)
+    r = http_get(NAVER_SISEJSON_URL, params=sisejson_params(symbol, "day", start))
+    r.raise_for_status()
+    return daily_points_from_sisejson(r.text, days)
 
 # ---------------------------------------------------------------------
 # News (Naver News economy section)
 # ---------------------------------------------------------------------
-NAVER_ECON_NEWS_URL = "https://news.naver.com/section/101"
+NAVER_ECON_NEWS_URL = os.environ.get("NAVER_ECON_NEWS_URL", "https://news.naver.com/section/101")
 
-def fetch_naver_econ_news(limit: int = 10) -> list[dict]:
+# lxml이 설치돼 있으면 사용 (html.parser보다 수 배 빠름), 없으면 표준 파서
+try:
+    import lxml  # noqa: F401
+    NEWS_HTML_PARSER = "lxml"
+except ImportError:
+    NEWS_HTML_PARSER = "html.parser"
+
+# 기사 카드(div.sa_text)만 트리로 만들고 나머지 페이지(메뉴/광고/스크립트)는 건너뜀
+_NEWS_CARD_STRAINER = SoupStrainer("div", class_="sa_text")
+
+@timed(parse_latency, "naver_news")
+def parse_naver_econ_news(html: str, limit: int = 10) -> list[dict]:
     """
     Returns: [{"title","link","press","ts"}...]
     """
-    r = requests.get(NAVER_ECON_NEWS_URL, headers=HEADERS, timeout=10)
-    r.raise_for_status()
-
-    soup = BeautifulSoup(r.text, "html.parser")
+    soup = BeautifulSoup(html, NEWS_HTML_PARSER, parse_only=_NEWS_CARD_STRAINER)
+    anchors = soup.select("a.sa_text_title")
+    if not anchors:
+        # 카드 마크업이 바뀐 경우 전체 문서 파싱으로 fallback
+        soup = BeautifulSoup(html, NEWS_HTML_PARSER)
+        anchors = soup.select("a.sa_text_title")
 
     items = []
     # 섹션 페이지에서 기사 타이틀 앵커
-    for a in soup.select("a.sa_text_title")[: max(limit * 2, limit)]:
+    for a in anchors[: max(limit * 2, limit)]:
         title = a.get_text(strip=True)
         link = a.get("href", "").strip()
         if not title or not link:
@@ -219,14 +1039,151 @@ def fetch_naver_econ_news(limit: int = 10) -> list[dict]:
 
     return items
 
+def fetch_naver_econ_news(limit: int = 10) -> list[dict]:
+    """
+    Returns: [{"title","link","press","ts"}...]
+    """
+    r = http_get(NAVER_ECON_NEWS_URL)
+    r.raise_for_status()
+    return parse_naver_econ_news(r.text, limit=limit)
+
 # ---------------------------------------------------------------------
-# Calendar (simple JSON storage)
+# News store (링크 기준 dedup + 누적 히스토리 + cursor)
 # ---------------------------------------------------------------------
-CALENDAR_STORE = os.path.join(os.path.dirname(__file__), "calendar_events.json")
+NEWS_INGEST_LIMIT = 50                                                   # 섹션 페이지 1회당 최대 기사 수
+NEWS_HISTORY_DAYS = int(os.environ.get("NEWS_HISTORY_DAYS", "3"))
+
+_NAVER_ARTICLE_RE = re.compile(r"/article/(?:\w+/)?(\d{3})/(\d{6,})")
+
+def normalize_news_link(link: str) -> str:
+    """
+    같은 기사의 다른 URL 형태를 하나의 key로:
+      https://n.news.naver.com/mnews/article/001/0014123456?sid=101 → naver:001/0014123456
+      그 외 → host/path (scheme/query/fragment/끝 슬래시 제거)
+    """
+    m = _NAVER_ARTICLE_RE.search(link)
+    if m and "naver.com" in link:
+        return f"naver:{m.group(1)}/{m.group(2)}"
+    parts = urlsplit(link.strip())
+    return f"{parts.netloc.lower()}{parts.path.rstrip('/')}" or link.strip()
 
-def _load_calendar() -> dict:
+def _fetch_news_page() -> str | None:
+    """
+    섹션 페이지를 조건부 요청으로 가져온다 (ETag / Last-Modified 저장 → If-None-Match / If-Modified-Since).
+    Returns: HTML, 변경 없음(304)이면 None
+    """
+    r = http_get(NAVER_ECON_NEWS_URL, headers=news_conditional_headers())
+    if r.status_code == 304:
+        return None
+    r.raise_for_status()
+    save_news_validators(r.headers.get("ETag"), r.headers.get("Last-Modified"))
+    return r.text
+
+def news_conditional_headers() -> dict:
+    row = get_db().execute(
+        "SELECT etag, last_modified FROM upstream_validators WHERE url=?", (NAVER_ECON_NEWS_URL,)
+    ).fetchone()
+    headers = {}
+    if row and row[0]:
+        headers["If-None-Match"] = row[0]
+    if row and row[1]:
+        headers["If-Modified-Since"] = row[1]
+    return headers
+
+def save_news_validators(etag: str | None, last_modified: str | None) -> None:
+    if not (etag or last_modified):
+        return
+    conn = get_db()
+    with conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO upstream_validators (url, etag, last_modified)
+            VALUES (?, ?, ?)
+        """, (NAVER_ECON_NEWS_URL, etag, last_modified))
+
+def store_news_items(items: list[dict]) -> int:
+    """
+    items: 페이지 순서(최신이 위) 그대로. 새 기사만 추가하고, 오래된 기사는 정리.
+    Returns: 새로 추가된 기사 수
+    """
+    now = int(time.time())
+    # 페이지 아래(오래된 것)부터 넣어야 최신 기사가 더 큰 seq를 가짐
+    rows = [
+        (normalize_news_link(n["link"]), n["title"], n["link"], n.get("press"), n.get("ts"), now)
+        for n in reversed(items)
+    ]
+    conn = get_db()
+    with conn:
+        before = conn.total_changes
+        conn.executemany("""
+            INSERT OR IGNORE INTO news_articles (link_key, title, link, press, ts, first_seen)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, rows)
+        added = conn.total_changes - before
+        conn.execute(
+            "DELETE FROM news_articles WHERE first_seen < ?",
+            (now - NEWS_HISTORY_DAYS * 86400,),
+        )
+    return added
+
+def ingest_naver_econ_news() -> int:
+    """Returns: 새로 추가된 기사 수 (304면 0)"""
+    html = _fetch_news_page()
+    if html is None:
+        return 0
+    return store_news_items(parse_naver_econ_news(html, limit=NEWS_INGEST_LIMIT))
+
+def news_etag() -> str:
+    """저장된 기사 범위(최신/가장 오래된 seq)가 같으면 같은 목록 → 같은 ETag"""
+    lo, hi = get_db().execute("SELECT MIN(seq), MAX(seq) FROM news_articles").fetchone()
+    return f"news.{hi or 0}.{lo or 0}"
+
+def load_news(limit: int = 10, cursor: int | None = None) -> tuple[list[dict], int]:
+    """
+    cursor 없으면 최신 limit개, 있으면 seq > cursor 인 새 기사만 (최대 limit개).
+    Returns: (최신순 items, 새 cursor = 지금까지 본 최대 seq)
+    """
+    conn = get_db()
+    if cursor is None:
+        rows = conn.execute("""
+            SELECT seq, title, link, press, ts FROM news_articles
+            ORDER BY seq DESC LIMIT ?
+        """, (limit,)).fetchall()
+    else:
+        rows = conn.execute("""
+            SELECT seq, title, link, press, ts FROM (
+                SELECT * FROM news_articles WHERE seq > ? ORDER BY seq ASC LIMIT ?
+            ) ORDER BY seq DESC
+        """, (cursor, limit)).fetchall()
+
+    items = [{"id": r[0], "title": r[1], "link": r[2], "press": r[3], "ts": r[4]} for r in rows]
+    new_cursor = rows[0][0] if rows else (cursor or 0)
+    return items, new_cursor
+
+# ---------------------------------------------------------------------
+# Cached fetchers (routes에서 사용, 탭 수와 무관하게 업스트림 호출은 TTL당 1회)
+# ---------------------------------------------------------------------
+def cached_naver_index(code: str) -> dict:
+    return upstream_cache.get("index", code, lambda: fetch_naver_index(code))
+
+def cached_naver_daily_points(symbol: str, days: int = 60) -> list[dict]:
+    return upstream_cache.get(
+        "index_points", (symbol, days), lambda: fetch_naver_daily_points(symbol, days=days)
+    )
+
+def cached_ingest_naver_econ_news() -> int:
+    return upstream_cache.get("news", "section101", ingest_naver_econ_news)
+
+# ---------------------------------------------------------------------
+# Calendar (SQLite store + version 기반 읽기 캐시)
+# ---------------------------------------------------------------------
+CALENDAR_STORE = os.path.join(os.path.dirname(__file__), "calendar_events.json")  # 예전 JSON 저장소 (1회 이관)
+
+_calendar_cache: dict = {}
+_calendar_cache_lock = threading.Lock()
+
+def _load_calendar(path: str = CALENDAR_STORE) -> dict:
     try:
-        with open(CALENDAR_STORE, "r", encoding="utf-8") as f:
+        with open(path, "r", encoding="utf-8") as f:
             data = json.load(f)
         return data if isinstance(data, dict) else {}
     except FileNotFoundError:
@@ -234,11 +1191,99 @@ def _load_calendar() -> dict:
     except Exception:
         return {}
 
-def _save_calendar(data: dict) -> None:
-    tmp = CALENDAR_STORE + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    os.replace(tmp, CALENDAR_STORE)
+def migrate_calendar_json(path: str = CALENDAR_STORE) -> int:
+    """
+    예전 calendar_events.json을 calendar_events 테이블로 가져오고 파일은 .migrated로 이름 변경.
+    여러 워커가 동시에 불러도 INSERT OR IGNORE라 중복되지 않는다.
+    Returns: 가져온 이벤트 수
+    """
+    if not os.path.exists(path):
+        return 0
+
+    rows = []
+    for date, arr in _load_calendar(path).items():
+        if not isinstance(arr, list):
+            continue
+        for x in arr:
+            if isinstance(x, dict) and x.get("title"):
+                rows.append((
+                    str(date), str(x.get("id") or ""), str(x.get("title")),
+                    str(x.get("time") or ""), str(x.get("note") or ""),
+                ))
+
+    conn = get_db()
+    with conn:
+        conn.executemany("""
+            INSERT OR IGNORE INTO calendar_events (date, id, title, time, note)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+        conn.execute("UPDATE calendar_meta SET v = v + 1 WHERE k='version'")
+
+    try:
+        os.replace(path, path + ".migrated")
+    except OSError:
+        pass
+    return len(rows)
+
+def _calendar_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT v FROM calendar_meta WHERE k='version'").fetchone()[0]
+
+def calendar_query(date: str = "", month: str = "") -> dict:
+    """
+    Returns: { "YYYY-MM-DD": [ {id,title,time,note}, ... ], ... }
+    같은 날짜 안에서는 시간순(빈 시간은 뒤로), 같은 시간은 입력순.
+    """
+    conn = get_db()
+    version = _calendar_version(conn)
+    key = (DB_PATH, date, month)
+    with _calendar_cache_lock:
+        hit = _calendar_cache.get(key)
+    if hit is not None and hit[0] == version:
+        return hit[1]
+
+    sql = "SELECT date, id, title, time, note FROM calendar_events"
+    params: tuple = ()
+    if date:
+        sql += " WHERE date=?"
+        params = (date,)
+    elif month:
+        sql += " WHERE date>=? AND date<?"
+        params = (month, month + "\uffff")
+    sql += " ORDER BY date, time='', time, rowid"
+
+    items: dict = {date: []} if date else {}
+    for d, event_id, title, t, note in conn.execute(sql, params):
+        items.setdefault(d, []).append({"id": event_id, "title": title, "time": t, "note": note})
+
+    with _calendar_cache_lock:
+        if len(_calendar_cache) > 256:
+            _calendar_cache.clear()
+        _calendar_cache[key] = (version, items)
+    return items
+
+def calendar_add(date: str, title: str, time_: str = "", note: str = "") -> dict:
+    conn = get_db()
+    event_id = int(datetime.now().timestamp() * 1000)
+    with conn:
+        while conn.execute(
+            "SELECT 1 FROM calendar_events WHERE date=? AND id=?", (date, str(event_id))
+        ).fetchone():
+            event_id += 1
+        conn.execute("""
+            INSERT INTO calendar_events (date, id, title, time, note)
+            VALUES (?, ?, ?, ?, ?)
+        """, (date, str(event_id), title, time_, note))
+        conn.execute("UPDATE calendar_meta SET v = v + 1 WHERE k='version'")
+    return {"id": str(event_id), "title": title, "time": time_, "note": note}
+
+def calendar_delete(date: str, event_id: str) -> None:
+    conn = get_db()
+    with conn:
+        cur = conn.execute("DELETE FROM calendar_events WHERE date=? AND id=?", (date, str(event_id)))
+        if cur.rowcount:
+            conn.execute("UPDATE calendar_meta SET v = v + 1 WHERE k='version'")
+
+migrate_calendar_json()
 
 # ---------------------------------------------------------------------
 # News Report
@@ -290,22 +1335,27 @@ def _simple_kor_summary(items: list[dict]) -> str:
         "- 정책/지정학 리스크(관세/전쟁/규제) 키워드가 있는지\n"
     )
 
-def _llm_summary_if_possible(items: list[dict]) -> str | None:
+# LLM 클라이언트 주입 지점 (테스트/로컬 fake). responses.create(..., stream=True) 인터페이스만 있으면 됨
+llm_client = None
+
+def _get_llm_client():
     """
-    OPENAI_API_KEY가 설정되어 있고 openai 패키지가 있으면 LLM 요약 사용.
-    실패하면 None 반환 → fallback 요약 사용.
+    주입된 llm_client가 있으면 그것, 없으면 OPENAI_API_KEY로 OpenAI 클라이언트.
+    키가 없거나 생성 실패하면 None → fallback 요약 사용.
     """
+    if llm_client is not None:
+        return llm_client
+
     api_key = os.environ.get("OPENAI_API_KEY", "").strip()
     if not api_key:
-        print("NO API")
         return None
 
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
+        return OpenAI(api_key=api_key)
     except Exception:
         return None
-    
+
+def _news_summary_prompt(items: list[dict]) -> str:
     # 뉴스 묶음(제목/언론사/시간/링크)
     bundle = []
     for n in items[:25]:
@@ -380,48 +1430,301 @@ def _llm_summary_if_possible(items: list[dict]) -> str | None:
 [입력 뉴스 목록]
 {news_bundle}
 """.strip()
+    return prompt
 
-    resp = client.responses.create(
-        model="gpt-4.1-mini",
-        input=[
-            {"role": "system", "content": "사실 기반으로 간결하게 작성해라."},
-            {"role": "user", "content": prompt},
-        ],
-        temperature=0.4,
-        max_output_tokens=1200,
-    )
-    return resp.output_text
+def _llm_summary_if_possible(items: list[dict], on_delta=None) -> str | None:
+    """
+    LLM 클라이언트가 있으면 스트리밍으로 요약 생성 (토큰 조각마다 on_delta(text) 호출).
+    클라이언트가 없으면 None 반환 → fallback 요약 사용.
+    """
+    client = _get_llm_client()
+    if client is None:
+        return None
+
+    model = "gpt-4.1-mini"
+    t0 = time.perf_counter()
+    outcome = "error"
+    parts = []
+    try:
+        stream = client.responses.create(
+            model=model,
+            input=[
+                {"role": "system", "content": "사실 기반으로 간결하게 작성해라."},
+                {"role": "user", "content": _news_summary_prompt(items)},
+            ],
+            temperature=0.4,
+            max_output_tokens=1200,
+            stream=True,
+        )
+
+        for event in stream:
+            kind = getattr(event, "type", "")
+            if kind == "response.output_text.delta":
+                if not parts:
+                    llm_first_token.observe((model,), time.perf_counter() - t0)
+                parts.append(event.delta)
+                if on_delta is not None:
+                    on_delta(event.delta)
+            elif kind == "response.completed":
+                usage = getattr(getattr(event, "response", None), "usage", None)
+                if usage is not None:
+                    llm_tokens.inc((model, "input"), getattr(usage, "input_tokens", 0) or 0)
+                    llm_tokens.inc((model, "output"), getattr(usage, "output_tokens", 0) or 0)
+            elif kind in ("response.failed", "error"):
+                raise RuntimeError(f"LLM summary failed: {getattr(event, 'message', kind)}")
+        outcome = "ok"
+    finally:
+        llm_latency.observe((model, outcome), time.perf_counter() - t0)
+    return "".join(parts)
+
+def headline_hash(items: list[dict]) -> str:
+    """헤드라인 묶음(제목+링크, 순서 무관) 해시 → 같은 묶음이면 저장된 요약 재사용"""
+    keys = sorted(f"{n.get('title', '')}\t{n.get('link', '')}" for n in items)
+    return hashlib.sha256("\n".join(keys).encode("utf-8")).hexdigest()[:16]
+
+# ---------------------------------------------------------------------
+# News summary jobs (백그라운드 생성 + 상태 조회 + 토큰 스트리밍)
+# ---------------------------------------------------------------------
+NEWS_SUMMARY_INTERVAL = float(os.environ.get("NEWS_SUMMARY_INTERVAL", "0"))  # 초, 0이면 스케줄러 끔
+NEWS_SUMMARY_KEEP_JOBS = 20
+
+class NewsSummaryJob:
+    def __init__(self, job_id: str, items: list[dict], digest: str):
+        self.id = job_id
+        self.items = items
+        self.hash = digest
+        self.status = "running"       # running | done | error
+        self.chunks: list[str] = []   # 스트리밍 중 누적 토큰
+        self.result: dict | None = None
+        self.error: str | None = None
+        self.cond = threading.Condition()
+
+    def push(self, text: str) -> None:
+        with self.cond:
+            self.chunks.append(text)
+            self.cond.notify_all()
+
+    def finish(self, result: dict | None = None, error: str | None = None) -> None:
+        with self.cond:
+            self.result = result
+            self.error = error
+            self.status = "error" if error else "done"
+            self.cond.notify_all()
+
+    def to_dict(self) -> dict:
+        with self.cond:
+            return {
+                "jobId": self.id,
+                "status": self.status,
+                "headlineHash": self.hash,
+                "partial": "".join(self.chunks),
+                "result": self.result,
+                "error": self.error,
+            }
+
+class NewsSummaryJobs:
+    """
+    - 같은 헤드라인 묶음(hash)의 요약이 이미 저장돼 있으면 LLM 호출 없이 재사용
+    - 같은 hash로 진행 중인 job이 있으면 그 job을 공유
+    - 그 외에는 백그라운드 스레드에서 생성 (요청 스레드는 바로 반환)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs: dict[str, NewsSummaryJob] = {}
+        self._seq = 0
+
+    def get(self, job_id: str) -> NewsSummaryJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def start(self, items: list[dict]) -> tuple[dict | None, NewsSummaryJob | None]:
+        """
+        Returns: (저장된 요약 payload, None) 또는 (None, 진행 중 job)
+        """
+        digest = headline_hash(items)
+        saved = _load_news_summary()
+        if saved and saved.get("headlineHash") == digest and (saved.get("llm") or _get_llm_client() is None):
+            return saved, None
+
+        with self._lock:
+            for job in self._jobs.values():
+                if job.hash == digest and job.status == "running":
+                    return None, job
+
+            self._seq += 1
+            job = NewsSummaryJob(f"{int(time.time())}-{self._seq}", items, digest)
+            self._jobs[job.id] = job
+            while len(self._jobs) > NEWS_SUMMARY_KEEP_JOBS:
+                del self._jobs[next(iter(self._jobs))]
+
+        threading.Thread(target=self._run, args=(job,), daemon=True).start()
+        return None, job
+
+    def _run(self, job: NewsSummaryJob) -> None:
+        try:
+            summary = _llm_summary_if_possible(job.items, on_delta=job.push)
+            used_llm = bool(summary)
+            if not summary:
+                summary = _simple_kor_summary(job.items)
+                job.push(summary)
+
+            payload = {
+                "date": datetime.now().strftime("%Y-%m-%d"),
+                "generatedAt": datetime.now().isoformat(timespec="seconds"),
+                "summary": summary,
+                "count": len(job.items),
+                "headlineHash": job.hash,
+                "llm": used_llm,
+            }
+            _save_news_summary(payload)
+            job.finish(result=payload)
+        except Exception as e:
+            job.finish(error=str(e))
+
+news_summary_jobs = NewsSummaryJobs()
+
+def _news_for_summary(limit: int = 25) -> list[dict]:
+    """요약 입력: 뉴스 히스토리(여러 페이지 스냅샷 누적)의 최신 limit개"""
+    try:
+        cached_ingest_naver_econ_news()
+    except Exception:
+        pass
+    items, _ = load_news(limit=limit)
+    return items or fetch_naver_econ_news(limit=limit)
+
+def start_news_summary_job() -> tuple[dict | None, NewsSummaryJob | None]:
+    items = _news_for_summary(limit=25)
+    return news_summary_jobs.start(items)
+
+def start_news_summary_scheduler(interval: float = NEWS_SUMMARY_INTERVAL) -> threading.Thread | None:
+    """interval초마다 요약 job 시작 (헤드라인이 그대로면 hash 일치로 재사용되어 LLM 호출 없음)"""
+    if interval <= 0:
+        return None
+
+    def loop():
+        while True:
+            try:
+                start_news_summary_job()
+            except Exception:
+                pass
+            time.sleep(interval)
+
+    t = threading.Thread(target=loop, name="news-summary-scheduler", daemon=True)
+    t.start()
+    return t
+
+def _job_links(job: NewsSummaryJob) -> dict:
+    return {
+        "statusUrl": f"/api/news/summary/jobs/{job.id}",
+        "streamUrl": f"/api/news/summary/jobs/{job.id}/stream",
+    }
 
 
 @app.get("/api/news/summary")
 def api_news_summary():
     """
-    새 요약 생성 + 파일 저장 + 반환
+    요약 요청:
+    - 헤드라인 묶음이 저장본과 같으면 저장본 바로 반환 (200)
+    - 아니면 백그라운드 job 시작 후 202 + jobId/statusUrl/streamUrl
+      (wait=초 를 주면 그 시간까지 완료를 기다렸다가 200으로 반환)
     """
     try:
-        items = fetch_naver_econ_news(limit=25)
-        summary = _llm_summary_if_possible(items)
-        if not summary:
-            summary = _simple_kor_summary(items)
-
-        payload = {
-            "date": datetime.now().strftime("%Y-%m-%d"),
-            "generatedAt": datetime.now().isoformat(timespec="seconds"),
-            "summary": summary,
-            "count": len(items),
-        }
-        _save_news_summary(payload)
-        return jsonify(payload)
+        wait = min(float(request.args.get("wait") or 0), 60.0)
+    except ValueError:
+        return jsonify({"error": "wait must be seconds"}), 400
+
+    try:
+        saved, job = start_news_summary_job()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+    if saved is not None:
+        return jsonify({**saved, "cached": True})
+
+    if wait > 0:
+        with job.cond:
+            job.cond.wait_for(lambda: job.status != "running", timeout=wait)
+    state = job.to_dict()
+    if state["status"] == "done":
+        return jsonify({**state["result"], "cached": False})
+    if state["status"] == "error":
+        return jsonify({"error": state["error"]}), 500
+    return jsonify({**state, **_job_links(job)}), 202
+
+
+@app.get("/api/news/summary/jobs/<job_id>")
+def api_news_summary_job(job_id: str):
+    job = news_summary_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify({**job.to_dict(), **_job_links(job)})
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def job_sse_events(job: NewsSummaryJob, sent: int, timeout: float | None = None) -> tuple[list[str], int, bool]:
+    """
+    sent 개 이후의 생성 조각(delta)과 완료/에러 이벤트. WSGI/ASGI 스트림 공용.
+    timeout 이 있으면 새 조각이나 종료를 그만큼 기다린다 (스레드), None 이면 바로 확인 (async 폴링).
+    Returns: (SSE 문자열 목록, 새 sent, 끝났는지)
+    """
+    with job.cond:
+        if timeout is not None:
+            job.cond.wait_for(lambda: len(job.chunks) > sent or job.status != "running", timeout=timeout)
+        chunks = job.chunks[sent:]
+        status, result, error = job.status, job.result, job.error
+
+    out = []
+    if chunks:
+        out.append(f"event: delta\ndata: {json.dumps({'text': ''.join(chunks)}, ensure_ascii=False)}\n\n")
+    if status == "done":
+        out.append(f"event: done\ndata: {json.dumps(result, ensure_ascii=False)}\n\n")
+    elif status == "error":
+        out.append(f"event: error\ndata: {json.dumps({'error': error}, ensure_ascii=False)}\n\n")
+    return out, sent + len(chunks), status != "running"
+
+@app.get("/api/news/summary/jobs/<job_id>/stream")
+def api_news_summary_job_stream(job_id: str):
+    """
+    event: delta  data: {"text": "..."}   생성 중 토큰 조각
+    event: done   data: 완료된 요약 payload
+    event: error  data: {"error": "..."}
+    """
+    job = news_summary_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+
+    def gen():
+        sent = 0
+        while True:
+            events, sent, finished = job_sse_events(job, sent, timeout=STREAM_HEARTBEAT)
+            yield from events
+            if finished:
+                return
+            if not events:
+                yield ": ping\n\n"
+
+    return open_stream(gen, "/api/news/summary/jobs/<job_id>/stream")
+
 
 @app.get("/api/news/summary/latest")
 def api_news_summary_latest():
+    try:
+        st = os.stat(NEWS_SUMMARY_STORE)
+        etag = f"summary.{st.st_mtime_ns:x}.{st.st_size:x}"  # 파일을 읽지 않고 stat 만으로
+    except OSError:
+        etag = None
+    if etag is not None:
+        cached = not_modified(etag, CACHE_CONTROL_SUMMARY)
+        if cached is not None:
+            return cached
+
     data = _load_news_summary()
     if not data:
         return jsonify({"error": "no summary yet"}), 404
-    return jsonify(data)
+    resp = jsonify(data)
+    return with_cache_headers(resp, etag, CACHE_CONTROL_SUMMARY) if etag is not None else resp
 
 # ---------------------------------------------------------------------
 # Stocks: search + candles (simple)
@@ -430,90 +1733,342 @@ def api_news_summary_latest():
 # - 분봉/틱봉은 "진짜 주식앱처럼" 하려면 WMCA OpenAPI TR(체결/분봉/틱봉)로 붙여야 함
 # ---------------------------------------------------------------------
 
+SISEJSON_OHLCV_COLUMNS = {"o": "시가", "h": "고가", "l": "저가", "c": "종가", "v": "거래량"}
+
+def fetch_naver_stock_columns(code: str, tf: str, start: datetime, end: datetime | None = None) -> dict:
+    """
+    [start, end] 구간 siseJson → parse_sisejson columnar 결과 (t, o, h, l, c, v?)
+    """
+    r = http_get(NAVER_SISEJSON_URL, params=sisejson_params(code, tf, start, end))
+    r.raise_for_status()
+    return stock_columns_from_sisejson(r.text)
+
+def stock_columns_from_sisejson(text: str) -> dict:
+    cols = parse_sisejson(text, SISEJSON_OHLCV_COLUMNS)
+    for name in ("o", "h", "l", "c"):
+        if name not in cols:
+            raise RuntimeError(f"siseJson: missing column {SISEJSON_OHLCV_COLUMNS[name]}")
+    return cols
+
 def fetch_naver_stock_candles(code: str, tf: str = "day", count: int = 300) -> list[dict]:
     """
     Returns candles:
       [{"time":"YYYY-MM-DD","open":..,"high":..,"low":..,"close":..,"volume":..}, ...]
     """
-    end = datetime.now()
-    start = end - timedelta(days=max(1200, count * 3))
+    start = datetime.now() - timedelta(days=max(1200, count * 3))
+    cols = fetch_naver_stock_columns(code, tf, start)
+
+    n = len(cols["t"])
+    lo = max(0, n - count)
+    vol = cols.get("v")
+
+    return [{
+        "time": _yyyymmdd_to_iso(cols["t"][i]),
+        "open": cols["o"][i],
+        "high": cols["h"][i],
+        "low": cols["l"][i],
+        "close": cols["c"][i],
+        "volume": vol[i] if vol is not None else None,
+    } for i in range(lo, n)]
 
-    params = {
-        "symbol": code,
-        "requestType": "1",
-        "startTime": _yyyymmdd(start),
-        "endTime": _yyyymmdd(end),
-        "timeframe": tf,  # "day" | "week" | "month"
-    }
-    r = requests.get(NAVER_SISEJSON_URL, params=params, headers=HEADERS, timeout=10)
-    r.raise_for_status()
+# ---------------------------------------------------------------------
+# Stocks: local OHLCV store for 1d/1w/1M (candles 테이블 + 증분 동기화)
+# ---------------------------------------------------------------------
+NAVER_TIMEFRAMES = {"1d": "day", "1w": "week", "1M": "month"}
 
-    arr = ast.literal_eval(r.text.strip())
-    header = arr[0]
-    rows = arr[1:]
+CANDLE_SYNC_INTERVAL = int(os.environ.get("CANDLE_SYNC_INTERVAL", "30"))  # 초, 이 안에선 업스트림 생략
 
-    def idx(name: str) -> int:
-        return header.index(name)
+_candle_sync_flight = _SingleFlight()
 
-    i_date = idx("날짜")
-    i_open = idx("시가")
-    i_high = idx("고가")
-    i_low  = idx("저가")
-    i_close= idx("종가")
-    i_vol  = header.index("거래량") if "거래량" in header else None
+def _history_start(count: int) -> str:
+    """count개 봉을 채우기 위해 필요한 시작일 (기존 요청 범위와 동일)"""
+    return (datetime.now() - timedelta(days=max(1200, count * 3))).strftime("%Y-%m-%d")
 
+def candle_sync_plan(code: str, tf: str, count: int) -> tuple[str, str] | None:
+    """
+    - 저장된 봉이 없거나 요청 범위가 저장 범위보다 길면: 전체 구간 1회 다운로드
+    - 그 외: 마지막 저장 봉(진행 중인 봉 갱신) ~ 오늘까지만 delta 다운로드
+    Returns: (다운로드 시작일 from_t, 저장 범위 start), CANDLE_SYNC_INTERVAL 안이면 None
+    """
+    need_start = _history_start(count)
+
+    conn = get_db()
+    row = conn.execute(
+        "SELECT start, synced_at FROM candle_sync WHERE code=? AND timeframe=?",
+        (code, tf),
+    ).fetchone()
+    last = conn.execute(
+        "SELECT MAX(t) FROM candles WHERE code=? AND timeframe=?",
+        (code, tf),
+    ).fetchone()[0]
+
+    covered = row is not None and last is not None and row[0] <= need_start
+    if covered and int(time.time()) - row[1] < CANDLE_SYNC_INTERVAL:
+        return None
+    return (last, row[0]) if covered else (need_start, need_start)
+
+def store_synced_candles(code: str, tf: str, from_t: str, start: str, cols: dict) -> None:
+    """from_t 이후를 받아온 봉으로 교체. 주/월봉은 진행 중 봉의 날짜 키가 바뀔 수 있어 delta 구간은 지우고 다시 쓴다."""
+    vol = cols.get("v")
+    rows = []
+    for i, t in enumerate(cols["t"]):
+        day = _yyyymmdd_to_iso(t)
+        rows.append((
+            code, tf, day, cols["o"][i], cols["h"][i], cols["l"][i], cols["c"][i],
+            vol[i] if vol is not None else 0.0, iso_to_epoch_seconds(day),
+        ))
+
+    conn = get_db()
+    with conn:
+        conn.execute(
+            "DELETE FROM candles WHERE code=? AND timeframe=? AND t>=?",
+            (code, tf, from_t),
+        )
+        conn.executemany("""
+            INSERT OR REPLACE INTO candles (code, timeframe, t, o, h, l, c, v, ts)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        conn.execute("""
+            INSERT OR REPLACE INTO candle_sync (code, timeframe, start, synced_at)
+            VALUES (?, ?, ?, ?)
+        """, (code, tf, start, int(time.time())))
+        bump_candle_versions(conn, [(code, tf)])
+
+def _sync_stock_candles(code: str, tf: str, count: int) -> None:
+    plan = candle_sync_plan(code, tf, count)
+    if plan is None:
+        return
+    from_t, start = plan
+    cols = fetch_naver_stock_columns(code, NAVER_TIMEFRAMES[tf], datetime.strptime(from_t, "%Y-%m-%d"))
+    store_synced_candles(code, tf, from_t, start, cols)
+
+def sync_stock_candles(code: str, tf: str, count: int) -> None:
+    """같은 (code, tf)의 동시 요청은 한 번만 업스트림에 간다."""
+    _candle_sync_flight.do((code, tf), lambda: _sync_stock_candles(code, tf, count))
+
+# 수집기(collector.py)가 주기적으로 갱신하는 구독 종목은 사용자 읽기 경로에서 업스트림을 부르지 않는다.
+# 수집이 COLLECTOR_MAX_AGE 넘게 멈추면 일반 종목처럼 읽기 경로에서 동기화.
+COLLECTOR_TIMEFRAMES = tuple(
+    tf for tf in os.environ.get("COLLECTOR_TIMEFRAMES", "1d").split(",") if tf in NAVER_TIMEFRAMES
+)
+COLLECTOR_MAX_AGE = int(os.environ.get("COLLECTOR_MAX_AGE", "600"))  # 초
+
+def stale_candle_codes(codes: list[str], tf: str, count: int) -> list[str]:
+    """_sync_stock_candles 와 같은 기준(+구독 종목은 수집기 주기)으로 동기화가 필요한 code만 (쿼리 한 번)"""
+    need_start = _history_start(count)
+    now = int(time.time())
+    max_age = COLLECTOR_MAX_AGE if tf in COLLECTOR_TIMEFRAMES else 0
+    marks = ",".join("?" * len(codes))
+    fresh = set()
+    for code, start, synced_at, last, subscribed in get_db().execute(f"""
+        SELECT s.code, s.start, s.synced_at,
+               (SELECT MAX(t) FROM candles c WHERE c.code=s.code AND c.timeframe=s.timeframe),
+               EXISTS (SELECT 1 FROM subscriptions u WHERE u.code=s.code AND u.enabled=1)
+        FROM candle_sync s
+        WHERE s.timeframe=? AND s.code IN ({marks})
+    """, (tf, *codes)):
+        age = now - synced_at
+        if last is not None and start <= need_start and (age < CANDLE_SYNC_INTERVAL or (subscribed and age < max_age)):
+            fresh.add(code)
+    return [c for c in codes if c not in fresh]
+
+def ensure_stock_candles(code: str, tf: str, count: int) -> None:
+    """사용자 읽기 경로: 저장본이 최신이 아닐 때만 delta 동기화"""
+    if stale_candle_codes([code], tf, count):
+        sync_stock_candles(code, tf, count)
+
+def bump_candle_versions(conn: sqlite3.Connection, keys: list[tuple[str, str]]) -> None:
+    """쓰기 트랜잭션 안에서 호출: (code, timeframe) 저장본 버전 +1"""
+    conn.executemany("""
+        INSERT INTO candle_versions (code, timeframe, version) VALUES (?, ?, 1)
+        ON CONFLICT(code, timeframe) DO UPDATE SET version = version + 1
+    """, keys)
+
+def candle_etag(code: str, tf: str, fmt: str) -> str:
+    """분봉 집계(3m~60m)는 1m 저장본 버전을 따른다. 같은 URL 안에서 포맷(Accept)별로 다른 ETag"""
+    source_tf = "1m" if tf in RESAMPLE_TIMEFRAMES else tf
+    row = get_db().execute(
+        "SELECT version FROM candle_versions WHERE code=? AND timeframe=?", (code, source_tf)
+    ).fetchone()
+    return f"{tf}.{row[0] if row else 0}.{fmt}"
+
+def _stored_candle_rows(code: str, tf: str, count: int, since: str | None = None) -> list[tuple]:
+    """최신 count개 (since 가 있으면 그 날짜 키 이후만, 진행 중인 마지막 봉 포함)"""
+    rows = get_db().execute("""
+        SELECT t, o, h, l, c, v
+        FROM candles
+        WHERE code=? AND timeframe=? AND t>=?
+        ORDER BY t DESC
+        LIMIT ?
+    """, (code, tf, since or "", count)).fetchall()
+    rows.reverse()
+    return rows
+
+
+# ---------------------------------------------------------------------
+# Stocks: name/code search index (stocks_master.json → 메모리 인덱스)
+# ---------------------------------------------------------------------
+STOCKS_MASTER_PATH = os.environ.get("STOCKS_MASTER_PATH", os.path.join(os.path.dirname(__file__), "stocks_master.json"))
+STOCKS_MASTER_CHECK_INTERVAL = 1.0  # 초, 파일 mtime 확인 주기
+
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_CHOSEONG_SET = frozenset(CHOSEONG)
+
+def to_choseong(s: str) -> str:
+    """'삼성전자' → 'ㅅㅅㅈㅈ' (한글 음절 외 문자는 그대로)"""
     out = []
-    for row in rows:
-        try:
-            d = row[i_date]  # "20220103"
-            t = datetime.strptime(d, "%Y%m%d").strftime("%Y-%m-%d")
-            out.append({
-                "time": t,
-                "open": _to_float(row[i_open]),
-                "high": _to_float(row[i_high]),
-                "low":  _to_float(row[i_low]),
-                "close": _to_float(row[i_close]),
-                "volume": _to_float(row[i_vol]) if i_vol is not None else None,
-            })
-        except Exception:
-            continue
+    for ch in s:
+        o = ord(ch)
+        if 0xAC00 <= o <= 0xD7A3:
+            out.append(CHOSEONG[(o - 0xAC00) // 588])
+        else:
+            out.append(ch)
+    return "".join(out)
+
+def _norm_name(s: str) -> str:
+    return "".join(str(s).lower().split())
+
+def _prefix_range(keys: list[str], prefix: str) -> range:
+    lo = bisect.bisect_left(keys, prefix)
+    hi = bisect.bisect_left(keys, prefix + "\uffff")
+    return range(lo, hi)
+
+class _SearchSnapshot(NamedTuple):
+    """한 번에 만들어 통째로 교체하는 검색 인덱스 (search 는 락 없이 하나의 참조만 읽음)"""
+    items: list[dict]
+    names: list[str]      # 정규화 이름 (items와 같은 순서)
+    chos: list[str]
+    code_of: dict[str, int]
+    # 정렬된 key 목록 + 해당 items 인덱스 (bisect로 prefix 범위 탐색)
+    name_keys: list[str]
+    name_ids: list[int]
+    code_keys: list[str]
+    code_ids: list[int]
+    cho_keys: list[str]
+    cho_ids: list[int]
+
+_EMPTY_SEARCH_SNAPSHOT = _SearchSnapshot([], [], [], {}, [], [], [], [], [], [])
+
+class StockSearchIndex:
+    """
+    종목명/코드 검색 인덱스. 파일 mtime이 바뀌면 다시 만든다.
+    랭킹(작을수록 위): 정확히 일치 < 이름 prefix < 코드 prefix < 초성 prefix < 이름 포함 < 초성 포함
+    같은 랭크는 이름이 짧은 순.
+    """
 
-    return out[-count:]
+    RANK_EXACT, RANK_PREFIX, RANK_CODE, RANK_CHO_PREFIX, RANK_SUBSTR, RANK_CHO_SUBSTR = range(6)
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self._snap = _EMPTY_SEARCH_SNAPSHOT
+
+    @staticmethod
+    def _build(master: list) -> _SearchSnapshot:
+        items = []
+        for it in master:
+            if not isinstance(it, dict):
+                continue
+            code = str(it.get("code") or "").strip()
+            name = str(it.get("name") or "").strip()
+            if code and name:
+                items.append({"code": code, "name": name})
+
+        names = [_norm_name(it["name"]) for it in items]
+        chos = [to_choseong(n) for n in names]
+
+        def sorted_keys(keys):
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            return [keys[i] for i in order], order
+
+        return _SearchSnapshot(
+            items, names, chos, {it["code"]: i for i, it in enumerate(items)},
+            *sorted_keys(names), *sorted_keys([it["code"] for it in items]), *sorted_keys(chos),
+        )
 
+    def _ensure_fresh(self) -> _SearchSnapshot:
+        now = time.monotonic()
+        if now - self._checked_at < STOCKS_MASTER_CHECK_INTERVAL and self._mtime is not None:
+            return self._snap
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime == self._mtime and (mtime is not None or not self._snap.items):
+                return self._snap
+            master = []
+            if mtime is not None:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        master = json.load(f)  # [{"code":"005930","name":"삼성전자"}, ...]
+                except Exception:
+                    return self._snap  # 쓰는 도중 등 → 기존 인덱스 유지, 다음 확인 때 재시도
+            self._snap = self._build(master if isinstance(master, list) else [])  # 한 번의 대입으로 교체
+            self._mtime = mtime
+            return self._snap
+
+    def name_of(self, code: str) -> str | None:
+        snap = self._ensure_fresh()
+        i = snap.code_of.get(code)
+        return snap.items[i]["name"] if i is not None else None
+
+    def search(self, q: str, limit: int = 20) -> list[dict]:
+        snap = self._ensure_fresh()  # 도중에 reload 되어도 이 검색은 같은 스냅샷만 본다
+        qn = _norm_name(q)
+        if not qn:
+            return []
+
+        best: dict[int, int] = {}
+
+        def hit(i: int, rank: int) -> None:
+            if rank < best.get(i, 99):
+                best[i] = rank
+
+        is_cho = all(ch in _CHOSEONG_SET for ch in qn)
+
+        for k in _prefix_range(snap.name_keys, qn):
+            i = snap.name_ids[k]
+            hit(i, self.RANK_EXACT if snap.names[i] == qn else self.RANK_PREFIX)
+        if qn.isdigit():
+            for k in _prefix_range(snap.code_keys, qn):
+                i = snap.code_ids[k]
+                hit(i, self.RANK_EXACT if snap.items[i]["code"] == qn else self.RANK_CODE)
+        if is_cho:
+            for k in _prefix_range(snap.cho_keys, qn):
+                hit(snap.cho_ids[k], self.RANK_CHO_PREFIX)
+
+        # 포함 검색은 선형 스캔이지만 정규화 문자열에 대한 `in` 뿐이라 수천 건에서 충분히 빠름
+        for i, name in enumerate(snap.names):
+            if qn in name:
+                hit(i, self.RANK_SUBSTR)
+        if is_cho:
+            for i, cho in enumerate(snap.chos):
+                if qn in cho:
+                    hit(i, self.RANK_CHO_SUBSTR)
+
+        ranked = sorted(best, key=lambda i: (best[i], len(snap.names[i]), snap.names[i]))
+        return [dict(snap.items[i]) for i in ranked[:limit]]
+
+stock_search_index = StockSearchIndex(STOCKS_MASTER_PATH)
 
 @app.get("/api/stocks/search")
 def api_stocks_search():
     """
-    아주 단순 버전:
-    - 6자리 숫자면 그 코드 그대로 반환(이름은 code로 표시)
-    - 종목명 검색은: (1) WMCA 코드리스트 TR로 DB 구축 or (2) 별도 코드리스트 파일 준비 필요
+    - 6자리 숫자면 그 코드 그대로 반환(마스터에 있으면 종목명 포함)
+    - 그 외: 종목명 prefix/포함, 초성(ㅅㅅㅈㅈ), 코드 prefix 검색 (stocks_master.json 메모리 인덱스)
     """
     q = (request.args.get("q") or "").strip()
-    items = []
 
     m = re.search(r"(\d{6})", q)
     if m:
         code = m.group(1)
-        items.append({"code": code, "name": code})
-        return jsonify({"items": items})
+        return jsonify({"items": [{"code": code, "name": stock_search_index.name_of(code) or code}]})
 
-    # TODO: 여기부터는 "종목명->코드" 매핑 테이블이 있어야 함
-    # 예: stocks_master.json을 만들어두고 검색
-    master_path = os.path.join(os.path.dirname(__file__), "stocks_master.json")
-    try:
-        if os.path.exists(master_path) and q:
-            with open(master_path, "r", encoding="utf-8") as f:
-                master = json.load(f)  # [{"code":"005930","name":"삼성전자"}, ...]
-            q_low = q.lower()
-            for it in master:
-                if q_low in str(it.get("name","")).lower():
-                    items.append({"code": it["code"], "name": it["name"]})
-                if len(items) >= 20:
-                    break
-    except Exception:
-        pass
-
-    return jsonify({"items": items})
+    return jsonify({"items": stock_search_index.search(q, limit=20)})
 
 @app.post("/api/subscribe")
 def api_subscribe():
@@ -523,14 +2078,12 @@ def api_subscribe():
     if not re.fullmatch(r"\d{6}", code):
         return jsonify({"error": "code must be 6 digits"}), 400
 
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT OR REPLACE INTO subscriptions (code, enabled, updated_at)
-        VALUES (?, 1, ?)
-    """, (code, datetime.now().isoformat(timespec="seconds")))
-    conn.commit()
-    conn.close()
+    conn = get_db()
+    with conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO subscriptions (code, enabled, updated_at)
+            VALUES (?, 1, ?)
+        """, (code, datetime.now().isoformat(timespec="seconds")))
 
     return jsonify({"ok": True, "code": code})
 
@@ -543,35 +2096,340 @@ def api_unsubscribe():
     if not re.fullmatch(r"\d{6}", code):
         return jsonify({"error": "code must be 6 digits"}), 400
 
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("DELETE FROM subscriptions WHERE code=?", (code,))
-    conn.commit()
-    conn.close()
+    conn = get_db()
+    with conn:
+        conn.execute("DELETE FROM subscriptions WHERE code=?", (code,))
 
     return jsonify({"ok": True, "code": code})
 
+ACCESS_FLUSH_INTERVAL = float(os.environ.get("ACCESS_FLUSH_INTERVAL", "5"))  # 초
+
+class AccessLog:
+    """차트 조회를 메모리에 모았다가 ACCESS_FLUSH_INTERVAL 마다 code_access 에 한 번에 기록"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: dict[str, list] = {}  # code -> [last_access, hits]
+        self._flushed_at = time.monotonic()
+
+    def record(self, code: str) -> None:
+        now = int(time.time())
+        with self._lock:
+            p = self._pending.setdefault(code, [now, 0])
+            p[0] = now
+            p[1] += 1
+            due = time.monotonic() - self._flushed_at >= ACCESS_FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed_at = time.monotonic()
+        if not pending:
+            return
+        conn = get_db()
+        with conn:
+            conn.executemany("""
+                INSERT INTO code_access (code, last_access, hits) VALUES (?, ?, ?)
+                ON CONFLICT(code) DO UPDATE SET
+                    last_access = MAX(last_access, excluded.last_access),
+                    hits = hits + excluded.hits
+            """, [(code, last, hits) for code, (last, hits) in pending.items()])
+
+access_log = AccessLog()
+
 @app.get("/api/internal/subscriptions")
 def api_internal_subscriptions():
     auth = _require_push_token()
     if auth:
         return auth
 
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("""
+    rows = get_db().execute("""
         SELECT code
         FROM subscriptions
         WHERE enabled=1
         ORDER BY updated_at DESC
         LIMIT 200
-    """)
-    rows = cur.fetchall()
-    conn.close()
+    """).fetchall()
 
     return jsonify({"codes": [r[0] for r in rows]})
 
 
+# ---------------------------------------------------------------------
+# Candle streaming (SSE)
+# - push로 들어온 1m 봉 중 새로 쓰이거나 갱신된 봉만 구독 중인 브라우저로 전달
+# - 이벤트 id = 봉 ts. 재접속 시 Last-Event-ID(또는 since) 이후 봉을 DB에서 다시 보내고 이어서 실시간 전달
+# ---------------------------------------------------------------------
+STREAM_HEARTBEAT = float(os.environ.get("STREAM_HEARTBEAT", "15"))     # 초, 이벤트 없을 때 ping + DB 확인
+STREAM_MAX_SECONDS = float(os.environ.get("STREAM_MAX_SECONDS", "300"))  # 연결 수명, 이후 브라우저가 자동 재접속
+STREAM_QUEUE_SIZE = 1000
+# gthread 워커에선 스트림 하나가 요청 스레드 하나를 끝날 때까지 잡는다. 워커당 동시 스트림을 스레드의 절반으로
+# 제한해 나머지 경로(캘린더/검색/push/캔들)가 쓸 스레드를 남기고, 초과분은 바로 503 → 브라우저는 폴링으로 대체.
+# (ASGI 경로의 스트림은 코루틴이라 이 제한을 쓰지 않는다)
+STREAM_MAX_PER_WORKER = int(os.environ.get("STREAM_MAX_PER_WORKER", str(max(1, int(os.environ.get("WEB_THREADS", "16")) // 2))))
+STREAM_RETRY_AFTER = 30  # 초, 503 응답의 Retry-After
+
+class StreamSlots:
+    """프로세스 내 동시 SSE 스트림 수 상한 (초과 시 대기하지 않고 바로 거절)"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Returns: 한 번만 반납되는 release 함수, 자리가 없으면 None"""
+        with self._lock:
+            if self.active >= self.limit:
+                return None
+            self.active += 1
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            with self._lock:
+                if not released:
+                    released = True
+                    self.active -= 1
+
+        return release
+
+stream_slots = StreamSlots(STREAM_MAX_PER_WORKER)
+streams_rejected = metrics.counter("http_streams_rejected_total", "SSE streams refused with 503 (worker stream cap).", ("route",))
+
+def open_stream(gen_fn, route: str) -> Response:
+    """
+    스트림 자리를 잡고 SSE 응답을 만든다. 자리는 응답이 닫힐 때(정상 종료/클라이언트 끊김, 본문을 시작하기 전이라도) 반납.
+    gen_fn: () → SSE 문자열 generator
+    """
+    release = stream_slots.try_acquire()
+    if release is None:
+        streams_rejected.inc((route,))
+        resp = jsonify({"error": "too many open streams on this worker, poll instead"})
+        resp.status_code = 503
+        resp.headers["Retry-After"] = str(STREAM_RETRY_AFTER)
+        return resp
+    resp = Response(stream_with_context(gen_fn()), mimetype="text/event-stream", headers=SSE_HEADERS)
+    resp.call_on_close(release)
+    return resp
+
+class CandleBroker:
+    """
+    프로세스 내 code별 구독 큐. 큐가 가득 찬 느린 구독자는 이벤트를 건너뛰고
+    heartbeat 때 DB 확인으로 따라잡는다 (다른 워커 프로세스에서 push된 봉도 같은 경로로 전달).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs: dict[str, set[queue.Queue]] = {}
+
+    def subscribe(self, code: str, q=None):
+        """q: put_nowait(bar) 가 있는 구독자 (기본 queue.Queue, ASGI 스트림은 event loop 로 넘기는 어댑터)"""
+        if q is None:
+            q = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        with self._lock:
+            self._subs.setdefault(code, set()).add(q)
+        return q
+
+    def unsubscribe(self, code: str, q) -> None:
+        with self._lock:
+            subs = self._subs.get(code)
+            if subs is not None:
+                subs.discard(q)
+                if not subs:
+                    del self._subs[code]
+
+    def publish_rows(self, rows: list[tuple]) -> None:
+        """rows: _minute_rows 형식 (code, t, o, h, l, c, v, ts)"""
+        with self._lock:
+            if not self._subs:
+                return
+            targets = {code: list(subs) for code, subs in self._subs.items()}
+
+        for code, t, o, h, l, c, v, ts in rows:
+            for q in targets.get(code, ()):
+                try:
+                    q.put_nowait((ts, o, h, l, c, v))
+                except queue.Full:
+                    pass
+
+candle_broker = CandleBroker()
+
+def _sse_bar(bar: tuple) -> str:
+    ts, o, h, l, c, v = bar
+    data = json.dumps({"time": ts, "open": o, "high": h, "low": l, "close": c, "volume": v})
+    return f"id: {ts}\nevent: bar\ndata: {data}\n\n"
+
+class BarDedup:
+    """SSE 로 보낸 봉 기억 (같은 값 재전송 방지) + 마지막 봉 시각 (heartbeat 때 DB 확인 시작점). WSGI/ASGI 스트림 공용"""
+
+    def __init__(self, resume: int | None):
+        self.sent: dict[int, tuple] = {}
+        self.last_ts = resume
+
+    def events(self, bars) -> list[str]:
+        out = []
+        for bar in bars:
+            if self.sent.get(bar[0]) == bar:
+                continue
+            if len(self.sent) > 64:
+                self.sent.clear()
+            self.sent[bar[0]] = bar
+            self.last_ts = bar[0] if self.last_ts is None else max(self.last_ts, bar[0])
+            out.append(_sse_bar(bar))
+        return out
+
+def parse_stream_request(code: str | None, tf: str | None, last_event_id: str | None, since: str | None) -> tuple[str, int | None]:
+    """Returns: (code, resume epoch 또는 None). 잘못된 값은 ValueError(응답 메시지)"""
+    code = (code or "").strip()
+    if not re.fullmatch(r"\d{6}", code):
+        raise ValueError("code must be 6 digits")
+    if (tf or "1m").strip() != "1m":
+        raise ValueError("only tf=1m can be streamed")
+    try:
+        return code, int(last_event_id or since or 0) or None
+    except ValueError:
+        raise ValueError("since must be epoch seconds") from None
+
+@app.get("/api/stocks/stream")
+def api_stocks_stream():
+    """
+    query:
+      code=6자리, since=epoch(optional, Last-Event-ID 헤더가 우선)
+    event: bar  data: {time, open, high, low, close, volume}  (1m)
+    """
+    try:
+        code, resume = parse_stream_request(
+            request.args.get("code"), request.args.get("tf"), request.headers.get("Last-Event-ID"), request.args.get("since"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def gen():
+        q = candle_broker.subscribe(code)
+        dedup = BarDedup(resume)
+        try:
+            yield "retry: 3000\n\n"
+            if resume is not None:
+                yield from dedup.events(load_minute_rows(code, MAX_CANDLES, ts_from=resume))
+
+            deadline = time.monotonic() + STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                try:
+                    bars = [q.get(timeout=STREAM_HEARTBEAT)]
+                    while True:
+                        try:
+                            bars.append(q.get_nowait())
+                        except queue.Empty:
+                            break
+                    yield from dedup.events(bars)
+                except queue.Empty:
+                    if dedup.last_ts is not None:
+                        yield from dedup.events(load_minute_rows(code, MAX_CANDLES, ts_from=dedup.last_ts))
+                    yield ": ping\n\n"
+        finally:
+            candle_broker.unsubscribe(code, q)
+
+    return open_stream(gen, "/api/stocks/stream")
+
+MAX_PUSH_ROWS = int(os.environ.get("MAX_PUSH_ROWS", "50000"))
+
+_PUSH_NAN_ROW = (math.nan,) * 5
+
+def _float_or_nan(x) -> float:
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return math.nan
+
+def _naive_iso_mask(ts: list) -> np.ndarray:
+    """'YYYY-MM-DD[T ]HH:MM[:SS]' 모양(오프셋 없는 naive 시각)인 항목 mask. 문자열을 코드포인트 행렬로 보고 한 번에 검사"""
+    n = len(ts)
+    if not all(type(t) is str for t in ts):
+        mask = np.zeros(n, dtype=bool)
+        idx = [i for i, t in enumerate(ts) if type(t) is str]
+        if idx:
+            mask[idx] = _naive_iso_mask([ts[i] for i in idx])
+        return mask
+    a = np.array(ts, dtype=str)
+    if a.dtype.itemsize // 4 < 16:
+        return np.zeros(n, dtype=bool)
+    cp = a.view(np.uint32).reshape(n, -1)
+    length = (cp != 0).sum(axis=1)
+    mask = (cp[:, 4] == ord("-")) & (cp[:, 7] == ord("-")) & (cp[:, 13] == ord(":"))
+    mask &= (cp[:, 10] == ord("T")) | (cp[:, 10] == ord(" "))
+    if cp.shape[1] >= 17:
+        mask &= (length == 16) | ((length == 19) & (cp[:, 16] == ord(":")))
+    else:
+        mask &= length == 16
+    return mask
+
+def _local_epochs(ts: list[str]) -> np.ndarray:
+    """
+    naive ISO 시각 목록 → iso_to_epoch_seconds 와 같은 epoch (로컬 시간대 기준).
+    파싱은 numpy 로 한 번에, 로컬 오프셋은 서로 다른 '시' 마다 한 번만 계산 (DST 전환도 시 단위).
+    """
+    wall = np.array(ts, dtype="datetime64[s]").astype(np.int64)  # 벽시계 시각을 UTC 처럼 센 초
+    hours = wall - wall % 3600
+    uniq, inv = np.unique(hours, return_inverse=True)
+    epoch0 = datetime(1970, 1, 1)
+    offsets = np.array([int((epoch0 + timedelta(seconds=h)).timestamp()) - h for h in uniq.tolist()], dtype=np.int64)
+    return wall + offsets[inv]
+
+def _minute_rows(code: str, candles: list) -> tuple[list[tuple], int]:
+    """
+    push 페이로드 → INSERT용 튜플. 변환 안 되는 행(필드 누락/숫자 아님/NaN/잘못된 시각)은 reject.
+    필드 추출만 행 단위이고, 숫자 변환·유한성 검사·시각 형식 검사/파싱은 numpy 로 배치 전체를 한 번에 한다.
+    Returns: (rows, rejected)
+    """
+    n = len(candles)
+    if not n:
+        return [], 0
+    ts, raw = [], []
+    for cndl in candles:
+        try:
+            t, r = cndl["t"], (cndl["o"], cndl["h"], cndl["l"], cndl["c"], cndl["v"])
+        except (KeyError, TypeError, IndexError):
+            t, r = None, _PUSH_NAN_ROW
+        ts.append(t)
+        raw.append(r)
+
+    try:
+        vals = np.array(raw, dtype=np.float64)  # 숫자/숫자 문자열뿐이면 한 번에 변환
+    except (TypeError, ValueError):
+        vals = np.array([[_float_or_nan(x) for x in r] for r in raw], dtype=np.float64).reshape(n, 5)
+    ok = np.isfinite(vals).all(axis=1)
+
+    # 표준 형식 시각은 한 번에 파싱, 그 외(오프셋 포함 등)만 fromisoformat 으로 개별 처리
+    epochs = np.zeros(n, dtype=np.int64)
+    std = _naive_iso_mask(ts) & ok
+    idx = np.flatnonzero(std)
+    try:
+        epochs[idx] = _local_epochs([ts[i] for i in idx.tolist()] if len(idx) < n else ts)
+    except ValueError:
+        std[:] = False  # 범위 밖 날짜 등 → 전부 개별 처리
+    for i in np.flatnonzero(~std & ok).tolist():
+        try:
+            epochs[i] = iso_to_epoch_seconds(ts[i])
+        except Exception:
+            ok[i] = False
+
+    if ok.all():
+        kept_ts, cols, eps = ts, vals.T.tolist(), epochs.tolist()
+    else:
+        keep = np.flatnonzero(ok)
+        kept_ts, cols, eps = [ts[i] for i in keep.tolist()], vals[keep].T.tolist(), epochs[keep].tolist()
+    rows = list(zip(itertools.repeat(code, len(eps)), kept_ts, *cols, eps))
+    return rows, n - len(rows)
+
+def _write_minute_rows(conn: sqlite3.Connection, rows: list[tuple]) -> None:
+    conn.executemany("""
+        INSERT OR REPLACE INTO candles (code, timeframe, t, o, h, l, c, v, ts)
+        VALUES (?, '1m', ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    bump_candle_versions(conn, [(code, "1m") for code in {r[0] for r in rows}])
+
 @app.post("/api/internal/push/candles")
 def push_candles():
     token = request.headers.get("X-PUSH-TOKEN", "")
@@ -587,29 +2445,290 @@ def push_candles():
 
     if not isinstance(candles, list) or not candles:
         return jsonify({"error": "candles must be a non-empty list"}), 400
+    if len(candles) > MAX_PUSH_ROWS:
+        return jsonify({"error": f"too many candles (max {MAX_PUSH_ROWS})"}), 413
 
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+    rows, rejected = _minute_rows(code, candles)
 
-    for cndl in candles:
-        try:
-            t = cndl["t"]
-            o = float(cndl["o"]); h = float(cndl["h"]); l = float(cndl["l"]); c = float(cndl["c"]); v = float(cndl["v"])
-        except Exception:
+    conn = get_db()
+    with conn:
+        _write_minute_rows(conn, rows)
+    candle_broker.publish_rows(rows)
+    indicator_cache.on_minute_rows(rows)
+    return jsonify({"status": "ok", "accepted": len(rows), "rejected": rejected})
+
+@app.post("/api/internal/push/candles/bulk")
+def push_candles_bulk():
+    """
+    body json:
+      { "items": [ {"code":"005930", "candles":[{t,o,h,l,c,v}, ...]}, ... ] }
+    여러 종목을 한 트랜잭션(executemany)으로 기록하고 종목별 accept/reject 수를 돌려준다.
+    """
+    auth = _require_push_token()
+    if auth:
+        return auth
+
+    data = request.get_json(silent=True) or {}
+    items = data.get("items")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "items must be a non-empty list"}), 400
+    # 검증에 CPU 를 쓰기 전에 제출된 행 수로 먼저 거절
+    submitted = sum(len(it["candles"]) for it in items if isinstance(it, dict) and isinstance(it.get("candles"), list))
+    if submitted > MAX_PUSH_ROWS:
+        return jsonify({"error": f"too many candles (max {MAX_PUSH_ROWS})"}), 413
+
+    rows = []
+    per_code = {}
+    for it in items:
+        it = it if isinstance(it, dict) else {}
+        code = str(it.get("code") or "").strip()
+        candles = it.get("candles")
+        candles = candles if isinstance(candles, list) else []
+
+        stat = per_code.setdefault(code, {"accepted": 0, "rejected": 0})
+        if not re.fullmatch(r"\d{6}", code):
+            stat["rejected"] += len(candles)
+            stat["error"] = "code must be 6 digits"
             continue
 
-        cur.execute("""
-            INSERT OR REPLACE INTO candles (code, timeframe, t, o, h, l, c, v)
-            VALUES (?, '1m', ?, ?, ?, ?, ?, ?)
-        """, (code, t, o, h, l, c, v))
+        ok, rejected = _minute_rows(code, candles)
+        rows.extend(ok)
+        stat["accepted"] += len(ok)
+        stat["rejected"] += rejected
 
-    conn.commit()
-    conn.close()
-    return jsonify({"status": "ok"})
+    conn = get_db()
+    with conn:
+        _write_minute_rows(conn, rows)
+    candle_broker.publish_rows(rows)
+    indicator_cache.on_minute_rows(rows)
+
+    return jsonify({
+        "status": "ok",
+        "accepted": len(rows),
+        "rejected": sum(s["rejected"] for s in per_code.values()),
+        "codes": per_code,
+    })
+
+@app.get("/api/internal/cache/stats")
+def api_internal_cache_stats():
+    auth = _require_push_token()
+    if auth:
+        return auth
+    return jsonify(upstream_cache.stats())
+
+@app.get("/api/internal/metrics")
+def api_internal_metrics():
+    """Prometheus text format (scrape 시 X-PUSH-TOKEN 헤더 필요)"""
+    auth = _require_push_token()
+    if auth:
+        return auth
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
 def iso_to_epoch_seconds(t: str) -> int:
     return int(datetime.fromisoformat(t).timestamp())
 
+MAX_CANDLES = 10000
+
+def load_minute_rows(
+    code: str,
+    limit: int,
+    ts_from: int = 0,
+    ts_to: int | None = None,
+    before: int | None = None,
+) -> list[tuple]:
+    """
+    (code, '1m', ts) 인덱스를 역순으로 limit개만 읽는다.
+    Returns: 시간 오름차순 [(ts, o, h, l, c, v), ...]
+    """
+    upper = (ts_to + 1) if ts_to is not None else None
+    if before is not None:
+        upper = before if upper is None else min(upper, before)
+
+    sql = """
+        SELECT ts, o, h, l, c, v
+        FROM candles
+        WHERE code=? AND timeframe='1m' AND ts>=?
+    """
+    params = [code, ts_from]
+    if upper is not None:
+        sql += " AND ts<?"
+        params.append(upper)
+    sql += " ORDER BY ts DESC LIMIT ?"
+    params.append(limit)
+
+    rows = get_db().execute(sql, params).fetchall()
+    rows.reverse()
+    return rows
+
+# ---------------------------------------------------------------------
+# Resampling (1m → 상위 분봉)
+# ---------------------------------------------------------------------
+RESAMPLE_TIMEFRAMES = {"3m": 3, "5m": 5, "15m": 15, "30m": 30, "60m": 60}
+
+def resample_bars(rows, minutes: int) -> list[tuple]:
+    """
+    rows: 시간 오름차순 (epoch, o, h, l, c, v) 1m 봉
+    Returns: 같은 형태의 minutes분 봉. 한 번 순회로 집계하며 봉 시각은 구간 시작(epoch 정렬).
+    """
+    step = minutes * 60
+    out = []
+    cur = None
+    for ts, o, h, l, c, v in rows:
+        bucket = ts - ts % step
+        if cur is not None and cur[0] == bucket:
+            if h > cur[2]:
+                cur[2] = h
+            if l < cur[3]:
+                cur[3] = l
+            cur[4] = c
+            cur[5] += v
+        else:
+            if cur is not None:
+                out.append(tuple(cur))
+            cur = [bucket, o, h, l, c, v]
+    if cur is not None:
+        out.append(tuple(cur))
+    return out
+
+def load_resampled_rows(code: str, minutes: int, count: int, since: int | None = None) -> list[tuple]:
+    """최신 count개 minutes분 봉 [(epoch, o, h, l, c, v), ...] (since 가 있으면 그 봉이 속한 구간부터)"""
+    # 구간당 1m 봉은 최대 minutes개 → count+1 구간을 덮는 만큼만 읽고, 잘렸을 수 있는 맨 앞 구간은 버림
+    limit = (count + 1) * minutes
+    ts_from = since - since % (minutes * 60) if since is not None else 0
+    rows = load_minute_rows(code, limit, ts_from=ts_from)
+
+    bars = resample_bars(rows, minutes)
+    if len(rows) == limit:
+        bars = bars[1:]
+    return bars[-count:]
+
+# ---------------------------------------------------------------------
+# Candle wire formats (Accept 협상: 기본 JSON / columnar JSON / packed binary)
+# ---------------------------------------------------------------------
+CANDLES_COLUMNS_MIMETYPE = "application/vnd.candles+json"
+CANDLES_BINARY_MIMETYPE = "application/vnd.candles"
+CANDLE_FORMATS = {"application/json": "json", CANDLES_COLUMNS_MIMETYPE: "columns", CANDLES_BINARY_MIMETYPE: "binary"}
+CANDLE_GZIP_MIN_BYTES = int(os.environ.get("CANDLE_GZIP_MIN_BYTES", "2048"))
+# 같은 URL 이 Accept(형식)와 Accept-Encoding(gzip)에 따라 달라지므로 200/304 모두 같은 Vary (공유 캐시 키 일치)
+CANDLE_VARY = "Accept, Accept-Encoding"
+
+CANDLE_COLUMNS = ("time", "open", "high", "low", "close", "volume")
+
+def candle_columns(rows) -> dict:
+    """(time, o, h, l, c, v) 행 목록 → 병렬 배열 {"time": [...], "open": [...], ...}"""
+    cols = list(zip(*rows)) or [()] * len(CANDLE_COLUMNS)
+    return {name: list(col) for name, col in zip(CANDLE_COLUMNS, cols)}
+
+# binary 레이아웃 (little-endian):
+#   header  "<4sBBHI" = b"CNDL", version=1, time_kind(0=epoch 초, 1=YYYYMMDD), reserved, n
+#   time    int64[n]
+#   open, high, low, close, volume  float64[n] 각각 (열 단위로 연속, volume 없음=NaN)
+CANDLES_BINARY_HEADER = struct.Struct("<4sBBHI")
+CANDLES_BINARY_MAGIC = b"CNDL"
+
+def pack_candles(rows) -> bytes:
+    """(time, o, h, l, c, v) 행 → packed binary. time 이 'YYYY-MM-DD' 문자열이면 YYYYMMDD 정수로"""
+    n = len(rows)
+    daily = n > 0 and isinstance(rows[0][0], str)
+    if daily:
+        times = np.fromiter((int(r[0].replace("-", "")) for r in rows), dtype="<i8", count=n)
+        vals = np.array([r[1:] for r in rows], dtype="<f8").reshape(n, 5)
+    else:
+        arr = np.array(rows, dtype="<f8").reshape(n, 6)
+        times, vals = arr[:, 0].astype("<i8"), arr[:, 1:]
+    return b"".join((
+        CANDLES_BINARY_HEADER.pack(CANDLES_BINARY_MAGIC, 1, 1 if daily else 0, 0, n),
+        times.tobytes(),
+        np.ascontiguousarray(vals.T).tobytes(),
+    ))
+
+def unpack_candles(buf: bytes) -> dict:
+    """pack_candles 역변환 (테스트/파이썬 클라이언트용) → {"time_kind", "time", "open", ...} ndarray"""
+    magic, version, kind, _, n = CANDLES_BINARY_HEADER.unpack_from(buf)
+    if magic != CANDLES_BINARY_MAGIC or version != 1:
+        raise ValueError("not a candles v1 payload")
+    off = CANDLES_BINARY_HEADER.size
+    out = {"time_kind": kind, "time": np.frombuffer(buf, "<i8", n, off)}
+    off += 8 * n
+    for name in CANDLE_COLUMNS[1:]:
+        out[name] = np.frombuffer(buf, "<f8", n, off)
+        off += 8 * n
+    return out
+
+def negotiate_candle_format(fmt: str | None, accept: str | None) -> str:
+    """?format= 이 우선, 없으면 Accept 협상 (*/* 는 기존 JSON)"""
+    if fmt in CANDLE_FORMATS.values():
+        return fmt
+    best = parse_accept_header(accept, MIMEAccept).best_match(list(CANDLE_FORMATS), default="application/json")
+    return CANDLE_FORMATS[best]
+
+def encode_candles(meta: dict, rows, fmt: str, accept_encoding: str | None = None) -> tuple[bytes, str, dict]:
+    """
+    rows: (time, o, h, l, c, v) 튜플 (SQLite 행 그대로) → fmt 포맷 본문.
+    binary 는 meta 를 X-Candles-Meta 헤더(JSON)로 보낸다. WSGI/ASGI 양쪽에서 같은 응답을 만들도록 프레임워크 무관.
+    Returns: (body, mimetype, headers)
+    """
+    headers = {"Vary": CANDLE_VARY}
+    if fmt == "binary":
+        body, mimetype = pack_candles(rows), CANDLES_BINARY_MIMETYPE
+        headers["X-Candles-Meta"] = json.dumps(meta, separators=(",", ":"))
+    elif fmt == "columns":
+        body = json.dumps({**meta, "candles": candle_columns(rows)}, separators=(",", ":"), ensure_ascii=False).encode()
+        mimetype = CANDLES_COLUMNS_MIMETYPE
+    else:
+        body = app.json.dumps({**meta, "candles": [{
+            "time": r[0],
+            "open": r[1],
+            "high": r[2],
+            "low": r[3],
+            "close": r[4],
+            "volume": r[5],
+        } for r in rows]}, separators=(",", ":")).encode() + b"\n"  # jsonify 와 같은 본문
+        mimetype = "application/json"
+
+    # compact 포맷을 고른 클라이언트에만 gzip (기본 JSON 응답은 그대로)
+    if fmt != "json" and "gzip" in parse_accept_header(accept_encoding) and len(body) >= CANDLE_GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return body, mimetype, headers
+
+def parse_candle_since(raw: str | None, tf: str) -> int | str | None:
+    """
+    ?since= 커서 (클라이언트가 가진 마지막 봉 시각). 분봉은 epoch 초,
+    1d/1w/1M 은 저장 키 'YYYY-MM-DD' (epoch 도 받아 날짜로 변환). 형식이 틀리면 ValueError
+    """
+    raw = (raw or "").strip()
+    if not raw:
+        return None
+    if tf in NAVER_TIMEFRAMES:
+        day = datetime.fromtimestamp(int(raw)) if raw.isdigit() else datetime.strptime(raw, "%Y-%m-%d")
+        return day.strftime("%Y-%m-%d")
+    return int(raw)
+
+def candle_delta_meta(rows, since, limit: int) -> dict:
+    """
+    cursor: 다음 폴링에 since 로 넘길 값 (마지막 봉 시각, 봉이 없으면 받은 since 그대로).
+    delta: since 이후 봉이 limit 안에 다 들어와 클라이언트가 기존 봉에 update 만 하면 되는지
+           (False 면 전체 창이므로 setData 로 교체)
+    """
+    return {
+        "cursor": rows[-1][0] if rows else since,
+        "delta": since is not None and len(rows) < limit,
+    }
+
+def candle_response(meta: dict, rows, etag: str | None = None) -> Response:
+    fmt = negotiate_candle_format(request.args.get("format"), request.headers.get("Accept"))
+    body, mimetype, headers = encode_candles(meta, rows, fmt, request.headers.get("Accept-Encoding"))
+    if etag is not None:
+        headers.update(cache_headers(etag, CACHE_CONTROL_CANDLES))
+    return Response(body, mimetype=mimetype, headers=headers)
+
+def candle_not_modified(code: str, tf: str) -> tuple[str, Response | None]:
+    """저장본 버전으로 ETag 계산 (행을 읽기 전에). Returns: (etag, 304 응답 또는 None)"""
+    fmt = negotiate_candle_format(request.args.get("format"), request.headers.get("Accept"))
+    etag = candle_etag(code, tf, fmt)
+    return etag, not_modified(etag, CACHE_CONTROL_CANDLES, Vary=CANDLE_VARY)
+
 @app.get("/api/stocks/candles")
 def api_stocks_candles():
     code = (request.args.get("code") or "").strip()
@@ -618,46 +2737,646 @@ def api_stocks_candles():
 
     if not re.fullmatch(r"\d{6}", code):
         return jsonify({"error": "code must be 6 digits"}), 400
+    access_log.record(code)
+
+    # ✅ since=<마지막 봉 시각> 이면 그 봉(갱신됐을 수 있음)부터만 응답 → 폴링 비용이 창 크기와 무관
+    try:
+        since = parse_candle_since(request.args.get("since"), tf)
+    except ValueError:
+        return jsonify({"error": "since must be epoch seconds (or YYYY-MM-DD for 1d/1w/1M)"}), 400
 
-    # ✅ 1m은 DB에서
+    # ✅ 1m은 DB에서 (최신 count개 / from~to 구간 / before 커서로 과거 페이지)
     if tf == "1m":
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT t, o, h, l, c, v
-            FROM candles
-            WHERE code=? AND timeframe='1m'
-            ORDER BY t ASC
-        """, (code,))
-        rows = cur.fetchall()
-        conn.close()
+        try:
+            ts_from = int(request.args.get("from") or 0)
+            ts_to = int(request.args.get("to") or 0) or None
+            before = int(request.args.get("before") or 0) or None
+        except ValueError:
+            return jsonify({"error": "from/to/before must be epoch seconds"}), 400
+
+        etag, cached = candle_not_modified(code, tf)
+        if cached is not None:
+            return cached
+
+        limit = min(max(count, 1), MAX_CANDLES)
+        rows = load_minute_rows(code, limit, ts_from=max(ts_from, since or 0), ts_to=ts_to, before=before)
+
+        # 더 과거 페이지가 있을 수 있으면 다음 요청에 before로 넘길 커서
+        next_before = rows[0][0] if len(rows) == limit else None
+        meta = {"code": code, "name": code, "tf": tf, "before": next_before, **candle_delta_meta(rows, since, limit)}
+        return candle_response(meta, rows, etag)
+
+    # ✅ 3m/5m/15m/30m/60m은 저장된 1m에서 서버 집계
+    if tf in RESAMPLE_TIMEFRAMES:
+        etag, cached = candle_not_modified(code, tf)
+        if cached is not None:
+            return cached
+        limit = min(max(count, 1), MAX_CANDLES)
+        rows = load_resampled_rows(code, RESAMPLE_TIMEFRAMES[tf], limit, since)
+        return candle_response({"code": code, "name": code, "tf": tf, **candle_delta_meta(rows, since, limit)}, rows, etag)
+
+    # ✅ 1d/1w/1M은 로컬 저장본 + 네이버 delta 동기화
+    if tf not in NAVER_TIMEFRAMES:
+        return jsonify({"error": f"unknown tf: {tf}"}), 400
 
-        candles = [{
-            "time": iso_to_epoch_seconds(r[0]),
-            "open": r[1],
-            "high": r[2],
-            "low": r[3],
-            "close": r[4],
-            "volume": r[5],
-        } for r in rows][-count:]
+    count = min(max(count, 30), 1200)
+    sync_error = None
+    try:
+        ensure_stock_candles(code, tf, count)
+    except Exception as e:
+        sync_error = e  # 저장본이 있으면 그대로 제공
+
+    etag, cached = candle_not_modified(code, tf)
+    if cached is not None:
+        return cached
+    rows = _stored_candle_rows(code, tf, count, since)
+    if not rows and sync_error is not None:
+        return jsonify({"error": str(sync_error)}), 500
+    return candle_response({"code": code, "name": code, "tf": tf, **candle_delta_meta(rows, since, count)}, rows, etag)
 
-        return jsonify({"code": code, "name": code, "tf": tf, "candles": candles})
 
-    # ✅ 1d/1w/1M은 네이버 그대로
-    if tf == "1d":
-        n_tf = "day"
-    elif tf == "1w":
-        n_tf = "week"
-    elif tf == "1M":
-        n_tf = "month"
+# ---------------------------------------------------------------------
+# Stocks: 여러 종목 캔들 한 번에 (관심종목 목록용, columnar 응답)
+# ---------------------------------------------------------------------
+MAX_BATCH_CODES = int(os.environ.get("MAX_BATCH_CODES", "50"))
+# 배치 동기화 전용 풀: 큰 배치 하나가 지수 fan-out 풀(/api/index/*)을 다 점유하지 않도록 분리
+BATCH_SYNC_WORKERS = int(os.environ.get("BATCH_SYNC_WORKERS", "8"))
+_batch_sync_pool = ThreadPoolExecutor(max_workers=BATCH_SYNC_WORKERS, thread_name_prefix="batch-sync")
+
+@app.get("/api/stocks/candles/batch")
+def api_stocks_candles_batch():
+    """
+    query:
+      codes=005930,000660,... (최대 MAX_BATCH_CODES개), tf, count
+    Returns:
+      {"tf", "candles": {code: {"time": [...], "open": [...], "high": [...], "low": [...], "close": [...], "volume": [...]}},
+       "errors": {code: message}}
+    1d/1w/1M 은 동기화가 필요한 code만 배치 전용 풀에서 동시에 받고, 나머지는 저장본에서 바로 읽는다.
+    """
+    codes = list(dict.fromkeys(c.strip() for c in (request.args.get("codes") or "").split(",") if c.strip()))
+    tf = (request.args.get("tf") or "1d").strip()
+    try:
+        count = int(request.args.get("count") or "300")
+    except ValueError:
+        return jsonify({"error": "count must be an integer"}), 400
+
+    if not codes:
+        return jsonify({"error": "codes is required"}), 400
+    if len(codes) > MAX_BATCH_CODES:
+        return jsonify({"error": f"too many codes (max {MAX_BATCH_CODES})"}), 400
+    bad = [c for c in codes if not re.fullmatch(r"\d{6}", c)]
+    if bad:
+        return jsonify({"error": f"code must be 6 digits: {','.join(bad)}"}), 400
+    for code in codes:
+        access_log.record(code)
+
+    out, errors = {}, {}
+    if tf == "1m":
+        limit = min(max(count, 1), MAX_CANDLES)
+        for code in codes:
+            out[code] = candle_columns(load_minute_rows(code, limit))
+    elif tf in RESAMPLE_TIMEFRAMES:
+        limit = min(max(count, 1), MAX_CANDLES)
+        for code in codes:
+            out[code] = candle_columns(load_resampled_rows(code, RESAMPLE_TIMEFRAMES[tf], limit))
+    elif tf in NAVER_TIMEFRAMES:
+        count = min(max(count, 30), 1200)
+        stale = stale_candle_codes(codes, tf, count)
+        synced = fan_out(lambda code: sync_stock_candles(code, tf, count), stale, _batch_sync_pool) if stale else {}
+        for code in codes:
+            rows = _stored_candle_rows(code, tf, count)
+            err = synced.get(code, (None, None))[1]
+            if rows or err is None:
+                out[code] = candle_columns(rows)  # 동기화 실패해도 저장본이 있으면 제공
+            else:
+                errors[code] = str(err)
     else:
         return jsonify({"error": f"unknown tf: {tf}"}), 400
 
+    return jsonify({"tf": tf, "candles": out, "errors": errors})
+
+# ---------------------------------------------------------------------
+# Indicators (저장된 봉 위에서 서버 계산, 새 봉은 증분 갱신)
+# ---------------------------------------------------------------------
+KST_OFFSET = 9 * 3600
+INDICATOR_CACHE_SIZE = int(os.environ.get("INDICATOR_CACHE_SIZE", "256"))
+INDICATOR_MAX_PERIOD = 500
+
+def _ema_np(x: np.ndarray, alpha: float, seed: float) -> np.ndarray:
+    """
+    y[i] = y[i-1] + alpha * (x[i] - y[i-1]),  y[-1] = seed
+    블록 단위 cumsum으로 벡터화 (beta**-block <= 1e6 로 잡아 정밀도 유지)
+    """
+    out = np.empty(len(x))
+    beta = 1.0 - alpha
+    block = max(1, int(6 / -math.log10(beta)))
+    prev = seed
+    for s in range(0, len(x), block):
+        xs = x[s:s + block]
+        pw = beta ** np.arange(1, len(xs) + 1)
+        out[s:s + len(xs)] = pw * (prev + alpha * np.cumsum(xs / pw))
+        prev = out[s + len(xs) - 1]
+    return out
+
+class _Ema:
+    """
+    EMA 증분 상태. 처음 n개 평균으로 시작하고, replace=True면 마지막 값을 바꿔 다시 계산한다
+    (진행 중인 봉이 갱신되는 경우).
+    """
+
+    def __init__(self, n: int, alpha: float | None = None):
+        self.n = n
+        self.alpha = alpha or 2.0 / (n + 1)
+        self.count = 0
+        self.total = 0.0   # 처음 n개 합
+        self.last_x = 0.0
+        self.prev = None   # 마지막 값 반영 전 EMA
+        self.cur = None
+
+    def seed(self, x: np.ndarray) -> np.ndarray:
+        n = self.n
+        out = np.full(len(x), np.nan)
+        self.count = len(x)
+        self.total = float(x[:n].sum())
+        self.last_x = float(x[-1]) if len(x) else 0.0
+        self.prev = self.cur = None
+        if len(x) >= n:
+            out[n - 1] = self.total / n
+            out[n:] = _ema_np(x[n:], self.alpha, out[n - 1])
+            self.cur = float(out[-1])
+            if len(x) > n:
+                self.prev = float(out[-2])
+        return out
+
+    def step(self, x: float, replace: bool = False) -> float | None:
+        if replace and self.count:
+            if self.count <= self.n:
+                self.total -= self.last_x
+            self.cur = self.prev if self.count > self.n else None
+            self.count -= 1
+
+        self.count += 1
+        self.last_x = x
+        if self.count <= self.n:
+            self.total += x
+            if self.count == self.n:
+                self.prev, self.cur = None, self.total / self.n
+        else:
+            self.prev = self.cur
+            self.cur = self.cur + self.alpha * (x - self.cur)
+        return self.cur
+
+class _Rolling:
+    """최근 n개 합/제곱합. 기준값(k)을 빼서 누적해 큰 가격에서도 분산 계산이 무너지지 않게 한다."""
+
+    RESYNC_EVERY = 1024
+
+    def __init__(self, n: int):
+        self.n = n
+        self.win = deque()
+        self.k = 0.0
+        self.s = self.ss = 0.0
+        self.steps = 0
+
+    def _resync(self) -> None:
+        self.k = self.win[-1] if self.win else 0.0
+        self.s = sum(x - self.k for x in self.win)
+        self.ss = sum((x - self.k) ** 2 for x in self.win)
+
+    def seed(self, x: np.ndarray) -> None:
+        self.win = deque(x[-self.n:].tolist())
+        self._resync()
+
+    def step(self, x: float, replace: bool = False) -> None:
+        if replace and self.win:
+            old = self.win[-1] - self.k
+            self.win[-1] = x
+        else:
+            self.win.append(x)
+            old = self.win.popleft() - self.k if len(self.win) > self.n else None
+        if old is not None:
+            self.s -= old
+            self.ss -= old * old
+        d = x - self.k
+        self.s += d
+        self.ss += d * d
+
+        self.steps += 1
+        if self.steps % self.RESYNC_EVERY == 0:
+            self._resync()
+
+    def mean(self) -> float | None:
+        return self.k + self.s / self.n if len(self.win) == self.n else None
+
+    def std(self) -> float | None:
+        if len(self.win) < self.n:
+            return None
+        m = self.s / self.n
+        return math.sqrt(max(self.ss / self.n - m * m, 0.0))
+
+def _rolling_mean_np(x: np.ndarray, n: int) -> np.ndarray:
+    out = np.full(len(x), np.nan)
+    if len(x) >= n:
+        c = np.cumsum(np.insert(x, 0, 0.0))
+        out[n - 1:] = (c[n:] - c[:-n]) / n
+    return out
+
+# 지표 클래스: seed(cols) -> {field: ndarray} 로 전체 구간을 벡터 계산하고 증분 상태를 맞춰 두며,
+# step(bar, replace) 는 봉 하나를 O(1)로 반영해 fields 순서의 값 튜플(준비 전이면 None)을 돌려준다.
+# bar = (key, o, h, l, c, v),  cols = {"key": [...], "o": ndarray, ...}
+
+class _SMA:
+    fields = ("value",)
+
+    def __init__(self, n: int = 20):
+        self.win = _Rolling(n)
+
+    def seed(self, cols: dict) -> dict:
+        self.win.seed(cols["c"])
+        return {"value": _rolling_mean_np(cols["c"], self.win.n)}
+
+    def step(self, bar: tuple, replace: bool = False):
+        self.win.step(bar[4], replace)
+        m = self.win.mean()
+        return None if m is None else (m,)
+
+class _EMA:
+    fields = ("value",)
+
+    def __init__(self, n: int = 20):
+        self.ema = _Ema(n)
+
+    def seed(self, cols: dict) -> dict:
+        return {"value": self.ema.seed(cols["c"])}
+
+    def step(self, bar: tuple, replace: bool = False):
+        v = self.ema.step(bar[4], replace)
+        return None if v is None else (v,)
+
+class _RSI:
+    """Wilder RSI (평균 상승/하락폭을 1/n 지수평활)"""
+
+    fields = ("value",)
+
+    def __init__(self, n: int = 14):
+        self.gain = _Ema(n, 1.0 / n)
+        self.loss = _Ema(n, 1.0 / n)
+        self.count = 0
+        self.prev_close = self.last_close = None
+
+    @staticmethod
+    def _rsi(g, l):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = np.where(l > 0, 100.0 - 100.0 / (1.0 + g / l), np.where(g > 0, 100.0, 50.0))
+        return np.where(np.isnan(g), np.nan, rsi)
+
+    def seed(self, cols: dict) -> dict:
+        c = cols["c"]
+        d = np.diff(c)
+        g = self.gain.seed(np.clip(d, 0, None))
+        l = self.loss.seed(np.clip(-d, 0, None))
+        self.count = len(c)
+        self.last_close = float(c[-1]) if len(c) else None
+        self.prev_close = float(c[-2]) if len(c) > 1 else None
+        return {"value": np.insert(self._rsi(g, l), 0, np.nan)[:len(c)]}
+
+    def step(self, bar: tuple, replace: bool = False):
+        c = bar[4]
+        if replace and self.count:
+            self.last_close = self.prev_close
+            self.count -= 1
+        else:
+            replace = False
+        self.count += 1
+        self.prev_close, self.last_close = self.last_close, c
+        if self.prev_close is None:
+            return None
+        d = c - self.prev_close
+        g = self.gain.step(max(d, 0.0), replace)
+        l = self.loss.step(max(-d, 0.0), replace)
+        if g is None:
+            return None
+        return (100.0 - 100.0 / (1.0 + g / l) if l > 0 else (100.0 if g > 0 else 50.0),)
+
+class _MACD:
+    fields = ("macd", "signal", "hist")
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        if fast >= slow:
+            raise ValueError("macd fast must be < slow")
+        self.fast, self.slow, self.signal = _Ema(fast), _Ema(slow), _Ema(signal)
+
+    def seed(self, cols: dict) -> dict:
+        macd = self.fast.seed(cols["c"]) - self.slow.seed(cols["c"])
+        sig = np.full(len(macd), np.nan)
+        start = self.slow.n - 1
+        sig[start:] = self.signal.seed(macd[start:])
+        return {"macd": macd, "signal": sig, "hist": macd - sig}
+
+    def step(self, bar: tuple, replace: bool = False):
+        f = self.fast.step(bar[4], replace)
+        s = self.slow.step(bar[4], replace)
+        if s is None:
+            return None
+        m = f - s
+        sig = self.signal.step(m, replace and self.signal.count > 0)
+        return None if sig is None else (m, sig, m - sig)
+
+class _Bollinger:
+    fields = ("upper", "middle", "lower")
+
+    def __init__(self, n: int = 20, k: float = 2.0):
+        self.win = _Rolling(n)
+        self.k = k
+
+    def seed(self, cols: dict) -> dict:
+        c, n = cols["c"], self.win.n
+        self.win.seed(c)
+        mid = _rolling_mean_np(c, n)
+        sd = np.full(len(c), np.nan)
+        if len(c) >= n:
+            sd[n - 1:] = np.lib.stride_tricks.sliding_window_view(c, n).std(axis=1)
+        return {"upper": mid + self.k * sd, "middle": mid, "lower": mid - self.k * sd}
+
+    def step(self, bar: tuple, replace: bool = False):
+        self.win.step(bar[4], replace)
+        m, sd = self.win.mean(), self.win.std()
+        return None if m is None else (m + self.k * sd, m, m - self.k * sd)
+
+class _VWAP:
+    """당일(KST) 누적 VWAP, 분봉 전용. 가격은 (고+저+종)/3"""
+
+    fields = ("value",)
+
+    def __init__(self):
+        self.day = None
+        self.pv = self.v = 0.0
+        self.last = (0.0, 0.0)  # 마지막 봉의 (pv, v) — replace 때 되돌림
+
+    def seed(self, cols: dict) -> dict:
+        ts = np.asarray(cols["key"], dtype=np.int64)
+        tp = (cols["h"] + cols["l"] + cols["c"]) / 3.0
+        pv, v = tp * cols["v"], cols["v"]
+        day = (ts + KST_OFFSET) // 86400
+
+        idx = np.arange(len(ts))
+        start = np.maximum.accumulate(np.where(np.diff(day, prepend=-1) != 0, idx, 0)) if len(ts) else idx
+        cpv, cv = np.cumsum(pv), np.cumsum(v)
+        cpv0 = np.insert(cpv, 0, 0.0)[start]
+        cv0 = np.insert(cv, 0, 0.0)[start]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = np.where(cv - cv0 > 0, (cpv - cpv0) / (cv - cv0), np.nan)
+
+        if len(ts):
+            self.day = int(day[-1])
+            self.pv, self.v = float(cpv[-1] - cpv0[-1]), float(cv[-1] - cv0[-1])
+            self.last = (float(pv[-1]), float(v[-1]))
+        return {"value": out}
+
+    def step(self, bar: tuple, replace: bool = False):
+        ts, o, h, l, c, v = bar
+        day = (ts + KST_OFFSET) // 86400
+        if replace and day == self.day:
+            self.pv -= self.last[0]
+            self.v -= self.last[1]
+        if day != self.day:
+            self.day, self.pv, self.v = day, 0.0, 0.0
+        pv = (h + l + c) / 3.0 * v
+        self.last = (pv, v)
+        self.pv += pv
+        self.v += v
+        return (self.pv / self.v,) if self.v > 0 else None
+
+INDICATORS = {"sma": _SMA, "ema": _EMA, "rsi": _RSI, "macd": _MACD, "bb": _Bollinger, "vwap": _VWAP}
+INTRADAY_ONLY_INDICATORS = {"vwap"}
+
+INDICATOR_DEFAULTS = {"sma": (20,), "ema": (20,), "rsi": (14,), "macd": (12, 26, 9), "bb": (20, 2.0), "vwap": ()}
+
+def parse_indicator_spec(spec: str) -> tuple[str, tuple]:
+    """'sma:20' / 'macd:12:26:9' / 'bb:20:2' / 'vwap' -> (name, 기본값을 채운 params). 잘못된 값은 ValueError"""
+    name, *raw = spec.strip().lower().split(":")
+    if name not in INDICATORS:
+        raise ValueError(f"unknown indicator: {name}")
+    defaults = INDICATOR_DEFAULTS[name]
+    if len(raw) > len(defaults):
+        raise ValueError(f"{name}: too many parameters")
+
+    params = []
+    for i, d in enumerate(defaults):
+        p = type(d)(raw[i]) if i < len(raw) and raw[i] else d
+        ok = 2 <= p <= INDICATOR_MAX_PERIOD if isinstance(d, int) else 0 < p <= 10
+        if not ok:
+            raise ValueError(f"{name}: parameter out of range: {raw[i]}")
+        params.append(p)
+    INDICATORS[name](*params)  # 조합 검증 (macd fast < slow)
+    return name, tuple(params)
+
+def _indicator_lookback(name: str, params: tuple) -> int:
+    """출력 count개 앞에 더 읽을 봉 수 (지수평활 계열은 초기값 영향이 사라지도록 넉넉히)"""
+    if name == "vwap":
+        return 24 * 60  # 봉 간격 >= 1분이므로 첫 출력 봉의 당일 시작까지 포함됨
+    if name == "macd":
+        return 3 * params[1] + params[2]
+    if name in ("ema", "rsi"):
+        return 4 * params[0]
+    return params[0]
+
+def _indicator_bars(code: str, tf: str, limit: int, since=None) -> list[tuple]:
+    """
+    지표 입력 봉: 시간 오름차순 [(key, o, h, l, c, v), ...]
+    key 는 분봉이면 epoch(봉 시작), 일/주/월봉이면 'YYYY-MM-DD'. since 가 있으면 key >= since 만.
+    """
+    if tf == "1m":
+        return load_minute_rows(code, limit, ts_from=since or 0)
+
+    if tf in RESAMPLE_TIMEFRAMES:
+        minutes = RESAMPLE_TIMEFRAMES[tf]
+        if since is not None:
+            return resample_bars(load_minute_rows(code, MAX_CANDLES, ts_from=since), minutes)
+        return load_resampled_rows(code, minutes, limit)
+
+    sql = "SELECT t, o, h, l, c, v FROM candles WHERE code=? AND timeframe=?"
+    params = [code, tf]
+    if since is not None:
+        sql += " AND t>=?"
+        params.append(since)
+    rows = get_db().execute(sql + " ORDER BY t DESC LIMIT ?", (*params, limit)).fetchall()
+    rows.reverse()
+    return rows
+
+class _IndicatorSeries:
+    """(code, tf, indicator, params) 하나의 계산 결과 + 증분 상태"""
+
+    def __init__(self, name: str, params: tuple, count: int):
+        self.name, self.params, self.count = name, params, count
+        self.lock = threading.Lock()
+        self.keys: list = []
+        self.values: list = []   # fields 순서 튜플 또는 None
+        self.last_bar = None
+        self.ind = None
+
+    def reseed(self, bars: list[tuple]) -> None:
+        self.ind = INDICATORS[self.name](*self.params)
+        self.keys, self.values, self.last_bar = [], [], None
+        if not bars:
+            return
+        cols = {"key": [b[0] for b in bars]}
+        arr = np.asarray([b[1:] for b in bars], dtype=float).reshape(-1, 5)
+        for i, name in enumerate(("o", "h", "l", "c", "v")):
+            cols[name] = arr[:, i]
+        out = self.ind.seed(cols)
+
+        columns = [out[f].tolist() for f in self.ind.fields]
+        self.keys = cols["key"]
+        self.values = [None if any(map(math.isnan, row)) else row for row in zip(*columns)]
+        self.last_bar = tuple(bars[-1])
+
+    def apply(self, bar: tuple, replace: bool) -> None:
+        val = self.ind.step(bar, replace)
+        if replace:
+            self.keys[-1], self.values[-1] = bar[0], val
+        else:
+            self.keys.append(bar[0])
+            self.values.append(val)
+            if len(self.keys) > 2 * (self.count + 1):
+                del self.keys[:-self.count], self.values[:-self.count]
+        self.last_bar = tuple(bar)
+
+    def points(self, count: int) -> list[dict]:
+        fields = self.ind.fields
+        out = []
+        for key, val in zip(self.keys[-count:], self.values[-count:]):
+            if val is not None:
+                p = {"time": key}
+                p.update(zip(fields, val))
+                out.append(p)
+        return out
+
+class IndicatorCache:
+    """
+    (code, tf, indicator, params) -> _IndicatorSeries, LRU.
+    조회 때마다 DB에서 마지막 봉 이후만 읽어 반영한다: 새 1m 봉 하나는 지표마다 O(1)로 갱신되고,
+    다른 워커 프로세스에서 push된 봉도 같은 경로로 따라잡는다.
+    마지막 봉보다 과거 봉이 다시 쓰이면(push 보정) 해당 code의 분봉 항목을 버리고 다음 조회 때 재계산한다.
+    """
+
+    def __init__(self, maxsize: int = INDICATOR_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "reseeds": 0, "steps": 0}
+
+    def _entry(self, key: tuple, count: int) -> tuple[_IndicatorSeries, bool]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry, False
+            self._stats["misses"] += 1
+            entry = self._entries[key] = _IndicatorSeries(key[2], key[3], count)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return entry, True
+
+    def get(self, code: str, tf: str, name: str, params: tuple, count: int, max_bars: int) -> list[dict]:
+        entry, fresh = self._entry((code, tf, name, params), count)
+        with entry.lock:
+            if fresh or entry.ind is None or count > entry.count or not self._catch_up(entry, code, tf, max_bars):
+                entry.count = max(count, entry.count)
+                limit = min(entry.count + _indicator_lookback(name, params), max_bars)
+                entry.reseed(_indicator_bars(code, tf, limit))
+                with self._lock:
+                    self._stats["reseeds"] += 1
+            return entry.points(count)
+
+    def _catch_up(self, entry: _IndicatorSeries, code: str, tf: str, max_bars: int) -> bool:
+        """마지막 봉부터 새로 읽어 반영. 재계산이 필요하면 False"""
+        if entry.last_bar is None:
+            return False
+        bars = _indicator_bars(code, tf, max_bars, since=entry.last_bar[0])
+        if not bars or len(bars) >= max_bars:
+            return False
+        steps = 0
+        if tuple(bars[0]) != entry.last_bar:
+            entry.apply(bars[0], replace=True)  # 진행 중 봉 갱신 (주/월봉은 키가 바뀔 수 있음)
+            steps += 1
+        for bar in bars[1:]:
+            entry.apply(bar, replace=False)
+            steps += 1
+        if steps:
+            with self._lock:
+                self._stats["steps"] += steps
+        return True
+
+    def on_minute_rows(self, rows: list[tuple]) -> None:
+        """push된 1m 행 (_minute_rows 형식) 중 마지막 봉 이전을 고친 게 있으면 해당 항목 무효화"""
+        oldest = {}
+        for code, t, o, h, l, c, v, ts in rows:
+            if ts < oldest.get(code, ts + 1):
+                oldest[code] = ts
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                code, tf = key[0], key[1]
+                if code in oldest and (tf == "1m" or tf in RESAMPLE_TIMEFRAMES):
+                    last = entry.last_bar
+                    if last is not None and oldest[code] < last[0]:
+                        del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+indicator_cache = IndicatorCache()
+
+@app.get("/api/stocks/indicators")
+def api_stocks_indicators():
+    """
+    query:
+      code=6자리, tf=1m|3m..60m|1d|1w|1M, count=출력 봉 수
+      ind=sma:20,ema:50,rsi:14,macd:12:26:9,bb:20:2,vwap  (쉼표로 여러 개, 파라미터 생략 시 기본값)
+    Returns: {"code", "tf", "indicators": {"sma:20": [{"time", "value"}, ...], "macd:12:26:9": [{"time", "macd", "signal", "hist"}], ...}}
+    """
+    code = (request.args.get("code") or "").strip()
+    tf = (request.args.get("tf") or "1d").strip()
+    if not re.fullmatch(r"\d{6}", code):
+        return jsonify({"error": "code must be 6 digits"}), 400
+    access_log.record(code)
     try:
-        candles = fetch_naver_stock_candles(code, tf=n_tf, count=min(max(count, 30), 1200))
-        return jsonify({"code": code, "name": code, "tf": tf, "candles": candles})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        count = int(request.args.get("count") or "300")
+    except ValueError:
+        return jsonify({"error": "count must be an integer"}), 400
+
+    specs = [s for s in (request.args.get("ind") or "").split(",") if s.strip()]
+    if not specs:
+        return jsonify({"error": "ind is required"}), 400
+    try:
+        parsed = [parse_indicator_spec(s) for s in specs]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    intraday = tf == "1m" or tf in RESAMPLE_TIMEFRAMES
+    if not intraday and tf not in NAVER_TIMEFRAMES:
+        return jsonify({"error": f"unknown tf: {tf}"}), 400
+    for name, _ in parsed:
+        if not intraday and name in INTRADAY_ONLY_INDICATORS:
+            return jsonify({"error": f"{name} is only available for intraday tf"}), 400
+
+    if intraday:
+        count = min(max(count, 1), MAX_CANDLES)
+        max_bars = MAX_CANDLES
+    else:
+        count = min(max(count, 30), 1200)
+        max_bars = 1200 + max(_indicator_lookback(n, p) for n, p in parsed)
+        try:
+            ensure_stock_candles(code, tf, min(count + max(_indicator_lookback(n, p) for n, p in parsed), max_bars))
+        except Exception:
+            pass  # 저장본으로 계산
+
+    out = {}
+    for spec, (name, params) in zip(specs, parsed):
+        out[spec.strip()] = indicator_cache.get(code, tf, name, params, count, max_bars)
+    return jsonify({"code": code, "tf": tf, "indicators": out})
 
 
 # ---------------------------------------------------------------------
@@ -669,39 +3388,71 @@ def home():
 
 @app.get("/api/index/current")
 def api_index_current():
-    try:
-        return jsonify({
-            "KOSPI": fetch_naver_index("KOSPI"),
-            "KOSDAQ": fetch_naver_index("KOSDAQ"),
-        })
-    except Exception as e:
-        return jsonify({
-            "KOSPI": {"price": None, "change": None, "changeRate": None, "error": str(e)},
-            "KOSDAQ": {"price": None, "change": None, "changeRate": None, "error": str(e)},
-        }), 500
+    results = fan_out(cached_naver_index, INDEX_SYMBOLS)
+
+    out = {}
+    for code, (value, err) in results.items():
+        if err is None:
+            out[code] = value
+        else:
+            out[code] = {"price": None, "change": None, "changeRate": None, "error": str(err)}
+
+    # 하나라도 성공하면 부분 결과로 200
+    ok = any(err is None for _, err in results.values())
+    return jsonify(out), (200 if ok else 500)
 
 @app.get("/api/index/minute")
 def api_index_minute():
-    kospi = fetch_naver_daily_points("KOSPI", days=60)
-    kosdaq = fetch_naver_daily_points("KOSDAQ", days=60)
-    return jsonify({
-        "KOSPI": {"points": kospi},
-        "KOSDAQ": {"points": kosdaq},
-    })
+    results = fan_out(lambda symbol: cached_naver_daily_points(symbol, days=60), INDEX_SYMBOLS)
+
+    out = {}
+    for symbol, (points, err) in results.items():
+        if err is None:
+            out[symbol] = {"points": points}
+        else:
+            out[symbol] = {"points": [], "error": str(err)}
+
+    ok = any(err is None for _, err in results.values())
+    return jsonify(out), (200 if ok else 500)
 
 @app.get("/api/news")
 def api_news():
+    """
+    query:
+      cursor=<seq>  (optional) 이전 응답의 cursor 이후 새로 들어온 기사만
+    return:
+      { "items": [ {id,title,link,press,ts}, ... ](최신순), "cursor": <seq>, ... }
+    """
+    raw_cursor = (request.args.get("cursor") or "").strip()
     try:
-        return jsonify({
-            "items": fetch_naver_econ_news(limit=10),
-            "source": "naver_news_section_101",
-            "fetchedAt": datetime.now().isoformat(timespec="seconds"),
-        })
+        cursor = int(raw_cursor) if raw_cursor else None
+    except ValueError:
+        return jsonify({"items": [], "error": "cursor must be an integer"}), 400
+
+    error = None
+    try:
+        cached_ingest_naver_econ_news()
     except Exception as e:
+        error = e  # 업스트림 실패해도 저장된 히스토리는 제공
+
+    etag = news_etag()
+    cached = not_modified(etag, CACHE_CONTROL_NEWS)
+    if cached is not None:
+        return cached
+
+    items, new_cursor = load_news(limit=10 if cursor is None else NEWS_INGEST_LIMIT, cursor=cursor)
+    if error is not None and not items and cursor is None:
         return jsonify({
             "items": [],
-            "error": str(e),
+            "error": str(error),
         }), 500
+
+    return with_cache_headers(jsonify({
+        "items": items,
+        "cursor": new_cursor,
+        "source": "naver_news_section_101",
+        "fetchedAt": datetime.now().isoformat(timespec="seconds"),
+    }), etag, CACHE_CONTROL_NEWS)
         
 @app.get("/api/calendar/events")
 def api_calendar_get():
@@ -712,17 +3463,14 @@ def api_calendar_get():
     return:
       { "items": { "YYYY-MM-DD": [ {id,title,time,note}, ... ], ... } }
     """
-    data = _load_calendar()
     date = (request.args.get("date") or "").strip()
     month = (request.args.get("month") or "").strip()
 
-    if date:
-        return jsonify({"items": {date: data.get(date, [])}})
-    if month:
-        filtered = {k: v for k, v in data.items() if k.startswith(month)}
-        return jsonify({"items": filtered})
-
-    return jsonify({"items": data})
+    etag = f"cal.{_calendar_version(get_db())}"
+    cached = not_modified(etag, CACHE_CONTROL_CALENDAR)
+    if cached is not None:
+        return cached
+    return with_cache_headers(jsonify({"items": calendar_query(date=date, month=month)}), etag, CACHE_CONTROL_CALENDAR)
 
 
 @app.post("/api/calendar/events")
@@ -740,48 +3488,20 @@ def api_calendar_add():
     if not date or not title:
         return jsonify({"error": "date and title are required"}), 400
 
-    data = _load_calendar()
-    arr = data.get(date, [])
-    if not isinstance(arr, list):
-        arr = []
-
-    item = {
-        "id": str(int(datetime.now().timestamp() * 1000)),
-        "title": title,
-        "time": time,
-        "note": note,
-    }
-    arr.append(item)
-
-    # 시간 기준 정렬 (빈 값은 뒤로)
-    def keyfn(x):
-        t = (x.get("time") or "").strip()
-        return t if t else "99:99"
-    arr.sort(key=keyfn)
-
-    data[date] = arr
-    _save_calendar(data)
+    item = calendar_add(date, title, time, note)
     return jsonify({"ok": True, "item": item})
 
 
 @app.delete("/api/calendar/events/<date>/<event_id>")
 def api_calendar_delete(date: str, event_id: str):
-    data = _load_calendar()
-    arr = data.get(date, [])
-    if not isinstance(arr, list):
-        return jsonify({"ok": True})
-
-    new_arr = [x for x in arr if str(x.get("id")) != str(event_id)]
-    if new_arr:
-        data[date] = new_arr
-    else:
-        data.pop(date, None)
-
-    _save_calendar(data)
+    calendar_delete(date, event_id)
     return jsonify({"ok": True})
 
 
 # ---------------------------------------------------------------------
 if __name__ == "__main__":
+    # debug reloader는 자식 프로세스에서만 스케줄러 시작
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_news_summary_scheduler()
     app.run(host="0.0.0.0", port=5000, debug=True)
 
@@ -0,0 +1,547 @@
+"""
+ASGI 서빙 경로 (업스트림 대기가 많은 엔드포인트만 async, 나머지는 Flask 앱 그대로)
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+- /api/index/current, /api/index/minute, /api/news, /api/news/summary,
+  /api/stocks/candles (1d/1w/1M) 는 공유 aiohttp.ClientSession 으로 업스트림을 기다린다.
+  느린 네이버/LLM 응답 수천 개가 쌓여도 스레드가 아니라 코루틴만 잡힌다.
+- 파싱/DB 는 app.py 의 순수 함수를 그대로 쓰고, SQLite 작업만 threadpool 로 보낸다.
+- 응답 JSON 은 Flask jsonify 와 같은 바이트 (키 정렬, compact, 끝 개행).
+- SSE(/api/stocks/stream, /api/news/summary/jobs/{id}/stream)도 코루틴으로 처리한다. 연결이 몇 분씩
+  열려 있어도 WSGI 위임 스레드 풀(WSGI_THREADS)을 잡지 않으므로 스트림 수와 무관하게 나머지 경로가 돈다.
+- 그 외 경로(1m/분봉 집계 캔들, push, 캘린더, 검색 등)는 WSGI 로 Flask 앱에 위임.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import fcntl
+import os
+import random
+import re
+import time
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import aiohttp
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as core
+
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.environ.get("ASYNC_HTTP_MAX_CONNECTIONS", "100"))  # 업스트림 동시 커넥션 상한
+WSGI_THREADS = int(os.environ.get("WSGI_THREADS", os.environ.get("WEB_THREADS", "16")))  # Flask 위임 경로 스레드 수
+SUMMARY_WAIT_POLL = 0.1  # 초, /api/news/summary?wait= 와 요약 job 스트림의 상태 확인 주기
+
+# ---------------------------------------------------------------------
+# Shared async HTTP client (lifespan 동안 1개, keep-alive 풀 공유)
+# ---------------------------------------------------------------------
+http_client: aiohttp.ClientSession | None = None
+
+def make_async_client(max_connections: int = ASYNC_HTTP_MAX_CONNECTIONS) -> aiohttp.ClientSession:
+    """실행 중인 event loop 안에서 생성"""
+    return aiohttp.ClientSession(
+        headers=core.HEADERS,
+        timeout=aiohttp.ClientTimeout(sock_connect=core.HTTP_CONNECT_TIMEOUT, sock_read=core.HTTP_READ_TIMEOUT),
+        connector=aiohttp.TCPConnector(limit=max_connections),
+    )
+
+def _backoff(attempt: int) -> float:
+    """app.make_http_session 의 Retry 와 같은 지수 backoff + 같은 폭의 jitter"""
+    return min(core.HTTP_BACKOFF * (2 ** attempt), 5.0) + random.uniform(0, core.HTTP_BACKOFF)
+
+async def aget(url: str, retries: int = core.HTTP_RETRIES, **kwargs) -> tuple[int, Mapping[str, str], str]:
+    """
+    http_get + raise_for_status 의 async 판: 연결 오류/타임아웃과 HTTP_RETRY_STATUSES 는 retries 번까지 재시도.
+    Returns: (status, headers, text)  4xx/5xx 는 aiohttp.ClientResponseError
+    """
+    host = urlsplit(url).netloc
+    t0 = time.perf_counter()
+    try:
+        for attempt in range(retries + 1):
+            try:
+                async with http_client.get(url, **kwargs) as r:
+                    if r.status not in core.HTTP_RETRY_STATUSES or attempt == retries:
+                        core.upstream_requests.inc((host, str(r.status)))
+                        r.raise_for_status()
+                        core.upstream_bytes.inc((host,), len(await r.read()))
+                        return r.status, r.headers, await r.text()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == retries:
+                    core.upstream_requests.inc((host, "error"))
+                    raise
+            await asyncio.sleep(_backoff(attempt))
+    finally:
+        core.upstream_latency.observe((host,), time.perf_counter() - t0)
+
+# ---------------------------------------------------------------------
+# Single-flight + upstream cache (event loop 안에서 Task 공유)
+# ---------------------------------------------------------------------
+class _AsyncSingleFlight:
+    """같은 key로 동시에 들어온 await 는 Task 하나를 공유. 호출자가 끊겨도(cancel) Task는 끝까지 돈다."""
+
+    def __init__(self):
+        self._tasks: dict = {}
+
+    def start(self, key, fn) -> asyncio.Task:
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.get_running_loop().create_task(fn())
+            task.add_done_callback(lambda t: self._done(key, t))
+        return task
+
+    def _done(self, key, task: asyncio.Task) -> None:
+        self._tasks.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # 아무도 await 하지 않은 백그라운드 갱신의 예외 경고 방지
+
+    async def do(self, key, fn) -> tuple[object, bool]:
+        """Returns: (value, shared)"""
+        shared = key in self._tasks
+        return await asyncio.shield(self.start(key, fn)), shared
+
+    def in_flight(self, key) -> bool:
+        return key in self._tasks
+
+
+class AsyncUpstreamCache(core.UpstreamCache):
+    """UpstreamCache 와 같은 hit/stale/miss 규칙·통계, loader 는 코루틴 함수"""
+
+    def __init__(self, ttls: dict[str, tuple[float, float]]):
+        super().__init__(ttls)
+        self._flight = _AsyncSingleFlight()
+
+    async def get(self, source: str, key, loader):
+        ttl, stale = self._ttls[source]
+        full_key = (source, key)
+
+        with self._lock:
+            entry = self._entries.get(full_key)
+
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < ttl:
+                self._count(source, "hit")
+                return entry[1]
+            if age < ttl + stale:
+                self._count(source, "stale")
+                self._flight.start(full_key, lambda: self._load(source, full_key, loader))
+                return entry[1]
+
+        self._count(source, "miss")
+        value, shared = await self._flight.do(full_key, lambda: self._load(source, full_key, loader))
+        if shared:
+            self._count(source, "coalesced")
+        return value
+
+    async def _load(self, source: str, full_key: tuple, loader):
+        try:
+            value = await loader()
+        except Exception:
+            self._count(source, "error")
+            raise
+        with self._lock:
+            self._entries[full_key] = (time.monotonic(), value)
+            self._stats[source]["refresh"] += 1
+        return value
+
+
+upstream_cache = AsyncUpstreamCache(core.UPSTREAM_CACHE_TTLS)
+_candle_sync_flight = _AsyncSingleFlight()
+
+# ---------------------------------------------------------------------
+# Async fetchers (app.fetch_naver_* 와 같은 결과)
+# ---------------------------------------------------------------------
+async def afetch_naver_index(code: str) -> dict:
+    _, _, text = await aget(core.NAVER_INDEX_URLS[code])
+    try:
+        return core.parse_naver_index(text)
+    except RuntimeError:
+        raise RuntimeError(f"Failed to parse {code} now value") from None
+
+async def afetch_naver_daily_points(symbol: str, days: int = 60) -> list[dict]:
+    start = datetime.now() - timedelta(days=days * 2)
+    _, _, text = await aget(core.NAVER_SISEJSON_URL, params=core.sisejson_params(symbol, "day", start))
+    return core.daily_points_from_sisejson(text, days)
+
+async def afetch_naver_stock_columns(code: str, tf: str, start: datetime, end: datetime | None = None) -> dict:
+    _, _, text = await aget(core.NAVER_SISEJSON_URL, params=core.sisejson_params(code, tf, start, end))
+    return core.stock_columns_from_sisejson(text)
+
+async def _afetch_news_page() -> str | None:
+    headers = await run_in_threadpool(core.news_conditional_headers)
+    status, resp_headers, text = await aget(core.NAVER_ECON_NEWS_URL, headers=headers)
+    if status == 304:
+        return None
+    await run_in_threadpool(core.save_news_validators, resp_headers.get("ETag"), resp_headers.get("Last-Modified"))
+    return text
+
+async def afetch_naver_econ_news(limit: int = 10) -> list[dict]:
+    _, _, text = await aget(core.NAVER_ECON_NEWS_URL)
+    return await run_in_threadpool(core.parse_naver_econ_news, text, limit)
+
+async def aingest_naver_econ_news() -> int:
+    html = await _afetch_news_page()
+    if html is None:
+        return 0
+    return await run_in_threadpool(
+        lambda: core.store_news_items(core.parse_naver_econ_news(html, limit=core.NEWS_INGEST_LIMIT))
+    )
+
+async def acached_naver_index(code: str) -> dict:
+    return await upstream_cache.get("index", code, lambda: afetch_naver_index(code))
+
+async def acached_naver_daily_points(symbol: str, days: int = 60) -> list[dict]:
+    return await upstream_cache.get("index_points", (symbol, days), lambda: afetch_naver_daily_points(symbol, days))
+
+async def acached_ingest_naver_econ_news() -> int:
+    return await upstream_cache.get("news", "section101", aingest_naver_econ_news)
+
+def _candle_sync_plan_if_stale(code: str, tf: str, count: int) -> tuple[str, str] | None:
+    """stale 확인 + 동기화 계획을 threadpool 한 번에"""
+    if not core.stale_candle_codes([code], tf, count):
+        return None
+    return core.candle_sync_plan(code, tf, count)
+
+async def _async_sync_stock_candles(code: str, tf: str, count: int) -> None:
+    plan = await run_in_threadpool(_candle_sync_plan_if_stale, code, tf, count)
+    if plan is None:
+        return
+    from_t, start = plan
+    cols = await afetch_naver_stock_columns(code, core.NAVER_TIMEFRAMES[tf], datetime.strptime(from_t, "%Y-%m-%d"))
+    await run_in_threadpool(core.store_synced_candles, code, tf, from_t, start, cols)
+
+async def aensure_stock_candles(code: str, tf: str, count: int) -> None:
+    """app.ensure_stock_candles 와 같은 기준, 같은 (code, tf) 확인/동기화는 한 번만"""
+    await _candle_sync_flight.do((code, tf), lambda: _async_sync_stock_candles(code, tf, count))
+
+async def afan_out(fn, keys) -> dict:
+    """app.fan_out 과 같은 반환 형태: {key: (result, None) | (None, exception)}"""
+    results = await asyncio.gather(*(fn(key) for key in keys), return_exceptions=True)
+    return {
+        key: (None, res) if isinstance(res, Exception) else (res, None)
+        for key, res in zip(keys, results)
+    }
+
+# ---------------------------------------------------------------------
+# Routes
+# ---------------------------------------------------------------------
+class FlaskJSONResponse(JSONResponse):
+    """jsonify 와 같은 본문 (app.json 설정: 키 정렬, ensure_ascii, compact + 개행)"""
+
+    def render(self, content) -> bytes:
+        return core.app.json.dumps(content, separators=(",", ":")).encode() + b"\n"
+
+
+async def api_index_current(request: Request):
+    results = await afan_out(acached_naver_index, core.INDEX_SYMBOLS)
+
+    out = {}
+    for code, (value, err) in results.items():
+        if err is None:
+            out[code] = value
+        else:
+            out[code] = {"price": None, "change": None, "changeRate": None, "error": str(err)}
+
+    ok = any(err is None for _, err in results.values())
+    return FlaskJSONResponse(out, status_code=200 if ok else 500)
+
+async def api_index_minute(request: Request):
+    results = await afan_out(lambda symbol: acached_naver_daily_points(symbol, days=60), core.INDEX_SYMBOLS)
+
+    out = {}
+    for symbol, (points, err) in results.items():
+        if err is None:
+            out[symbol] = {"points": points}
+        else:
+            out[symbol] = {"points": [], "error": str(err)}
+
+    ok = any(err is None for _, err in results.values())
+    return FlaskJSONResponse(out, status_code=200 if ok else 500)
+
+async def api_news(request: Request):
+    raw_cursor = (request.query_params.get("cursor") or "").strip()
+    try:
+        cursor = int(raw_cursor) if raw_cursor else None
+    except ValueError:
+        return FlaskJSONResponse({"items": [], "error": "cursor must be an integer"}, status_code=400)
+
+    error = None
+    try:
+        await acached_ingest_naver_econ_news()
+    except Exception as e:
+        error = e
+
+    etag = await run_in_threadpool(core.news_etag)
+    if core.etag_matches(etag, request.headers.get("If-None-Match")):
+        return Response(status_code=304, headers=core.cache_headers(etag, core.CACHE_CONTROL_NEWS))
+
+    items, new_cursor = await run_in_threadpool(
+        core.load_news, 10 if cursor is None else core.NEWS_INGEST_LIMIT, cursor
+    )
+    if error is not None and not items and cursor is None:
+        return FlaskJSONResponse({"items": [], "error": str(error)}, status_code=500)
+
+    return FlaskJSONResponse({
+        "items": items,
+        "cursor": new_cursor,
+        "source": "naver_news_section_101",
+        "fetchedAt": datetime.now().isoformat(timespec="seconds"),
+    }, headers=core.cache_headers(etag, core.CACHE_CONTROL_NEWS))
+
+async def _astart_news_summary_job():
+    """app.start_news_summary_job 의 async 판 (LLM 생성 자체는 기존 job 스레드에서)"""
+    try:
+        await acached_ingest_naver_econ_news()
+    except Exception:
+        pass
+    items, _ = await run_in_threadpool(core.load_news, 25)
+    if not items:
+        items = await afetch_naver_econ_news(limit=25)
+    return await run_in_threadpool(core.news_summary_jobs.start, items)
+
+async def api_news_summary(request: Request):
+    try:
+        wait = min(float(request.query_params.get("wait") or 0), 60.0)
+    except ValueError:
+        return FlaskJSONResponse({"error": "wait must be seconds"}, status_code=400)
+
+    try:
+        saved, job = await _astart_news_summary_job()
+    except Exception as e:
+        return FlaskJSONResponse({"error": str(e)}, status_code=500)
+
+    if saved is not None:
+        return FlaskJSONResponse({**saved, "cached": True})
+
+    # job.cond 를 잡고 기다리면 스레드를 점유하므로 상태만 주기적으로 확인
+    deadline = asyncio.get_running_loop().time() + wait
+    while job.status == "running" and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(SUMMARY_WAIT_POLL)
+
+    state = job.to_dict()
+    if state["status"] == "done":
+        return FlaskJSONResponse({**state["result"], "cached": False})
+    if state["status"] == "error":
+        return FlaskJSONResponse({"error": state["error"]}, status_code=500)
+    return FlaskJSONResponse({**state, **core._job_links(job)}, status_code=202)
+
+async def api_internal_cache_stats(request: Request):
+    if request.headers.get("X-PUSH-TOKEN", "") != core.PUSH_TOKEN:
+        return FlaskJSONResponse({"error": "Unauthorized"}, status_code=403)
+    return FlaskJSONResponse(upstream_cache.stats())
+
+
+# ---------------------------------------------------------------------
+# SSE (스레드 대신 코루틴: push 스레드 → event loop 큐 / job 상태 폴링)
+# ---------------------------------------------------------------------
+class _LoopBarQueue:
+    """
+    CandleBroker 구독자. publish_rows 는 push 요청 스레드에서 불리므로 event loop 로 넘겨 넣는다.
+    가득 차면 버림 (heartbeat 때 DB 확인으로 따라잡음, queue.Queue 구독자와 같은 규칙).
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.q: asyncio.Queue = asyncio.Queue(maxsize=core.STREAM_QUEUE_SIZE)
+
+    def put_nowait(self, bar: tuple) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self._put, bar)
+        except RuntimeError:
+            pass  # 스트림 종료와 publish 가 겹쳐 loop 가 이미 닫힌 경우
+
+    def _put(self, bar: tuple) -> None:
+        with contextlib.suppress(asyncio.QueueFull):
+            self.q.put_nowait(bar)
+
+async def api_stocks_stream(request: Request):
+    q = request.query_params
+    try:
+        code, resume = core.parse_stream_request(q.get("code"), q.get("tf"), request.headers.get("Last-Event-ID"), q.get("since"))
+    except ValueError as e:
+        return FlaskJSONResponse({"error": str(e)}, status_code=400)
+
+    async def gen():
+        loop = asyncio.get_running_loop()
+        sub = _LoopBarQueue(loop)
+        core.candle_broker.subscribe(code, sub)
+        dedup = core.BarDedup(resume)
+        try:
+            yield "retry: 3000\n\n"
+            if resume is not None:
+                for e in dedup.events(await run_in_threadpool(core.load_minute_rows, code, core.MAX_CANDLES, resume)):
+                    yield e
+
+            deadline = loop.time() + core.STREAM_MAX_SECONDS
+            while loop.time() < deadline:
+                try:
+                    bars = [await asyncio.wait_for(sub.q.get(), core.STREAM_HEARTBEAT)]
+                except asyncio.TimeoutError:
+                    if dedup.last_ts is not None:
+                        rows = await run_in_threadpool(core.load_minute_rows, code, core.MAX_CANDLES, dedup.last_ts)
+                        for e in dedup.events(rows):
+                            yield e
+                    yield ": ping\n\n"
+                    continue
+                while not sub.q.empty():
+                    bars.append(sub.q.get_nowait())
+                for e in dedup.events(bars):
+                    yield e
+        finally:
+            core.candle_broker.unsubscribe(code, sub)
+
+    return StreamingResponse(gen(), media_type="text/event-stream", headers=core.SSE_HEADERS)
+
+async def api_news_summary_job_stream(request: Request):
+    job = core.news_summary_jobs.get(request.path_params["job_id"])
+    if job is None:
+        return FlaskJSONResponse({"error": "unknown job"}, status_code=404)
+
+    async def gen():
+        loop = asyncio.get_running_loop()
+        sent, quiet_since = 0, loop.time()
+        while True:
+            events, sent, finished = core.job_sse_events(job, sent)  # 락은 조각 복사 동안만
+            for e in events:
+                yield e
+            if finished:
+                return
+            if events:
+                quiet_since = loop.time()
+            elif loop.time() - quiet_since >= core.STREAM_HEARTBEAT:
+                yield ": ping\n\n"
+                quiet_since = loop.time()
+            await asyncio.sleep(SUMMARY_WAIT_POLL)
+
+    return StreamingResponse(gen(), media_type="text/event-stream", headers=core.SSE_HEADERS)
+
+
+class CandlesEndpoint:
+    """1d/1w/1M 은 async 동기화 후 저장본 응답, 그 외 tf(1m/분봉 집계/오류 응답)는 Flask 로 위임"""
+
+    def __init__(self, wsgi):
+        self.wsgi = wsgi
+
+    async def __call__(self, scope, receive, send):
+        request = Request(scope, receive)
+        q = request.query_params
+        code = (q.get("code") or "").strip()
+        tf = (q.get("tf") or "1d").strip()
+        if tf not in core.NAVER_TIMEFRAMES or not re.fullmatch(r"\d{6}", code):
+            return await self.wsgi(scope, receive, send)
+        try:
+            count = int(q.get("count") or "300")
+            since = core.parse_candle_since(q.get("since"), tf)
+        except ValueError:
+            return await self.wsgi(scope, receive, send)  # 400 응답은 Flask 쪽 그대로
+
+        t0 = time.perf_counter()
+        response = await self.naver(request, code, tf, count, since)
+        core.route_latency.observe(("/api/stocks/candles", scope["method"]), time.perf_counter() - t0)
+        core.route_requests.inc(("/api/stocks/candles", scope["method"], str(response.status_code)))
+        await response(scope, receive, send)
+
+    async def naver(self, request: Request, code: str, tf: str, count: int, since: str | None = None) -> Response:
+        core.access_log.record(code)
+        count = min(max(count, 30), 1200)
+        sync_error = None
+        try:
+            await aensure_stock_candles(code, tf, count)
+        except Exception as e:
+            sync_error = e
+
+        h = request.headers
+        fmt = core.negotiate_candle_format(request.query_params.get("format"), h.get("Accept"))
+        etag = await run_in_threadpool(core.candle_etag, code, tf, fmt)
+        if core.etag_matches(etag, h.get("If-None-Match")):
+            return Response(status_code=304, headers={
+                **core.cache_headers(etag, core.CACHE_CONTROL_CANDLES), "Vary": core.CANDLE_VARY,
+            })
+
+        rows = await run_in_threadpool(core._stored_candle_rows, code, tf, count, since)
+        if not rows and sync_error is not None:
+            return FlaskJSONResponse({"error": str(sync_error)}, status_code=500)
+
+        meta = {"code": code, "name": code, "tf": tf, **core.candle_delta_meta(rows, since, count)}
+        body, mimetype, headers = core.encode_candles(meta, rows, fmt, h.get("Accept-Encoding"))
+        headers.update(core.cache_headers(etag, core.CACHE_CONTROL_CANDLES))
+        return Response(body, media_type=mimetype, headers=headers)
+
+# ---------------------------------------------------------------------
+# App
+# ---------------------------------------------------------------------
+_scheduler_lock = None
+
+def _start_scheduler_once() -> None:
+    """gunicorn.conf.py 의 post_worker_init 과 같은 락 파일: 프로세스 여러 개 중 하나만 요약 스케줄러"""
+    global _scheduler_lock
+    if core.NEWS_SUMMARY_INTERVAL <= 0 or _scheduler_lock is not None:
+        return
+    f = open(core.DB_PATH + ".scheduler.lock", "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return
+    _scheduler_lock = f
+    core.start_news_summary_scheduler()
+
+@contextlib.asynccontextmanager
+async def lifespan(_app):
+    global http_client
+    http_client = make_async_client()
+    _start_scheduler_once()
+    core.metrics.start_flusher()
+    try:
+        yield
+    finally:
+        await http_client.close()
+        http_client = None
+
+
+def timed_route(path: str, endpoint, **kwargs) -> Route:
+    """Flask after_request 와 같은 http_request_* metrics 를 async route 에도 기록 (Flask 위임 경로는 Flask 가 기록)"""
+    route = Route(path, endpoint, **kwargs)
+    inner = route.app
+
+    async def app(scope, receive, send):
+        t0 = time.perf_counter()
+        status = 500
+
+        async def send_timed(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                core.route_latency.observe((path, scope["method"]), time.perf_counter() - t0)
+                core.route_requests.inc((path, scope["method"], str(status)))
+            await send(message)
+
+        await inner(scope, receive, send_timed)
+
+    route.app = app
+    return route
+
+
+flask_wsgi = WSGIMiddleware(core.app, workers=WSGI_THREADS)
+
+app = Starlette(
+    routes=[
+        timed_route("/api/index/current", api_index_current, methods=["GET"]),
+        timed_route("/api/index/minute", api_index_minute, methods=["GET"]),
+        timed_route("/api/news", api_news, methods=["GET"]),
+        timed_route("/api/news/summary", api_news_summary, methods=["GET"]),
+        Route("/api/internal/cache/stats", api_internal_cache_stats, methods=["GET"]),
+        Route("/api/stocks/candles", CandlesEndpoint(flask_wsgi), methods=["GET"]),
+        timed_route("/api/stocks/stream", api_stocks_stream, methods=["GET"]),
+        timed_route("/api/news/summary/jobs/{job_id}/stream", api_news_summary_job_stream, methods=["GET"]),
+        Mount("/", app=flask_wsgi),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,89 @@
+"""
+업스트림 커넥션 재사용 벤치마크 (before: requests.get / after: app.http_session)
+
+로컬 keep-alive stub 서버에 N번 요청하고 handshake(새 TCP 접속) 수와 p50/p95 지연을 출력.
+새 접속마다 HANDSHAKE_MS 만큼 지연을 넣어 TLS handshake 비용을 흉내낸다.
+
+    python bench/bench_http_pool.py [N]
+"""
+from __future__ import annotations
+
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import app  # noqa: E402
+
+HANDSHAKE_MS = float(os.environ.get("HANDSHAKE_MS", "20"))
+BODY = b"[['date','close'],\n" + b'["20240102", 2669.81],\n' * 60 + b"]"
+
+
+class _Stub:
+    def __init__(self):
+        stub = self
+        self.connections = 0
+        self._lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                time.sleep(HANDSHAKE_MS / 1000)
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(BODY)))
+                self.end_headers()
+                self.wfile.write(BODY)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/siseJson.naver"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _pct(samples: list[float], p: float) -> float:
+    return statistics.quantiles(samples, n=100)[int(p) - 1]
+
+
+def _run(label: str, get, n: int) -> None:
+    stub = _Stub()
+    try:
+        lat = []
+        for _ in range(n):
+            t0 = time.perf_counter()
+            get(stub.url).raise_for_status()
+            lat.append((time.perf_counter() - t0) * 1000)
+        print(
+            f"{label:<8} requests={n} handshakes={stub.connections} "
+            f"p50={_pct(lat, 50):.2f}ms p95={_pct(lat, 95):.2f}ms"
+        )
+    finally:
+        stub.close()
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    _run("before", lambda url: requests.get(url, headers=app.HEADERS, timeout=10), n)
+    session = app.make_http_session()
+    _run("after", lambda url: session.get(url, timeout=10), n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+지수 현재가 파싱 micro-benchmark (before: 페이지 전체 re.search 여러 번 + "no_down" in html / after: parse_naver_index)
+
+bench/fixtures/naver_index_*.html (KOSPI/KOSDAQ 상승·하락·보합) 을 파싱해 호출당 시간만 비교한다.
+이 fixture 들은 실제 캡처가 아니라 손으로 재구성한 합성 페이지라, 두 파서의 결과(부호/등락) 차이는
+실제 페이지에 대한 근거가 되지 못한다. 크기·태그 구성이 비슷한 입력에서의 속도 비교로만 본다.
+
+    python bench/bench_index.py [repeat]
+"""
+from __future__ import annotations
+
+import glob
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import app  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def legacy_parse(html: str) -> dict:
+    m_now = re.search(r'id="now_value"[^>]*>\s*([0-9\.,]+)\s*<', html)
+    if not m_now:
+        m_now = re.search(r'현재지수</span>\s*<em[^>]*>\s*<span[^>]*>([0-9\.,]+)</span>', html, re.S)
+    price = app._to_float(m_now.group(1))
+    m_chg = re.search(r'id="change_value"[^>]*>\s*([0-9\.,]+)\s*<', html)
+    if not m_chg:
+        m_chg = re.search(r'전일대비</span>.*?<span[^>]*class="tah">([0-9\.,]+)</span>', html, re.S)
+    change = app._to_float(m_chg.group(1)) if m_chg else None
+    m_rate = re.search(r'id="change_rate"[^>]*>\s*([0-9\.,]+)\s*<', html)
+    if not m_rate:
+        m_rate = re.search(r'등락률</span>.*?<span[^>]*class="tah">([0-9\.,]+)</span>', html, re.S)
+    change_rate = app._to_float(m_rate.group(1)) if m_rate else None
+    if "no_down" in html:
+        if change is not None:
+            change = -abs(change)
+        if change_rate is not None:
+            change_rate = -abs(change_rate)
+    return {"price": price, "change": change, "changeRate": change_rate}
+
+
+def main() -> None:
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "naver_index_*.html"))):
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+
+        before = min(timeit.repeat(lambda: legacy_parse(html), number=1, repeat=repeat))
+        after = min(timeit.repeat(lambda: app.parse_naver_index(html), number=1, repeat=repeat))
+        print(
+            f"{os.path.basename(path):<28} size={len(html) // 1024}KB "
+            f"before={before * 1e6:.0f}us after={after * 1e6:.0f}us x{before / after:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
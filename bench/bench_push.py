@@ -0,0 +1,71 @@
+"""
+1m 캔들 push 처리량 벤치마크 (before: 종목별 /push/candles N회 / after: /push/candles/bulk 1회)
+
+구독 종목 200개가 한 번에 push 하는 burst를 임시 DB에 기록하고 rows/sec 를 출력.
+
+    python bench/bench_push.py [codes]
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import app  # noqa: E402
+
+TOKEN = "bench"
+BURSTS = (1, 5, 30)  # 종목당 봉 개수 (실시간 1봉 / 재전송 5봉 / 장 시작 백필 30봉)
+
+
+def _candles(n: int, start: datetime) -> list[dict]:
+    return [
+        {"t": (start + timedelta(minutes=i)).isoformat(), "o": 100 + i, "h": 101 + i, "l": 99 + i, "c": 100.5 + i, "v": 1000}
+        for i in range(n)
+    ]
+
+
+def main() -> None:
+    n_codes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    codes = [f"{i:06d}" for i in range(1, n_codes + 1)]
+    app.PUSH_TOKEN = TOKEN
+    headers = {"X-PUSH-TOKEN": TOKEN}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app.DB_PATH = os.path.join(tmp, "bench.db")
+        app.init_db()
+        client = app.app.test_client()
+
+        for k, per_code in enumerate(BURSTS):
+            start = datetime(2024, 1, 2, 9, 0) + timedelta(days=k)
+            batch = _candles(per_code, start)
+            rows = n_codes * per_code
+
+            t0 = time.perf_counter()
+            for code in codes:
+                client.post("/api/internal/push/candles", headers=headers, json={"code": code, "candles": batch})
+            before = time.perf_counter() - t0
+
+            payload = {"items": [{"code": code, "candles": batch} for code in codes]}
+            t0 = time.perf_counter()
+            r = client.post("/api/internal/push/candles/bulk", headers=headers, json=payload)
+            after = time.perf_counter() - t0
+            assert r.get_json()["accepted"] == rows
+
+            # 검증(_minute_rows)만의 비용: HTTP/DB 를 빼고 같은 burst 를 한 번에
+            flat = batch * n_codes
+            t0 = time.perf_counter()
+            app._minute_rows(codes[0], flat)
+            validate = time.perf_counter() - t0
+
+            print(
+                f"codes={n_codes} per_code={per_code:<3} rows={rows:<6} "
+                f"before={rows / before:,.0f} rows/s after={rows / after:,.0f} rows/s "
+                f"validate={validate / rows * 1e6:.2f}us/row"
+            )
+
+
+if __name__ == "__main__":
+    main()
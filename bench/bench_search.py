@@ -0,0 +1,75 @@
+"""
+종목 검색 벤치마크 (before: 요청마다 stocks_master.json 로드 + 선형 scan / after: StockSearchIndex)
+
+약 2,500 종목짜리 마스터 파일을 임시로 만들고 타이핑 중 질의들의 평균 지연을 출력.
+
+    python bench/bench_search.py [listings]
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import app  # noqa: E402
+
+SYLLABLES = "삼성전자현대기아엘지화학에스케이하이닉스카카오네이버셀트리온포스코한화롯데신한금융바이오제약건설증권"
+SUFFIXES = ["", "우", "홀딩스", "에너지", "솔루션", "바이오", "리츠", "2우B"]
+QUERIES = ["삼", "삼성", "삼성전", "ㅅㅅ", "ㅅㅅㅈㅈ", "0059", "바이오", "현대차", "카카오뱅", "없는종목"]
+
+
+def _master(n: int) -> list[dict]:
+    rnd = random.Random(42)
+    out, seen = [], set()
+    while len(out) < n:
+        name = "".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 5))) + rnd.choice(SUFFIXES)
+        if name in seen:
+            continue
+        seen.add(name)
+        out.append({"code": f"{rnd.randint(0, 999999):06d}", "name": name})
+    out[0] = {"code": "005930", "name": "삼성전자"}
+    return out
+
+
+def legacy_search(path: str, q: str) -> list[dict]:
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        master = json.load(f)
+    q_low = q.lower()
+    for it in master:
+        if q_low in str(it.get("name", "")).lower():
+            items.append({"code": it["code"], "name": it["name"]})
+        if len(items) >= 20:
+            break
+    return items
+
+
+def _avg_us(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for q in QUERIES:
+            fn(q)
+    return (time.perf_counter() - t0) / (repeat * len(QUERIES)) * 1e6
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2500
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "stocks_master.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(_master(n), f, ensure_ascii=False)
+
+        index = app.StockSearchIndex(path)
+        index.search("warmup")
+
+        before = _avg_us(lambda q: legacy_search(path, q), 20)
+        after = _avg_us(lambda q: index.search(q, limit=20), 200)
+        print(f"listings={n} queries={len(QUERIES)} before={before:.0f}us/query after={after:.0f}us/query")
+
+
+if __name__ == "__main__":
+    main()
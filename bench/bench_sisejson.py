@@ -0,0 +1,61 @@
+"""
+siseJson 파싱 micro-benchmark (before: ast.literal_eval + strptime + _to_float / after: parse_sisejson)
+
+bench/fixtures/sisejson_*.txt 응답 본문을 그대로 파싱해 호출당 시간을 비교한다.
+
+    python bench/bench_sisejson.py [repeat]
+"""
+from __future__ import annotations
+
+import ast
+import glob
+import os
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import app  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def legacy_parse(text: str) -> list[dict]:
+    arr = ast.literal_eval(text.strip())
+    header = arr[0]
+    i_date = header.index("날짜")
+    idx = [header.index(n) for n in ("시가", "고가", "저가", "종가", "거래량")]
+    out = []
+    for row in arr[1:]:
+        try:
+            t = datetime.strptime(row[i_date], "%Y%m%d").strftime("%Y-%m-%d")
+            o, h, l, c, v = (app._to_float(row[i]) for i in idx)
+            out.append({"time": t, "open": o, "high": h, "low": l, "close": c, "volume": v})
+        except Exception:
+            continue
+    return out
+
+
+def fast_parse(text: str) -> dict:
+    return app.parse_sisejson(text, app.SISEJSON_OHLCV_COLUMNS)
+
+
+def main() -> None:
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "sisejson_*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+
+        cols = fast_parse(text)
+        assert [app._yyyymmdd_to_iso(t) for t in cols["t"]] == [c["time"] for c in legacy_parse(text)]
+
+        before = min(timeit.repeat(lambda: legacy_parse(text), number=1, repeat=repeat))
+        after = min(timeit.repeat(lambda: fast_parse(text), number=1, repeat=repeat))
+        print(
+            f"{os.path.basename(path):<32} rows={len(cols['t']):<5} "
+            f"before={before * 1000:.2f}ms after={after * 1000:.2f}ms x{before / after:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+캔들 응답 포맷 벤치마크 (json: 봉마다 dict / columns: columnar JSON / binary: packed float64·int64, ±gzip)
+
+임시 DB에 1m 봉을 넣고 /api/stocks/candles 를 Accept 별로 호출해 응답 바이트와 요청당 시간을 출력.
+
+    python bench/bench_wire.py [repeat]
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import app  # noqa: E402
+
+SIZES = (300, 1200, 10000)
+FORMATS = (
+    ("json", {"Accept": "application/json"}),
+    ("columns", {"Accept": app.CANDLES_COLUMNS_MIMETYPE}),
+    ("columns+gzip", {"Accept": app.CANDLES_COLUMNS_MIMETYPE, "Accept-Encoding": "gzip"}),
+    ("binary", {"Accept": app.CANDLES_BINARY_MIMETYPE}),
+    ("binary+gzip", {"Accept": app.CANDLES_BINARY_MIMETYPE, "Accept-Encoding": "gzip"}),
+)
+
+
+def main() -> None:
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with tempfile.TemporaryDirectory() as tmp:
+        app.DB_PATH = os.path.join(tmp, "bench.db")
+        app.init_db()
+
+        t0 = 1704153600
+        rows = []
+        price = 70000.0
+        for i in range(max(SIZES)):
+            price += (i * 7919 % 201 - 100) * 0.5
+            rows.append(("005930", f"m{i}", price, price + 50, price - 50, price + 10, float(i * 31 % 5000), t0 + i * 60))
+        conn = app.get_db()
+        with conn:
+            conn.executemany("""
+                INSERT INTO candles (code, timeframe, t, o, h, l, c, v, ts)
+                VALUES (?, '1m', ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+
+        client = app.app.test_client()
+        for n in SIZES:
+            url = f"/api/stocks/candles?code=005930&tf=1m&count={n}"
+            for name, headers in FORMATS:
+                size = len(client.get(url, headers=headers).data)
+                t = min(timeit.repeat(lambda: client.get(url, headers=headers), number=1, repeat=repeat))
+                print(f"bars={n:<6} {name:<13} bytes={size:<9} time={t * 1000:.2f}ms")
+            print()
+        app.close_db()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+로컬 부하 테스트 (업스트림은 stub, 서버는 gunicorn 워커 수를 바꿔 가며 / dev = Flask 개발 서버)
+
+stub 서버가 지수 페이지·siseJson·뉴스 섹션을 UPSTREAM_LATENCY 만큼 늦게 돌려주고, 앱은 임시 DB와
+짧은 캐시 TTL로 띄운다. 동시 클라이언트 CONCURRENCY개가 DURATION초 동안 엔드포인트 묶음을 돌며
+requests/sec 와 p50/p95/p99 지연을 출력한다.
+
+    python bench/loadtest.py [dev 1 2 4 ...]
+    LOADTEST_DURATION=10 LOADTEST_CONCURRENCY=64 WEB_THREADS=16 python bench/loadtest.py 1 4
+"""
+from __future__ import annotations
+
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+DURATION = float(os.environ.get("LOADTEST_DURATION", "5"))
+CONCURRENCY = int(os.environ.get("LOADTEST_CONCURRENCY", "32"))
+UPSTREAM_LATENCY = float(os.environ.get("UPSTREAM_LATENCY", "0.05"))
+
+PATHS = (
+    "/api/index/current",
+    "/api/index/minute",
+    "/api/news",
+    "/api/stocks/candles?code=005930&tf=1d&count=300",
+    "/api/stocks/candles?code=000660&tf=1w&count=300",
+    "/api/stocks/indicators?code=005930&tf=1d&count=300&ind=sma:20,rsi:14,macd",
+    "/api/calendar/events?month=2024-01",
+)
+
+
+def _read(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+def _news_page() -> bytes:
+    cards = "".join(
+        f'<li><div class="sa_text"><a class="sa_text_title" href="https://n.news.naver.com/mnews/article/001/{i:010d}?sid=101">'
+        f'<strong>기사 {i}</strong></a><div class="sa_text_info"><div class="sa_text_press">연합뉴스</div>'
+        f'<div class="sa_text_datetime"><b>{i}분전</b></div></div></div></li>'
+        for i in range(30)
+    )
+    return f"<html><body><ul>{cards}</ul></body></html>".encode()
+
+
+def start_stub() -> ThreadingHTTPServer:
+    bodies = {
+        "/sise/sise_index.naver": _read("naver_index_KOSPI_up.html"),
+        "/siseJson.naver": _read("sisejson_005930_day.txt"),
+        "/section/101": _news_page(),
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(UPSTREAM_LATENCY)
+            body = bodies.get(self.path.split("?")[0], b"")
+            self.send_response(200 if body else 404)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(mode: str, port: int, stub_url: str, db_path: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DB_PATH": db_path,
+        "NAVER_INDEX_URL": stub_url + "/sise/sise_index.naver?code={code}",
+        "NAVER_SISEJSON_URL": stub_url + "/siseJson.naver",
+        "NAVER_ECON_NEWS_URL": stub_url + "/section/101",
+        "CACHE_TTL_INDEX": "1",
+        "CACHE_TTL_NEWS": "1",
+        "CANDLE_SYNC_INTERVAL": "1",
+        "WEB_BIND": f"127.0.0.1:{port}",
+    }
+    if mode == "dev":
+        cmd = [sys.executable, "-c", f"import app; app.app.run(host='127.0.0.1', port={port})"]
+    else:
+        env["WEB_WORKERS"] = mode
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/api/calendar/events?month=2024-01", timeout=1)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"server ({mode}) did not start")
+
+
+def run_load(base: str) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+    stop_at = time.monotonic() + DURATION
+
+    def client(i: int) -> None:
+        nonlocal errors
+        session = requests.Session()
+        mine, bad = [], 0
+        k = i
+        while time.monotonic() < stop_at:
+            path = PATHS[k % len(PATHS)]
+            k += 1
+            t0 = time.perf_counter()
+            try:
+                if session.get(base + path, timeout=30).status_code >= 500:
+                    bad += 1
+            except requests.RequestException:
+                bad += 1
+            mine.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(mine)
+            errors += bad
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(CONCURRENCY)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000  # noqa: E731
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / DURATION,
+        "p50": pct(0.50),
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    modes = sys.argv[1:] or ["dev", "1", "2", "4"]
+    stub = start_stub()
+    stub_url = f"http://127.0.0.1:{stub.server_address[1]}"
+    print(f"concurrency={CONCURRENCY} duration={DURATION}s upstream_latency={UPSTREAM_LATENCY * 1000:.0f}ms "
+          f"threads/worker={os.environ.get('WEB_THREADS', '16')}")
+    try:
+        for mode in modes:
+            with tempfile.TemporaryDirectory() as tmp:
+                port = _free_port()
+                proc = start_app(mode, port, stub_url, os.path.join(tmp, "load.db"))
+                try:
+                    base = f"http://127.0.0.1:{port}"
+                    for path in PATHS:  # 워밍업 (첫 동기화/스키마)
+                        requests.get(base + path, timeout=30)
+                    r = run_load(base)
+                finally:
+                    proc.terminate()
+                    proc.wait(timeout=30)
+            label = "dev server" if mode == "dev" else f"gunicorn workers={mode}"
+            print(f"{label:<22} rps={r['rps']:<8.1f} p50={r['p50']:.1f}ms p95={r['p95']:.1f}ms "
+                  f"p99={r['p99']:.1f}ms errors={r['errors']}")
+    finally:
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+업스트림 대기가 긴 상황에서 gthread(스레드) vs ASGI(코루틴) 서빙 비교 (워커 프로세스 1개씩, 같은 메모리 조건)
+
+stub 업스트림(asyncio)이 siseJson 을 UPSTREAM_LATENCY 만큼 늦게 돌려주고, 앱은 CANDLE_SYNC_INTERVAL=0 으로
+매 요청마다 업스트림 delta 동기화를 하게 한다. 동시 클라이언트 CONCURRENCY개가 서로 다른 종목의 일봉을
+DURATION초 동안 요청하며 (single-flight 로 합쳐지지 않도록) rps, 지연, 서버 RSS(프로세스 트리 합, 최대값),
+요청당 서버 CPU 시간을 출력한다.
+
+    python bench/loadtest_async.py [gthread:16 gthread:256 asgi]        # 인자 없으면 이 세 가지
+    LOADTEST_CONCURRENCY=1000 UPSTREAM_LATENCY=1 python bench/loadtest_async.py gthread:64 asgi
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+DURATION = float(os.environ.get("LOADTEST_DURATION", "10"))
+CONCURRENCY = int(os.environ.get("LOADTEST_CONCURRENCY", "500"))
+UPSTREAM_LATENCY = float(os.environ.get("UPSTREAM_LATENCY", "0.5"))
+CODES = [f"{100000 + i:06d}" for i in range(CONCURRENCY * 2)]
+
+SISEJSON = (
+    "[['날짜', '시가', '고가', '저가', '종가', '거래량', '외국인소진율'],\n"
+    + ",\n".join(f'["202401{d:02d}", 100, 110, 90, {100 + d}, 1000, 50.0]' for d in range(2, 32))
+    + "]"
+).encode()
+
+
+async def start_stub() -> asyncio.AbstractServer:
+    """keep-alive HTTP/1.1 GET 만 처리하는 최소 stub (동시 연결 수천 개를 스레드 없이)"""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                if not head:
+                    break
+                await asyncio.sleep(UPSTREAM_LATENCY)
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(SISEJSON) + SISEJSON)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError):
+            pass  # 클라이언트 종료 / 벤치 종료 시 정리
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0, backlog=4096)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(mode: str, port: int, stub_url: str, db_path: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DB_PATH": db_path,
+        "NAVER_SISEJSON_URL": stub_url + "/siseJson.naver",
+        "CANDLE_SYNC_INTERVAL": "0",
+        "ASYNC_HTTP_MAX_CONNECTIONS": str(CONCURRENCY * 2),
+        "HTTP_POOL_SIZE": str(CONCURRENCY * 2),
+        "HTTP_READ_TIMEOUT": "60",
+        "WEB_BIND": f"127.0.0.1:{port}",
+        "WEB_WORKERS": "1",
+        "WEB_TIMEOUT": "120",
+    }
+    if mode == "asgi":
+        cmd = [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port),
+               "--no-access-log", "--log-level", "warning", "--backlog", "4096"]
+    else:
+        env["WEB_THREADS"] = mode.split(":", 1)[1]
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--backlog", "4096", "app:app"]
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _tree(pid: int) -> list[int]:
+    out, todo = [], [pid]
+    while todo:
+        p = todo.pop()
+        out.append(p)
+        try:
+            for task in os.listdir(f"/proc/{p}/task"):
+                with open(f"/proc/{p}/task/{task}/children") as f:
+                    todo.extend(int(c) for c in f.read().split())
+        except OSError:
+            pass
+    return out
+
+
+def tree_rss_mb(pid: int) -> float:
+    """pid 와 자식 프로세스들의 VmRSS 합 (MB)"""
+    total = 0
+    for p in _tree(pid):
+        try:
+            with open(f"/proc/{p}/status") as f:
+                total += next((int(line.split()[1]) for line in f if line.startswith("VmRSS:")), 0)
+        except OSError:
+            pass
+    return total / 1024
+
+
+def tree_cpu_seconds(pid: int) -> float:
+    """pid 와 자식 프로세스들의 user+sys CPU 시간 합"""
+    ticks = 0
+    for p in _tree(pid):
+        try:
+            with open(f"/proc/{p}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            ticks += int(fields[11]) + int(fields[12])
+        except OSError:
+            pass
+    return ticks / os.sysconf("SC_CLK_TCK")
+
+
+async def wait_ready(client: aiohttp.ClientSession, proc: subprocess.Popen) -> None:
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            async with client.get("/api/calendar/events?month=2024-01", timeout=aiohttp.ClientTimeout(total=1)):
+                return
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            await asyncio.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+async def run_load(client: aiohttp.ClientSession, pid: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    peak_rss = tree_rss_mb(pid)
+    cpu0, t0 = tree_cpu_seconds(pid), time.monotonic()
+    stop_at = t0 + DURATION
+
+    async def worker(i: int) -> None:
+        nonlocal errors
+        k = i
+        while time.monotonic() < stop_at:
+            code = CODES[k % len(CODES)]
+            k += CONCURRENCY
+            t0 = time.perf_counter()
+            try:
+                async with client.get(f"/api/stocks/candles?code={code}&tf=1d&count=30") as r:
+                    await r.read()
+                    if r.status != 200:
+                        errors += 1
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+
+    async def sample_rss() -> None:
+        nonlocal peak_rss
+        while time.monotonic() < stop_at:
+            peak_rss = max(peak_rss, tree_rss_mb(pid))
+            await asyncio.sleep(0.25)
+
+    await asyncio.gather(sample_rss(), *(worker(i) for i in range(CONCURRENCY)))
+    elapsed = time.monotonic() - t0  # 마감 시각에 진행 중이던 요청까지 포함
+    cpu = tree_cpu_seconds(pid) - cpu0
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000  # noqa: E731
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50": pct(0.50),
+        "p99": pct(0.99),
+        "errors": errors,
+        "rss": peak_rss,
+        "cpu_ms": cpu / max(len(latencies), 1) * 1000,
+    }
+
+
+async def bench(mode: str, stub_url: str) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        port = _free_port()
+        proc = start_app(mode, port, stub_url, os.path.join(tmp, "load.db"))
+        try:
+            async with aiohttp.ClientSession(
+                f"http://127.0.0.1:{port}",
+                connector=aiohttp.TCPConnector(limit=CONCURRENCY),
+                timeout=aiohttp.ClientTimeout(total=120),
+            ) as client:
+                await wait_ready(client, proc)
+                async with client.get(f"/api/stocks/candles?code={CODES[0]}&tf=1d&count=30") as r:  # 워밍업 (스키마)
+                    await r.read()
+                return await run_load(client, proc.pid)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+async def main() -> None:
+    modes = sys.argv[1:] or ["gthread:16", "gthread:256", "asgi"]
+    stub = await start_stub()
+    stub_url = f"http://127.0.0.1:{stub.sockets[0].getsockname()[1]}"
+    print(f"concurrency={CONCURRENCY} duration={DURATION}s upstream_latency={UPSTREAM_LATENCY * 1000:.0f}ms "
+          f"(1 worker process each)")
+    try:
+        for mode in modes:
+            r = await bench(mode, stub_url)
+            label = "uvicorn asgi:app" if mode == "asgi" else f"gunicorn threads={mode.split(':', 1)[1]}"
+            print(f"{label:<24} rps={r['rps']:<8.1f} p50={r['p50']:.0f}ms p99={r['p99']:.0f}ms "
+                  f"rss={r['rss']:.0f}MB cpu/req={r['cpu_ms']:.1f}ms errors={r['errors']}")
+    finally:
+        stub.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,149 @@
+"""
+SSE 스트림을 열어 둔 상태에서 나머지 경로의 지연 측정 (gthread 워커 vs ASGI, 워커 프로세스 1개씩)
+
+STREAMS개의 /api/stocks/stream 연결을 먼저 열어 두고 (1m 차트 탭), 동시 클라이언트 CONCURRENCY개가
+DURATION초 동안 캘린더 / 검색 / 1m 캔들을 번갈아 요청한다. 스트림이 요청 스레드를 잡는 서버라면
+스레드가 바닥나 나머지 요청이 timeout(REQUEST_TIMEOUT) 나거나 p99 가 튄다.
+
+    python bench/loadtest_streams.py [gthread:16 asgi]        # 인자 없으면 이 두 가지
+    STREAMS=200 LOADTEST_CONCURRENCY=32 python bench/loadtest_streams.py gthread:64 asgi
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from loadtest_async import ROOT, _free_port, tree_rss_mb
+
+DURATION = float(os.environ.get("LOADTEST_DURATION", "10"))
+CONCURRENCY = int(os.environ.get("LOADTEST_CONCURRENCY", "16"))
+STREAMS = int(os.environ.get("STREAMS", "64"))
+REQUEST_TIMEOUT = float(os.environ.get("REQUEST_TIMEOUT", "5"))
+
+PATHS = (
+    "/api/calendar/events?month=2024-01",
+    "/api/stocks/search?q=%EC%82%BC%EC%84%B1",  # 삼성
+    "/api/stocks/candles?code=005930&tf=1m&count=100",
+)
+
+
+def start_app(mode: str, port: int, db_path: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DB_PATH": db_path,
+        "STOCKS_MASTER_PATH": os.path.join(ROOT, "bench", "fixtures", "stocks_master.json"),
+        "STREAM_HEARTBEAT": "1",
+        "STREAM_MAX_SECONDS": str(DURATION * 3),
+        "WEB_BIND": f"127.0.0.1:{port}",
+        "WEB_WORKERS": "1",
+        "WEB_GRACEFUL_TIMEOUT": "3",
+    }
+    if mode == "asgi":
+        cmd = [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port),
+               "--no-access-log", "--log-level", "warning", "--timeout-graceful-shutdown", "3"]
+    else:
+        env["WEB_THREADS"] = mode.split(":", 1)[1]
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"]
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_ready(client: aiohttp.ClientSession, proc: subprocess.Popen) -> None:
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            async with client.get(PATHS[0], timeout=aiohttp.ClientTimeout(total=1)):
+                return
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            await asyncio.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+async def hold_stream(client: aiohttp.ClientSession, i: int, status: dict, stop: asyncio.Event) -> None:
+    """연결을 열고 응답 상태만 기록한 뒤 stop 까지 읽기만 한다"""
+    try:
+        async with client.get(f"/api/stocks/stream?code={100000 + i:06d}",
+                              timeout=aiohttp.ClientTimeout(total=None, sock_connect=REQUEST_TIMEOUT)) as r:
+            status[r.status] = status.get(r.status, 0) + 1
+            if r.status != 200:
+                return
+            reader = asyncio.ensure_future(r.content.read())
+            await stop.wait()
+            reader.cancel()
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        status["failed"] = status.get("failed", 0) + 1
+
+
+async def run_load(client: aiohttp.ClientSession) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    t0 = time.monotonic()
+    stop_at = t0 + DURATION
+
+    async def worker(i: int) -> None:
+        nonlocal errors
+        k = i
+        while time.monotonic() < stop_at:
+            path = PATHS[k % len(PATHS)]
+            k += 1
+            t = time.perf_counter()
+            try:
+                async with client.get(path, timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)) as r:
+                    await r.read()
+                    if r.status != 200:
+                        errors += 1
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                errors += 1
+            latencies.append(time.perf_counter() - t)
+
+    await asyncio.gather(*(worker(i) for i in range(CONCURRENCY)))
+    elapsed = time.monotonic() - t0
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000  # noqa: E731
+    return {"rps": len(latencies) / elapsed, "p50": pct(0.50), "p99": pct(0.99), "errors": errors}
+
+
+async def bench(mode: str) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        port = _free_port()
+        proc = start_app(mode, port, os.path.join(tmp, "streams.db"))
+        base = f"http://127.0.0.1:{port}"
+        try:
+            async with aiohttp.ClientSession(base, connector=aiohttp.TCPConnector(limit=0)) as streams_client, \
+                    aiohttp.ClientSession(base, connector=aiohttp.TCPConnector(limit=CONCURRENCY)) as client:
+                await wait_ready(client, proc)
+                stop, status = asyncio.Event(), {}
+                holders = [asyncio.ensure_future(hold_stream(streams_client, i, status, stop)) for i in range(STREAMS)]
+                await asyncio.sleep(1)  # 스트림이 다 붙을 때까지
+                result = await run_load(client)
+                result["rss"] = tree_rss_mb(proc.pid)
+                result["streams"] = {**status, "pending": STREAMS - sum(status.values())}  # 응답조차 못 받은 연결
+                stop.set()
+                await asyncio.gather(*holders, return_exceptions=True)
+                return result
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+async def main() -> None:
+    modes = sys.argv[1:] or ["gthread:16", "asgi"]
+    print(f"streams={STREAMS} concurrency={CONCURRENCY} duration={DURATION}s request_timeout={REQUEST_TIMEOUT}s "
+          f"(1 worker process each)")
+    for mode in modes:
+        r = await bench(mode)
+        label = "uvicorn asgi:app" if mode == "asgi" else f"gunicorn threads={mode.split(':', 1)[1]}"
+        streams = " ".join(f"{k}={v}" for k, v in sorted(r["streams"].items(), key=str))
+        print(f"{label:<24} rps={r['rps']:<8.1f} p50={r['p50']:.0f}ms p99={r['p99']:.0f}ms errors={r['errors']} "
+              f"rss={r['rss']:.0f}MB streams[{streams}]")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,333 @@
+"""
+엔드포인트 전체 벤치마크 (기록해 둔 업스트림 payload 를 로컬 stub 으로 재생, 네이버 호출 없음)
+
+bench/fixtures 의 지수 페이지·siseJson·뉴스 섹션 HTML 을 stub 서버가 돌려주고, 앱은 임시 DB/종목 마스터로
+별도 프로세스(gunicorn 1 worker 또는 uvicorn asgi:app)로 띄운다. 시나리오마다 BENCH_REQUESTS 개 요청을
+BENCH_CONCURRENCY 개 클라이언트로 보내 throughput, p50/p99 지연, 서버 peak RSS 를 재고 JSON 으로 저장한다.
+결과 파일끼리 비교하면 커밋 사이 성능 회귀를 볼 수 있다. bench/results/ 는 로컬 산출물이라 git 에서 무시한다.
+
+    python bench/suite.py                                  # → bench/results/<commit>[-dirty]-gunicorn.json
+    python bench/suite.py --server asgi --only candles_    # 이름에 candles_ 가 들어간 시나리오만
+    python bench/suite.py --compare bench/results/a.json bench/results/b.json
+    BENCH_REQUESTS=2000 BENCH_CONCURRENCY=16 UPSTREAM_LATENCY=0.05 python bench/suite.py --out /tmp/r.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+from loadtest_async import _free_port, tree_rss_mb
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+RESULTS = os.path.join(os.path.dirname(__file__), "results")
+
+REQUESTS = int(os.environ.get("BENCH_REQUESTS", "500"))
+CONCURRENCY = int(os.environ.get("BENCH_CONCURRENCY", "8"))
+UPSTREAM_LATENCY = float(os.environ.get("UPSTREAM_LATENCY", "0"))
+TOKEN = "bench"
+CODE = "005930"
+MINUTE_DAYS = 5  # 1m/분봉 집계 시나리오용으로 미리 push 하는 거래일 수
+
+# stub 응답: (경로, 쿼리 키) → fixture 파일
+UPSTREAM_FIXTURES = {
+    ("/sise/sise_index.naver", "KOSPI"): "naver_index_KOSPI_up.html",
+    ("/sise/sise_index.naver", "KOSDAQ"): "naver_index_KOSDAQ_dn.html",
+    ("/siseJson.naver", "KOSPI"): "sisejson_KOSPI_day.txt",
+    ("/siseJson.naver", "KOSDAQ"): "sisejson_KOSPI_day.txt",
+    ("/siseJson.naver", None): "sisejson_005930_day.txt",  # 그 외 종목 코드
+    ("/section/101", None): "naver_news_section101.html",
+}
+
+
+def _read(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+def start_stub() -> ThreadingHTTPServer:
+    bodies = {key: _read(name) for key, name in UPSTREAM_FIXTURES.items()}
+    charsets = {"/sise/sise_index.naver": "text/html; charset=utf-8", "/section/101": "text/html; charset=utf-8"}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            if UPSTREAM_LATENCY:
+                time.sleep(UPSTREAM_LATENCY)
+            parts = urlsplit(self.path)
+            q = parse_qs(parts.query)
+            key = (q.get("code") or q.get("symbol") or [None])[0]
+            body = bodies.get((parts.path, key)) or bodies.get((parts.path, None), b"")
+            self.send_response(200 if body else 404)
+            self.send_header("Content-Type", charsets.get(parts.path, "text/plain; charset=utf-8"))
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_server(kind: str, port: int, stub_url: str, tmp: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DB_PATH": os.path.join(tmp, "bench.db"),
+        "STOCKS_MASTER_PATH": os.path.join(FIXTURES, "stocks_master.json"),
+        "PUSH_TOKEN": TOKEN,
+        "NAVER_INDEX_URL": stub_url + "/sise/sise_index.naver?code={code}",
+        "NAVER_SISEJSON_URL": stub_url + "/siseJson.naver",
+        "NAVER_ECON_NEWS_URL": stub_url + "/section/101",
+        "WEB_BIND": f"127.0.0.1:{port}",
+        "WEB_WORKERS": "1",
+        "WEB_GRACEFUL_TIMEOUT": "5",
+        "NEWS_SUMMARY_INTERVAL": "0",
+        "OPENAI_API_KEY": "",
+    }
+    if kind == "asgi":
+        cmd = [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port),
+               "--no-access-log", "--log-level", "warning"]
+    else:
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/api/calendar/events?month=2024-01", timeout=1)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"server ({kind}) did not start")
+
+
+# ---------------------------------------------------------------------
+# Scenarios: name → i 번째 요청 (method, path, json body)
+# ---------------------------------------------------------------------
+def _minute_candles(start: datetime, n: int, offset: int = 0) -> list[dict]:
+    return [
+        {"t": (start + timedelta(minutes=k)).isoformat(timespec="minutes"),
+         "o": 70000 + (k + offset) % 97, "h": 70100 + (k + offset) % 97, "l": 69900 + (k + offset) % 97,
+         "c": 70050 + (k + offset) % 89, "v": 1000 + k % 13}
+        for k in range(n)
+    ]
+
+
+def build_scenarios(created_ids: list[tuple[str, str]]) -> dict:
+    candle = lambda tf: lambda i: ("GET", f"/api/stocks/candles?code={CODE}&tf={tf}&count=300", None)  # noqa: E731
+    push_start = datetime(2030, 1, 2, 9, 0)
+    queries = ["삼", "삼성", "ㅅㅅㅈㅈ", "0059", "바이오", "현대차", "005930", "없는종목"]
+
+    scenarios = {
+        "index_current": lambda i: ("GET", "/api/index/current", None),
+        "index_minute": lambda i: ("GET", "/api/index/minute", None),
+        "news": lambda i: ("GET", "/api/news", None),
+        **{f"candles_{tf}": candle(tf) for tf in ("1m", "3m", "5m", "15m", "30m", "60m", "1d", "1w", "1M")},
+        "search": lambda i: ("GET", "/api/stocks/search?q=" + queries[i % len(queries)], None),
+        "push_candles": lambda i: ("POST", "/api/internal/push/candles", {
+            "code": f"{900000 + i % 50:06d}",
+            "candles": _minute_candles(push_start + timedelta(minutes=i), 1, i),
+        }),
+        "calendar_list": lambda i: ("GET", "/api/calendar/events?month=2024-01", None),
+        "calendar_add": lambda i: ("POST", "/api/calendar/events", {
+            "date": f"2024-02-{1 + i % 28:02d}", "title": f"bench {i}", "time": "09:00", "note": "",
+        }),
+        "calendar_delete": lambda i: ("DELETE", "/api/calendar/events/{}/{}".format(*created_ids[i]), None),
+    }
+    return scenarios
+
+
+def setup(base: str, session: requests.Session) -> list[tuple[str, str]]:
+    """1m 봉 MINUTE_DAYS 일치 push, 삭제 시나리오용 일정 REQUESTS 개 생성. Returns: [(date, id), ...]"""
+    headers = {"X-PUSH-TOKEN": TOKEN}
+    for d in range(MINUTE_DAYS):
+        day = datetime(2024, 1, 2, 9, 0) + timedelta(days=d)
+        r = session.post(base + "/api/internal/push/candles/bulk", headers=headers, timeout=60,
+                         json={"items": [{"code": CODE, "candles": _minute_candles(day, 390, d)}]})
+        r.raise_for_status()
+
+    created = []
+    for i in range(REQUESTS):
+        date = f"2024-03-{1 + i % 28:02d}"
+        r = session.post(base + "/api/calendar/events", json={"date": date, "title": f"del {i}"}, timeout=30)
+        r.raise_for_status()
+        created.append((date, r.json()["item"]["id"]))
+    return created
+
+
+def run_scenario(base: str, make_request, pid: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+    next_i = iter(range(REQUESTS))
+    done = threading.Event()
+    peak_rss = tree_rss_mb(pid)
+
+    def client() -> None:
+        nonlocal errors
+        session = requests.Session()
+        session.headers["X-PUSH-TOKEN"] = TOKEN
+        mine, bad = [], 0
+        while True:
+            with lock:
+                i = next(next_i, None)
+            if i is None:
+                break
+            method, path, body = make_request(i)
+            t0 = time.perf_counter()
+            try:
+                if session.request(method, base + path, json=body, timeout=60).status_code >= 400:
+                    bad += 1
+            except requests.RequestException:
+                bad += 1
+            mine.append(time.perf_counter() - t0)
+        session.close()
+        with lock:
+            latencies.extend(mine)
+            errors += bad
+
+    def sample_rss() -> None:
+        nonlocal peak_rss
+        while not done.wait(0.05):
+            peak_rss = max(peak_rss, tree_rss_mb(pid))
+
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    sampler.start()
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(CONCURRENCY)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    done.set()
+    sampler.join()
+
+    latencies.sort()
+    pct = lambda p: round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3)  # noqa: E731
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+        "errors": errors,
+        "peak_rss_mb": round(max(peak_rss, tree_rss_mb(pid)), 1),
+    }
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_suite(kind: str, only: str | None) -> dict:
+    stub = start_stub()
+    stub_url = f"http://127.0.0.1:{stub.server_address[1]}"
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            port = _free_port()
+            proc = start_server(kind, port, stub_url, tmp)
+            base = f"http://127.0.0.1:{port}"
+            session = requests.Session()
+            try:
+                scenarios = build_scenarios(setup(base, session))
+                for name, make_request in scenarios.items():
+                    if only and only not in name:
+                        continue
+                    if not name.startswith(("push_", "calendar_add", "calendar_delete")):
+                        method, path, body = make_request(0)  # 워밍업 (첫 동기화/캐시 채움)
+                        session.request(method, base + path, json=body, timeout=60)
+                    results[name] = r = run_scenario(base, make_request, proc.pid)
+                    print(f"{name:<16} rps={r['rps']:<9} p50={r['p50_ms']:<8}ms p99={r['p99_ms']:<8}ms "
+                          f"rss={r['peak_rss_mb']}MB errors={r['errors']}")
+            finally:
+                session.close()
+                proc.terminate()
+                proc.wait(timeout=30)
+    finally:
+        stub.shutdown()
+
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "server": kind,
+        "config": {"requests": REQUESTS, "concurrency": CONCURRENCY, "upstream_latency": UPSTREAM_LATENCY},
+        "scenarios": results,
+    }
+
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"{old.get('commit')} → {new.get('commit')}  (+: 개선, -: 회귀)")
+
+    def delta(a, b, higher_is_better: bool) -> str:
+        if not a:
+            return "   n/a"
+        pct = (b - a) / a * 100
+        return f"{pct if higher_is_better else -pct:+6.1f}%"
+
+    for name, n in new["scenarios"].items():
+        o = old["scenarios"].get(name)
+        if o is None:
+            print(f"{name:<16} (new)")
+            continue
+        print(f"{name:<16} rps {o['rps']:>8} → {n['rps']:<8} {delta(o['rps'], n['rps'], True)}   "
+              f"p99 {o['p99_ms']:>8} → {n['p99_ms']:<8} {delta(o['p99_ms'], n['p99_ms'], False)}   "
+              f"rss {o['peak_rss_mb']} → {n['peak_rss_mb']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--server", choices=("gunicorn", "asgi"), default="gunicorn")
+    parser.add_argument("--only", help="이름에 이 문자열이 들어간 시나리오만")
+    parser.add_argument("--out", help="결과 JSON 경로 (기본: bench/results/<commit>[-dirty]-<server>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="결과 JSON 두 개 비교만 하고 종료")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    print(f"server={args.server} requests={REQUESTS} concurrency={CONCURRENCY} "
+          f"upstream_latency={UPSTREAM_LATENCY * 1000:.0f}ms")
+    result = run_suite(args.server, args.only)
+    out = args.out
+    if out is None:
+        os.makedirs(RESULTS, exist_ok=True)
+        out = os.path.join(RESULTS, f"{result['commit'] or 'nogit'}{'-dirty' if result['dirty'] else ''}-{args.server}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    print(f"saved {out}")
+
+
+if __name__ == "__main__":
+    main()
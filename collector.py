@@ -0,0 +1,81 @@
+"""
+구독 종목 캔들 수집기 (웹 서버와 별도 프로세스)
+
+subscriptions 테이블의 활성 종목을 최근 조회 순(code_access)으로 골라 COLLECTOR_TIMEFRAMES 봉을
+candles 에 미리 동기화한다. 업스트림 호출은 host별 rate limit + 동시 실행 수 제한.
+수집된 종목은 웹의 차트 읽기 경로에서 업스트림을 부르지 않는다 (app.stale_candle_codes 참고).
+
+    python collector.py          # COLLECTOR_INTERVAL 마다 반복
+    python collector.py --once   # 한 바퀴만 돌고 종료
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import app
+
+COLLECTOR_INTERVAL = float(os.environ.get("COLLECTOR_INTERVAL", "10"))     # 초, 스케줄링 주기
+COLLECTOR_REFRESH = int(os.environ.get("COLLECTOR_REFRESH", "60"))         # 초, 종목당 재동기화 간격
+COLLECTOR_CONCURRENCY = int(os.environ.get("COLLECTOR_CONCURRENCY", "4"))  # 동시 업스트림 요청 수
+COLLECTOR_HOST_RATE = float(os.environ.get("COLLECTOR_HOST_RATE", "5"))    # host당 초당 요청 수
+COLLECTOR_MAX_CODES = int(os.environ.get("COLLECTOR_MAX_CODES", "200"))
+COLLECTOR_COUNT = 400  # 동기화 범위 (차트 기본 요청 count=300 을 덮음)
+
+log = logging.getLogger("collector")
+
+def due_codes(tf: str, now: int | None = None) -> list[str]:
+    """재동기화가 필요한 구독 종목. 최근 조회된 종목이 앞 (조회 기록 없으면 구독 갱신 순)"""
+    now = int(time.time()) if now is None else now
+    rows = app.get_db().execute("""
+        SELECT u.code, s.synced_at
+        FROM subscriptions u
+        LEFT JOIN code_access a ON a.code = u.code
+        LEFT JOIN candle_sync s ON s.code = u.code AND s.timeframe = ?
+        WHERE u.enabled = 1
+        ORDER BY a.last_access IS NULL, a.last_access DESC, u.updated_at DESC
+        LIMIT ?
+    """, (tf, COLLECTOR_MAX_CODES)).fetchall()
+    return [code for code, synced_at in rows if synced_at is None or now - synced_at >= COLLECTOR_REFRESH]
+
+def collect_once(pool: ThreadPoolExecutor) -> dict:
+    """
+    due 종목을 우선순위대로 pool 에 넣고 끝날 때까지 기다린다.
+    Returns: {"synced": n, "failed": {code/tf: message}}
+    """
+    app.access_log.flush()  # 같은 프로세스에서 기록된 조회가 있으면 반영 (웹 워커는 각자 flush)
+
+    jobs = []
+    for tf in app.COLLECTOR_TIMEFRAMES:
+        for code in due_codes(tf):
+            jobs.append((code, tf, pool.submit(app.sync_stock_candles, code, tf, COLLECTOR_COUNT)))
+
+    failed = {}
+    for code, tf, fut in jobs:
+        try:
+            fut.result()
+        except Exception as e:
+            failed[f"{code}/{tf}"] = str(e)
+    return {"synced": len(jobs) - len(failed), "failed": failed}
+
+def main(argv: list[str]) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    app.init_db()
+    app.upstream_rate_limiter = app.HostRateLimiter(COLLECTOR_HOST_RATE)
+    app.metrics.start_flusher()  # METRICS_DIR 이 있으면 web 의 /api/internal/metrics 에 합산됨
+
+    with ThreadPoolExecutor(max_workers=COLLECTOR_CONCURRENCY, thread_name_prefix="collector") as pool:
+        while True:
+            started = time.monotonic()
+            result = collect_once(pool)
+            if result["synced"] or result["failed"]:
+                log.info("synced=%d failed=%d %s", result["synced"], len(result["failed"]), result["failed"] or "")
+            if "--once" in argv:
+                return
+            time.sleep(max(0.0, COLLECTOR_INTERVAL - (time.monotonic() - started)))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
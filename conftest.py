@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# app 은 import 시점에 DB_PATH 로 스키마를 만들고 캘린더를 이관하므로, import 전에 임시 경로로 돌린다
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="walnut-test-"), "candles.db")
@@ -0,0 +1,69 @@
+"""
+gunicorn 설정 (프로덕션 서빙, Dockerfile CMD)
+
+    gunicorn -c gunicorn.conf.py app:app
+    kill -HUP <master pid>    # graceful reload: 새 코드로 워커를 새로 띄우고, 기존 워커는 처리 중 요청을 마친 뒤 종료
+
+gthread 워커: 프로세스 WEB_WORKERS개 × 스레드 WEB_THREADS개. 느린 업스트림/LLM 호출이나
+SSE 연결(/api/stocks/stream, 요약 job stream)은 끝날 때까지 스레드 하나를 잡는다.
+
+스트림 용량 (app.STREAM_MAX_PER_WORKER, 기본 WEB_THREADS // 2):
+    워커당 동시 스트림  = STREAM_MAX_PER_WORKER            (기본 16 // 2 = 8)
+    전체 동시 스트림    = WEB_WORKERS × STREAM_MAX_PER_WORKER
+    나머지 경로 스레드  = WEB_THREADS - STREAM_MAX_PER_WORKER (스트림이 꽉 차도 항상 남음)
+초과한 스트림 요청은 기다리지 않고 503 + Retry-After 를 받고, 프런트엔드는 since= 폴링(차트)이나
+짧은 폴링(요약)으로 대체한다. 스트림을 훨씬 많이 열어야 하면 uvicorn asgi:app 으로 서빙한다
+(스트림이 코루틴이라 스레드를 잡지 않음). bench/loadtest_streams.py 로 스트림을 연 채 다른 경로 지연을 잰다.
+"""
+import fcntl
+import multiprocessing
+import os
+
+bind = os.environ.get("WEB_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_WORKERS", str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", "16"))
+timeout = int(os.environ.get("WEB_TIMEOUT", "60"))                    # 워커 heartbeat 기준 (gthread는 요청 길이와 무관)
+graceful_timeout = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", "30"))  # 종료/재시작 때 처리 중 요청 대기 시간
+keepalive = int(os.environ.get("WEB_KEEPALIVE", "5"))
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", "0"))           # >0 이면 요청 수마다 워커 교체 (메모리 누수 대비)
+max_requests_jitter = max_requests // 10
+accesslog = os.environ.get("WEB_ACCESS_LOG") or None
+errorlog = "-"
+
+# preload 하지 않음: HUP 때 워커가 app 을 새로 import 해야 코드가 바뀐다.
+# 각 워커 import 때 도는 init_db()/마이그레이션은 BEGIN IMMEDIATE + INSERT OR IGNORE 라 동시에 돌아도 안전.
+preload_app = False
+
+_scheduler_lock = None
+
+def on_starting(server):
+    # 워커별 metrics snapshot 디렉터리 (app.METRICS_DIR): 이전 실행의 파일이 합산되지 않도록 master 시작 때 비운다
+    metrics_dir = os.environ.get("METRICS_DIR")
+    if metrics_dir and os.path.isdir(metrics_dir):
+        for name in os.listdir(metrics_dir):
+            if name.endswith((".json", ".tmp")):
+                os.remove(os.path.join(metrics_dir, name))
+
+def worker_exit(server, worker):
+    # 종료하는 워커의 마지막 값을 남겨 합산 counter 가 줄지 않게
+    import app
+
+    if app.METRICS_DIR:
+        app.metrics.write_snapshot(app.METRICS_DIR)
+
+def post_worker_init(worker):
+    # 뉴스 요약 스케줄러는 락 파일을 잡은 워커 하나에서만. 그 워커가 죽으면 락이 풀리고 새로 뜬 워커가 이어받는다.
+    global _scheduler_lock
+    import app
+
+    app.metrics.start_flusher()
+
+    f = open(app.DB_PATH + ".scheduler.lock", "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return
+    _scheduler_lock = f
+    app.start_news_summary_scheduler()
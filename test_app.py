@@ -1,11 +1,1093 @@
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
 import pytest
-from app import app
+
+import app as app_module
+import collector
+from app import app, UpstreamCache
 
 @pytest.fixture
 def client():
     return app.test_client()
 
+@pytest.fixture(autouse=True)
+def _fresh_upstream_cache():
+    app_module.upstream_cache.clear()
+    yield
+    app_module.upstream_cache.clear()
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    path = str(tmp_path / "candles.db")
+    monkeypatch.setattr(app_module, "DB_PATH", path)
+    app_module.init_db()
+    return path
+
 def test_home_renders_index(client):
     response = client.get('/')
     assert response.status_code == 200
     assert "text/html" in response.content_type
+
+def test_upstream_cache_single_flight_on_concurrent_miss():
+    cache = UpstreamCache({"index": (60, 60)})
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"price": 1.0}
+
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(cache.get("index", "KOSPI", loader))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [{"price": 1.0}] * 8
+    stats = cache.stats()["sources"]["index"]
+    assert stats["refresh"] == 1
+    assert stats["miss"] + stats["hit"] == 8
+
+def test_upstream_cache_serves_stale_while_revalidating():
+    cache = UpstreamCache({"news": (0.05, 10)})
+    values = iter(["old", "new"])
+    assert cache.get("news", 10, lambda: next(values)) == "old"
+
+    time.sleep(0.06)
+    assert cache.get("news", 10, lambda: next(values)) == "old"
+
+    deadline = time.time() + 2
+    while cache.get("news", 10, lambda: "unused") != "new" and time.time() < deadline:
+        time.sleep(0.01)
+    stats = cache.stats()["sources"]["news"]
+    assert stats["stale"] >= 1
+    assert stats["refresh"] == 2
+
+def test_index_current_reuses_cached_upstream(client, monkeypatch):
+    calls = []
+
+    def fake_index(code):
+        calls.append(code)
+        return {"price": 100.0, "change": 1.0, "changeRate": 1.0}
+
+    monkeypatch.setattr(app_module, "fetch_naver_index", fake_index)
+    for _ in range(5):
+        assert client.get("/api/index/current").status_code == 200
+    assert sorted(calls) == ["KOSDAQ", "KOSPI"]
+
+class _StubUpstream:
+    """keep-alive 지원 로컬 stub. 접속(handshake) 수와 요청 수를 센다."""
+
+    def __init__(self, statuses=None, body=None):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        stub = self
+        self.connections = 0
+        self.requests = 0
+        self.paths = []
+        self.statuses = list(statuses or [])
+        self.body = body or (lambda path: b"ok")
+        self._lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                    stub.paths.append(self.path)
+                    status = stub.statuses.pop(0) if stub.statuses else 200
+                body = stub.body(self.path)
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def test_http_session_reuses_connections():
+    stub = _StubUpstream()
+    try:
+        session = app_module.make_http_session(pool_size=2)
+        for _ in range(20):
+            assert session.get(stub.url, timeout=2).status_code == 200
+        assert stub.requests == 20
+        assert stub.connections == 1
+    finally:
+        stub.close()
+
+def test_http_session_retries_5xx_and_429():
+    stub = _StubUpstream(statuses=[503, 429])
+    try:
+        session = app_module.make_http_session(retries=2, backoff=0.01)
+        r = session.get(stub.url, timeout=2)
+        assert r.status_code == 200
+        assert stub.requests == 3
+    finally:
+        stub.close()
+
+def test_index_current_fetches_symbols_concurrently(client, monkeypatch):
+    monkeypatch.setattr(app_module, "INDEX_SYMBOLS", ["KOSPI", "KOSDAQ", "KPI200"])
+
+    def slow_index(code):
+        time.sleep(0.2)
+        return {"price": 1.0, "change": 0.0, "changeRate": 0.0}
+
+    monkeypatch.setattr(app_module, "fetch_naver_index", slow_index)
+    t0 = time.perf_counter()
+    r = client.get("/api/index/current")
+    elapsed = time.perf_counter() - t0
+
+    assert r.status_code == 200
+    assert set(r.get_json()) == {"KOSPI", "KOSDAQ", "KPI200"}
+    assert elapsed < 0.5
+
+def test_index_minute_keeps_partial_results(client, monkeypatch):
+    def points(symbol, days=60):
+        if symbol == "KOSDAQ":
+            raise RuntimeError("upstream down")
+        return [{"t": "2024-01-02", "v": 2669.81}]
+
+    monkeypatch.setattr(app_module, "fetch_naver_daily_points", points)
+    r = client.get("/api/index/minute")
+    data = r.get_json()
+
+    assert r.status_code == 200
+    assert data["KOSPI"]["points"] == [{"t": "2024-01-02", "v": 2669.81}]
+    assert data["KOSDAQ"]["points"] == []
+    assert "upstream down" in data["KOSDAQ"]["error"]
+
+SISEJSON_SAMPLE = """
+ [['날짜', '시가', '고가', '저가', '종가', '거래량', '외국인소진율'],
+["20240102", 78200, 79800, 78200, 79600, 17142847, 53.3],
+\t\t
+["20240103", "78,500", 78800, 77000, 77000, 21753644, 53.27],
+["bad", 1, 2, 3, 4, 5, 6],
+["20240104", 76100.0, 77300.0, 76000.0, 76600.0, 15324439, 53.22]
+]
+"""
+
+def test_parse_sisejson_columnar():
+    cols = app_module.parse_sisejson(SISEJSON_SAMPLE, app_module.SISEJSON_OHLCV_COLUMNS)
+
+    assert cols["t"] == [20240102, 20240103, 20240104]
+    assert list(cols["o"]) == [78200.0, 78500.0, 76100.0]
+    assert list(cols["c"]) == [79600.0, 77000.0, 76600.0]
+    assert list(cols["v"]) == [17142847.0, 21753644.0, 15324439.0]
+
+def test_fetch_naver_stock_candles_uses_fast_parser(monkeypatch):
+    class FakeResponse:
+        text = SISEJSON_SAMPLE
+
+        def raise_for_status(self):
+            pass
+
+    monkeypatch.setattr(app_module, "http_get", lambda url, **kw: FakeResponse())
+    candles = app_module.fetch_naver_stock_candles("005930", tf="day", count=2)
+
+    assert candles == [
+        {"time": "2024-01-03", "open": 78500.0, "high": 78800.0, "low": 77000.0, "close": 77000.0, "volume": 21753644.0},
+        {"time": "2024-01-04", "open": 76100.0, "high": 77300.0, "low": 76000.0, "close": 76600.0, "volume": 15324439.0},
+    ]
+
+def _columns(dates, base=100.0):
+    from array import array
+
+    n = len(dates)
+    return {
+        "t": list(dates),
+        "o": array("d", [base] * n),
+        "h": array("d", [base + 1] * n),
+        "l": array("d", [base - 1] * n),
+        "c": array("d", [base + i for i in range(n)]),
+        "v": array("d", [1000.0] * n),
+    }
+
+def test_daily_candles_are_stored_and_synced_incrementally(client, db, monkeypatch):
+    calls = []
+
+    def fake_columns(code, tf, start, end=None):
+        calls.append(start.strftime("%Y%m%d"))
+        if len(calls) == 1:
+            return _columns([20240102, 20240103, 20240104])
+        return _columns([20240104, 20240105], base=200.0)
+
+    monkeypatch.setattr(app_module, "fetch_naver_stock_columns", fake_columns)
+    monkeypatch.setattr(app_module, "CANDLE_SYNC_INTERVAL", 0)
+
+    first = client.get("/api/stocks/candles?code=005930&tf=1d&count=30").get_json()
+    assert [c["time"] for c in first["candles"]] == ["2024-01-02", "2024-01-03", "2024-01-04"]
+
+    second = client.get("/api/stocks/candles?code=005930&tf=1d&count=30").get_json()
+    assert calls[1] == "20240104"  # 마지막 저장 봉부터 delta만
+    assert [c["time"] for c in second["candles"]] == ["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"]
+    assert second["candles"][2]["open"] == 200.0
+
+def test_daily_candles_served_from_store_when_upstream_fails(client, db, monkeypatch):
+    monkeypatch.setattr(app_module, "fetch_naver_stock_columns", lambda *a, **kw: _columns([20240102]))
+    assert client.get("/api/stocks/candles?code=005930&tf=1w").status_code == 200
+
+    def boom(*a, **kw):
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(app_module, "fetch_naver_stock_columns", boom)
+    monkeypatch.setattr(app_module, "CANDLE_SYNC_INTERVAL", 0)
+    r = client.get("/api/stocks/candles?code=005930&tf=1w")
+    assert r.status_code == 200
+    assert [c["time"] for c in r.get_json()["candles"]] == ["2024-01-02"]
+    assert client.get("/api/stocks/candles?code=000660&tf=1w").status_code == 500
+
+def test_resample_bars_one_pass():
+    base = 1704153600  # 2024-01-02 00:00:00 UTC, 5분 정렬
+    rows = [
+        (base + 0, 10, 12, 9, 11, 100),
+        (base + 60, 11, 15, 10, 14, 50),
+        (base + 240, 14, 14, 8, 9, 10),
+        (base + 300, 9, 10, 9, 10, 5),
+    ]
+    assert app_module.resample_bars(rows, 5) == [
+        (base, 10, 15, 8, 9, 160),
+        (base + 300, 9, 10, 9, 10, 5),
+    ]
+
+def test_candles_5m_resampled_from_stored_1m(client, db, monkeypatch):
+    monkeypatch.setattr(app_module, "PUSH_TOKEN", "t")
+    start = datetime(2024, 1, 2, 9, 0)
+    candles = [
+        {"t": (start + timedelta(minutes=i)).isoformat(), "o": i, "h": i + 1, "l": i - 1, "c": i + 0.5, "v": 1}
+        for i in range(12)
+    ]
+    r = client.post("/api/internal/push/candles", headers={"X-PUSH-TOKEN": "t"},
+                    json={"code": "005930", "candles": candles})
+    assert r.status_code == 200
+
+    data = client.get("/api/stocks/candles?code=005930&tf=5m&count=2").get_json()
+    assert data["tf"] == "5m"
+    assert [(c["open"], c["high"], c["low"], c["close"], c["volume"]) for c in data["candles"]] == [
+        (5, 10, 4, 9.5, 5),
+        (10, 12, 9, 11.5, 2),
+    ]
+    assert data["candles"][1]["time"] - data["candles"][0]["time"] == 300
+
+def _push_minutes(client, monkeypatch, code, start, n):
+    monkeypatch.setattr(app_module, "PUSH_TOKEN", "t")
+    candles = [
+        {"t": (start + timedelta(minutes=i)).isoformat(), "o": i, "h": i, "l": i, "c": i, "v": 1}
+        for i in range(n)
+    ]
+    r = client.post("/api/internal/push/candles", headers={"X-PUSH-TOKEN": "t"},
+                    json={"code": code, "candles": candles})
+    assert r.status_code == 200
+
+def test_minute_candles_windowed_read_with_cursor(client, db, monkeypatch):
+    _push_minutes(client, monkeypatch, "005930", datetime(2024, 1, 2, 9, 0), 10)
+
+    page = client.get("/api/stocks/candles?code=005930&tf=1m&count=4").get_json()
+    assert [c["open"] for c in page["candles"]] == [6, 7, 8, 9]
+    assert page["before"] == page["candles"][0]["time"]
+
+    older = client.get(f"/api/stocks/candles?code=005930&tf=1m&count=4&before={page['before']}").get_json()
+    assert [c["open"] for c in older["candles"]] == [2, 3, 4, 5]
+
+    t0 = page["candles"][0]["time"]
+    ranged = client.get(f"/api/stocks/candles?code=005930&tf=1m&from={t0 - 60}&to={t0}").get_json()
+    assert [c["open"] for c in ranged["candles"]] == [5, 6]
+    assert ranged["before"] is None
+
+def test_candles_since_returns_only_bars_from_cursor(client, db, monkeypatch):
+    _push_minutes(client, monkeypatch, "005930", datetime(2024, 1, 2, 9, 0), 10)
+
+    full = client.get("/api/stocks/candles?code=005930&tf=1m&count=300").get_json()
+    assert len(full["candles"]) == 10 and full["delta"] is False
+    assert full["cursor"] == full["candles"][-1]["time"]
+
+    # 마지막 봉 갱신 + 새 봉 1개 → since 이후 2개만
+    _push_minutes(client, monkeypatch, "005930", datetime(2024, 1, 2, 9, 9), 2)
+    delta = client.get(f"/api/stocks/candles?code=005930&tf=1m&count=300&since={full['cursor']}").get_json()
+    assert delta["delta"] is True
+    assert [c["time"] for c in delta["candles"]] == [full["cursor"], full["cursor"] + 60]
+    assert delta["cursor"] == full["cursor"] + 60
+    # since 이후가 count 를 넘으면 전체 창으로 (클라이언트가 setData)
+    assert client.get(f"/api/stocks/candles?code=005930&tf=1m&count=1&since={full['candles'][0]['time']}") \
+        .get_json()["delta"] is False
+
+    five = client.get(f"/api/stocks/candles?code=005930&tf=5m&since={full['cursor']}").get_json()
+    assert [c["time"] for c in five["candles"]] == [full["cursor"] - 240, full["cursor"] + 60]
+
+    monkeypatch.setattr(app_module, "fetch_naver_stock_columns",
+                        lambda *a, **kw: _columns([20240102, 20240103, 20240104]))
+    daily = client.get("/api/stocks/candles?code=005930&tf=1d&since=2024-01-03").get_json()
+    assert [c["time"] for c in daily["candles"]] == ["2024-01-03", "2024-01-04"]
+    assert (daily["cursor"], daily["delta"]) == ("2024-01-04", True)
+    assert client.get("/api/stocks/candles?code=005930&tf=1d&since=nope").status_code == 400
+
+def test_candles_and_calendar_revalidate_with_etag(client, db, monkeypatch):
+    _push_minutes(client, monkeypatch, "005930", datetime(2024, 1, 2, 9, 0), 3)
+
+    r = client.get("/api/stocks/candles?code=005930&tf=1m")
+    etag = r.headers["ETag"]
+    assert r.headers["Cache-Control"] == app_module.CACHE_CONTROL_CANDLES
+    r2 = client.get("/api/stocks/candles?code=005930&tf=1m", headers={"If-None-Match": etag})
+    assert r2.status_code == 304 and r2.data == b""
+    assert r.headers["Vary"] == r2.headers["Vary"] == app_module.CANDLE_VARY
+    # 같은 버전이라도 형식이 다르면 다른 표현 → 다른 ETag (JSON 의 ETag 로는 304 가 나지 않음)
+    cols = client.get("/api/stocks/candles?code=005930&tf=1m&format=columns", headers={"If-None-Match": etag})
+    assert cols.status_code == 200 and cols.mimetype == app_module.CANDLES_COLUMNS_MIMETYPE
+    assert cols.headers["ETag"] != etag
+    assert client.get("/api/stocks/candles?code=005930&tf=1m&format=columns",
+                      headers={"If-None-Match": cols.headers["ETag"]}).status_code == 304
+    # 1m 저장이 바뀌면 1m 과 그로부터 집계되는 분봉 ETag 모두 바뀐다
+    r5 = client.get("/api/stocks/candles?code=005930&tf=5m")
+    _push_minutes(client, monkeypatch, "005930", datetime(2024, 1, 2, 9, 3), 1)
+    assert client.get("/api/stocks/candles?code=005930&tf=1m", headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/api/stocks/candles?code=005930&tf=5m",
+                      headers={"If-None-Match": r5.headers["ETag"]}).status_code == 200
+
+    cal = client.get("/api/calendar/events?month=2024-01")
+    assert client.get("/api/calendar/events?month=2024-01",
+                      headers={"If-None-Match": cal.headers["ETag"]}).status_code == 304
+    client.post("/api/calendar/events", json={"date": "2024-01-05", "title": "FOMC"})
+    assert client.get("/api/calendar/events?month=2024-01",
+                      headers={"If-None-Match": cal.headers["ETag"]}).status_code == 200
+
+def test_init_db_backfills_epoch_column(tmp_path, monkeypatch):
+    import sqlite3
+
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE candles (
+            code TEXT NOT NULL, timeframe TEXT NOT NULL, t TEXT NOT NULL,
+            o REAL NOT NULL, h REAL NOT NULL, l REAL NOT NULL, c REAL NOT NULL, v REAL NOT NULL,
+            PRIMARY KEY (code, timeframe, t)
+        )
+    """)
+    conn.execute("INSERT INTO candles VALUES ('005930', '1m', '2024-01-02T09:00:00', 1, 1, 1, 1, 1)")
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(app_module, "DB_PATH", path)
+    app_module.init_db()
+
+    conn = sqlite3.connect(path)
+    ts = conn.execute("SELECT ts FROM candles").fetchone()[0]
+    conn.close()
+    assert ts == app_module.iso_to_epoch_seconds("2024-01-02T09:00:00")
+
+def test_bulk_push_reports_per_code_counts(client, db, monkeypatch):
+    monkeypatch.setattr(app_module, "PUSH_TOKEN", "t")
+    good = {"t": "2024-01-02T09:00:00", "o": 1, "h": 2, "l": 0.5, "c": 1.5, "v": 10}
+    payload = {"items": [
+        {"code": "005930", "candles": [good, {**good, "t": "2024-01-02T09:01:00"}, {**good, "o": "x"}]},
+        {"code": "000660", "candles": [good, {**good, "c": "nan"}]},
+        {"code": "bad", "candles": [good]},
+    ]}
+
+    r = client.post("/api/internal/push/candles/bulk", headers={"X-PUSH-TOKEN": "t"}, json=payload)
+    data = r.get_json()
+
+    assert r.status_code == 200
+    assert (data["accepted"], data["rejected"]) == (3, 3)
+    assert data["codes"]["005930"] == {"accepted": 2, "rejected": 1}
+    assert data["codes"]["000660"] == {"accepted": 1, "rejected": 1}
+    assert data["codes"]["bad"]["rejected"] == 1
+
+    candles = client.get("/api/stocks/candles?code=005930&tf=1m").get_json()["candles"]
+    assert len(candles) == 2
+
+def test_minute_rows_vectorized_validation_matches_row_parsing():
+    ts = ["2024-01-02T09:00:00", "2024-01-02 09:01", "2024-01-02T09:02:00+09:00", "2024-13-01T00:00:00", "x", None]
+    candles = [{"t": t, "o": 1, "h": "2", "l": 0.5, "c": 1, "v": 10} for t in ts]
+    candles += [{"t": ts[0], "o": "x", "h": 1, "l": 1, "c": 1, "v": 1}, {"t": ts[0], "o": 1}, "bad"]
+
+    rows, rejected = app_module._minute_rows("005930", candles)
+    assert rejected == 6
+    assert rows == [("005930", t, 1.0, 2.0, 0.5, 1.0, 10.0, app_module.iso_to_epoch_seconds(t)) for t in ts[:3]]
+
+def test_oversized_push_is_rejected_before_validation(client, db, monkeypatch):
+    monkeypatch.setattr(app_module, "PUSH_TOKEN", "t")
+    monkeypatch.setattr(app_module, "MAX_PUSH_ROWS", 2)
+    monkeypatch.setattr(app_module, "_minute_rows", lambda *a: pytest.fail("validated an oversized payload"))
+    candles = [{"t": "2024-01-02T09:00:00", "o": 1, "h": 1, "l": 1, "c": 1, "v": 1}] * 3
+
+    r = client.post("/api/internal/push/candles", headers={"X-PUSH-TOKEN": "t"}, json={"code": "005930", "candles": candles})
+    assert r.status_code == 413
+    r = client.post("/api/internal/push/candles/bulk", headers={"X-PUSH-TOKEN": "t"}, json={"items": [
+        {"code": "005930", "candles": candles[:2]}, {"code": "000660", "candles": candles[:1]},
+    ]})
+    assert r.status_code == 413
+
+def test_bulk_push_requires_token(client, db, monkeypatch):
+    monkeypatch.setattr(app_module, "PUSH_TOKEN", "t")
+    r = client.post("/api/internal/push/candles/bulk", json={"items": []})
+    assert r.status_code == 403
+
+def test_reads_and_push_ingestion_do_not_block_each_other(db):
+    assert app_module.get_db().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    start = datetime(2024, 1, 2, 9, 0)
+
+    def rows_for(code, day, n):
+        rows, _ = app_module._minute_rows(code, [
+            {"t": (start + timedelta(days=day, minutes=i)).isoformat(), "o": 1, "h": 1, "l": 1, "c": 1, "v": 1}
+            for i in range(n)
+        ])
+        return rows
+
+    conn = app_module.get_db()
+    with conn:
+        app_module._write_minute_rows(conn, rows_for("005930", 0, 300))
+
+    reading = threading.Event()
+    done = threading.Event()
+    errors = []
+    read_latencies = []
+    commit_latencies = []
+
+    def long_reader():
+        # 읽기 트랜잭션을 열어둔 채 유지 (rollback journal이면 writer 커밋이 여기서 막힘)
+        try:
+            conn = app_module.get_db()
+            conn.execute("BEGIN")
+            conn.execute("SELECT COUNT(*) FROM candles").fetchone()
+            reading.set()
+            done.wait(2)
+            conn.execute("COMMIT")
+        except Exception as e:
+            errors.append(e)
+        finally:
+            app_module.close_db()
+
+    def writer():
+        try:
+            reading.wait(2)
+            conn = app_module.get_db()
+            for day in range(1, 6):
+                rows = rows_for("000660", day, 500)
+                t0 = time.perf_counter()
+                with conn:
+                    app_module._write_minute_rows(conn, rows)
+                commit_latencies.append(time.perf_counter() - t0)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+            app_module.close_db()
+
+    def reader():
+        try:
+            reading.wait(2)
+            while not done.is_set():
+                t0 = time.perf_counter()
+                assert len(app_module.load_minute_rows("005930", 300)) == 300
+                read_latencies.append(time.perf_counter() - t0)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            app_module.close_db()
+
+    threads = [threading.Thread(target=long_reader), threading.Thread(target=writer)]
+    threads += [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert len(commit_latencies) == 5
+    assert max(commit_latencies) < 0.5
+    assert read_latencies and max(read_latencies) < 0.1
+
+def _sse_events(chunks):
+    import json
+
+    events = []
+    for chunk in chunks:
+        text = chunk.decode() if isinstance(chunk, bytes) else chunk
+        fields = dict(line.split(": ", 1) for line in text.strip().splitlines() if ": " in line and not line.startswith(":"))
+        if fields.get("event") == "bar":
+            events.append((int(fields["id"]), json.loads(fields["data"])))
+    return events
+
+def test_stream_fans_out_pushed_bars_and_resumes(client, db, monkeypatch):
+    monkeypatch.setattr(app_module, "STREAM_HEARTBEAT", 0.05)
+    monkeypatch.setattr(app_module, "STREAM_MAX_SECONDS", 0.3)
+    start = datetime(2024, 1, 2, 9, 0)
+    _push_minutes(client, monkeypatch, "005930", start, 3)
+
+    r = client.get("/api/stocks/stream?code=005930", buffered=False)
+    assert r.mimetype == "text/event-stream"
+    chunks = r.response
+    next(chunks)  # retry 지시
+
+    bar = {"t": (start + timedelta(minutes=2)).isoformat(), "o": 2, "h": 9, "l": 2, "c": 8, "v": 5}
+    client.post("/api/internal/push/candles", headers={"X-PUSH-TOKEN": "t"},
+                json={"code": "005930", "candles": [bar]})
+    events = _sse_events(chunks)
+    r.close()
+
+    assert len(events) == 1
+    ts, data = events[0]
+    assert (data["time"], data["high"], data["close"]) == (ts, 9, 8)
+
+    resumed = client.get("/api/stocks/stream?code=005930", headers={"Last-Event-ID": str(ts - 60)}, buffered=False)
+    events = _sse_events(resumed.response)
+    resumed.close()
+    assert [e[0] for e in events] == [ts - 60, ts]
+
+def test_streams_are_capped_per_worker(client, db, monkeypatch):
+    monkeypatch.setattr(app_module, "STREAM_HEARTBEAT", 0.05)
+    monkeypatch.setattr(app_module, "stream_slots", app_module.StreamSlots(1))
+
+    first = client.get("/api/stocks/stream?code=005930", buffered=False)
+    assert first.status_code == 200
+    busy = client.get("/api/stocks/stream?code=000660")
+    assert busy.status_code == 503 and busy.headers["Retry-After"] == str(app_module.STREAM_RETRY_AFTER)
+    assert client.get("/api/calendar/events?month=2024-01").status_code == 200  # 다른 경로는 영향 없음
+
+    first.close()  # 본문을 읽기 전에 끊어도 자리는 반납
+    again = client.get("/api/stocks/stream?code=000660", buffered=False)
+    assert again.status_code == 200
+    again.close()
+    assert app_module.stream_slots.active == 0
+
+def test_stock_search_index_ranking_and_reload(tmp_path, client, monkeypatch):
+    import json
+    import os
+
+    path = tmp_path / "stocks_master.json"
+    path.write_text(json.dumps([
+        {"code": "005930", "name": "삼성전자"},
+        {"code": "005935", "name": "삼성전자우"},
+        {"code": "028260", "name": "삼성물산"},
+        {"code": "000660", "name": "SK하이닉스"},
+    ], ensure_ascii=False), encoding="utf-8")
+
+    index = app_module.StockSearchIndex(str(path))
+    monkeypatch.setattr(app_module, "stock_search_index", index)
+    monkeypatch.setattr(app_module, "STOCKS_MASTER_CHECK_INTERVAL", 0)
+
+    def codes(q):
+        return [it["code"] for it in client.get("/api/stocks/search", query_string={"q": q}).get_json()["items"]]
+
+    assert codes("삼성전자") == ["005930", "005935"]
+    assert codes("ㅅㅅㅈㅈ") == ["005930", "005935"]
+    assert codes("하이닉스") == ["000660"]
+    assert codes("sk") == ["000660"]
+    assert codes("0059") == ["005930", "005935"]
+    assert client.get("/api/stocks/search?q=005930").get_json()["items"] == [{"code": "005930", "name": "삼성전자"}]
+
+    path.write_text(json.dumps([{"code": "035420", "name": "NAVER"}]), encoding="utf-8")
+    os.utime(path, ns=(1, 10**18))
+    assert codes("naver") == ["035420"]
+    assert codes("삼성") == []
+
+    # 검색 도중 reload 되어도 진행 중인 검색은 시작할 때의 스냅샷만 본다
+    real_prefix_range = app_module._prefix_range
+
+    def reload_mid_search(keys, q):
+        path.write_text(json.dumps([{"code": f"{i:06d}", "name": f"종목{i}"} for i in range(50)]), encoding="utf-8")
+        os.utime(path, ns=(1, 2 * 10**18))
+        index._ensure_fresh()
+        return real_prefix_range(keys, q)
+
+    monkeypatch.setattr(app_module, "_prefix_range", reload_mid_search)
+    assert codes("naver") == ["035420"]
+    monkeypatch.setattr(app_module, "_prefix_range", real_prefix_range)
+    assert len(codes("종목")) == 20
+
+def test_calendar_crud_month_range_and_cache(client, db):
+    add = lambda body: client.post("/api/calendar/events", json=body).get_json()["item"]
+
+    a = add({"date": "2024-01-05", "title": "FOMC", "time": "04:00"})
+    b = add({"date": "2024-01-05", "title": "메모"})
+    c = add({"date": "2024-01-05", "title": "CPI", "time": "22:30"})
+    add({"date": "2024-02-01", "title": "다음달"})
+
+    month = client.get("/api/calendar/events?month=2024-01").get_json()["items"]
+    assert list(month) == ["2024-01-05"]
+    assert [x["id"] for x in month["2024-01-05"]] == [a["id"], c["id"], b["id"]]
+
+    client.delete(f"/api/calendar/events/2024-01-05/{c['id']}")
+    day = client.get("/api/calendar/events?date=2024-01-05").get_json()["items"]
+    assert [x["title"] for x in day["2024-01-05"]] == ["FOMC", "메모"]
+    assert client.get("/api/calendar/events?date=2024-03-01").get_json()["items"] == {"2024-03-01": []}
+    assert set(client.get("/api/calendar/events").get_json()["items"]) == {"2024-01-05", "2024-02-01"}
+
+def test_calendar_migrates_legacy_json(tmp_path, client, db):
+    import json
+
+    legacy = tmp_path / "calendar_events.json"
+    legacy.write_text(json.dumps({
+        "2024-01-05": [{"id": "1", "title": "FOMC", "time": "04:00", "note": ""}],
+        "2024-01-06": [{"id": "2", "title": "휴일", "time": "", "note": "x"}],
+    }, ensure_ascii=False), encoding="utf-8")
+
+    assert app_module.migrate_calendar_json(str(legacy)) == 2
+    assert not legacy.exists()
+    items = client.get("/api/calendar/events?month=2024-01").get_json()["items"]
+    assert items["2024-01-06"] == [{"id": "2", "title": "휴일", "time": "", "note": "x"}]
+
+class _FakeLLM:
+    """responses.create(stream=True) 흉내. 토큰 조각 이벤트를 순서대로 흘려준다."""
+
+    def __init__(self, tokens, gate=None):
+        from types import SimpleNamespace
+
+        self.calls = 0
+        outer = self
+
+        def create(**kwargs):
+            outer.calls += 1
+            assert kwargs["stream"] is True
+            for tok in tokens:
+                if gate is not None:
+                    gate.wait(2)
+                yield SimpleNamespace(type="response.output_text.delta", delta=tok)
+            yield SimpleNamespace(type="response.completed")
+
+        self.responses = SimpleNamespace(create=create)
+
+def test_news_summary_runs_in_background_and_dedupes(client, tmp_path, monkeypatch):
+    headlines = [{"title": f"기사{i}", "link": f"https://n.news.naver.com/{i}", "press": "연합", "ts": ""} for i in range(3)]
+    gate = threading.Event()
+    fake = _FakeLLM(["금리 ", "인하 ", "가능성"], gate=gate)
+
+    monkeypatch.setattr(app_module, "NEWS_SUMMARY_STORE", str(tmp_path / "summary.json"))
+    monkeypatch.setattr(app_module, "news_summary_jobs", app_module.NewsSummaryJobs())
+    monkeypatch.setattr(app_module, "_news_for_summary", lambda limit=25: headlines)
+    monkeypatch.setattr(app_module, "llm_client", fake)
+
+    r = client.get("/api/news/summary")
+    assert r.status_code == 202
+    job = r.get_json()
+
+    gate.set()
+    stream = client.get(job["streamUrl"], buffered=False)
+    body = b"".join(stream.response).decode()
+    assert "event: delta" in body
+    assert "event: done" in body
+
+    status = client.get(job["statusUrl"]).get_json()
+    assert status["status"] == "done"
+    assert status["result"]["summary"] == "금리 인하 가능성"
+
+    again = client.get("/api/news/summary")
+    assert again.status_code == 200
+    assert again.get_json()["cached"] is True
+    assert fake.calls == 1
+    assert client.get("/api/news/summary/latest").get_json()["headlineHash"] == status["headlineHash"]
+
+def _news_html(articles):
+    cards = "".join(
+        f'<li><div class="sa_text"><a class="sa_text_title" href="{link}"><strong>{title}</strong></a>'
+        f'<div class="sa_text_info"><div class="sa_text_press">연합뉴스</div>'
+        f'<div class="sa_text_datetime"><b>1시간전</b></div></div></div></li>'
+        for title, link in articles
+    )
+    return f"<html><body><div class='menu'>메뉴</div><ul>{cards}</ul></body></html>"
+
+def test_parse_naver_econ_news_cards():
+    items = app_module.parse_naver_econ_news(_news_html([("금리 동결", "https://n.news.naver.com/mnews/article/001/0000000001?sid=101")]))
+    assert items == [{
+        "title": "금리 동결",
+        "link": "https://n.news.naver.com/mnews/article/001/0000000001?sid=101",
+        "press": "연합뉴스",
+        "ts": "1시간전",
+    }]
+
+def test_news_store_dedupes_and_uses_conditional_requests(client, db, monkeypatch):
+    pages = [
+        (200, {"ETag": '"v1"'}, [("A", "https://n.news.naver.com/mnews/article/001/0000000001?sid=101"),
+                                 ("B", "https://n.news.naver.com/mnews/article/001/0000000002?sid=101")]),
+        (304, {}, []),
+        (200, {"ETag": '"v2"'}, [("C", "https://n.news.naver.com/mnews/article/001/0000000003?sid=101"),
+                                 ("A", "https://n.news.naver.com/article/001/0000000001")]),
+    ]
+    sent_headers = []
+
+    class FakeResponse:
+        def __init__(self, status, headers, articles):
+            self.status_code = status
+            self.headers = headers
+            self.text = _news_html(articles)
+
+        def raise_for_status(self):
+            pass
+
+    def fake_get(url, headers=None, **kw):
+        sent_headers.append(dict(headers or {}))
+        return FakeResponse(*pages.pop(0))
+
+    monkeypatch.setattr(app_module, "http_get", fake_get)
+
+    first = client.get("/api/news").get_json()
+    assert [n["title"] for n in first["items"]] == ["A", "B"]
+
+    assert app_module.ingest_naver_econ_news() == 0
+    assert sent_headers[1]["If-None-Match"] == '"v1"'
+
+    assert app_module.ingest_naver_econ_news() == 1
+    delta = client.get(f"/api/news?cursor={first['cursor']}").get_json()
+    assert [n["title"] for n in delta["items"]] == ["C"]
+    assert delta["cursor"] > first["cursor"]
+
+@pytest.mark.parametrize("fixture, expected", [
+    ("naver_index_KOSPI_up.html", {"price": 2561.69, "change": 14.26, "changeRate": 0.56}),
+    ("naver_index_KOSDAQ_dn.html", {"price": 731.12, "change": -11.28, "changeRate": -1.52}),
+    ("naver_index_KOSPI_flat.html", {"price": 2480.0, "change": 0.0, "changeRate": 0.0}),
+])
+def test_parse_naver_index_reads_quote_block_only(fixture, expected):
+    # 합성 fixture: 시세 블록 밖(거래상위 표)에 no_down 을 넣어 둠 -> 시세 블록만 보고 부호를 정하는지 확인
+    path = os.path.join(os.path.dirname(__file__), "bench", "fixtures", fixture)
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+    assert "no_down" in html
+    assert app_module.parse_naver_index(html) == expected
+
+def test_indicators_update_incrementally_on_new_bars(client, db, monkeypatch):
+    monkeypatch.setattr(app_module, "indicator_cache", app_module.IndicatorCache())
+    _push_minutes(client, monkeypatch, "005930", datetime(2024, 1, 2, 9, 0), 30)  # close = 0..29
+
+    url = "/api/stocks/indicators?code=005930&tf=1m&count=5&ind=sma:3,ema:3,rsi:14,macd:3:6:2,bb:3:2,vwap"
+    first = client.get(url).get_json()["indicators"]
+    assert [p["value"] for p in first["sma:3"]] == [24, 25, 26, 27, 28]
+    assert first["rsi:14"][-1]["value"] == 100
+    assert first["bb:3:2"][-1]["middle"] == 28
+
+    _push_minutes(client, monkeypatch, "005930", datetime(2024, 1, 2, 9, 30), 1)  # 새 봉 close = 0
+    second = client.get(url).get_json()["indicators"]
+    assert [p["value"] for p in second["sma:3"]] == [25, 26, 27, 28, 19]
+    stats = app_module.indicator_cache.stats()
+    assert stats["reseeds"] == 6 and stats["steps"] == 6  # 두 번째 조회는 지표당 봉 1개만 반영
+
+    # 증분 결과 == 처음부터 다시 계산한 결과
+    monkeypatch.setattr(app_module, "indicator_cache", app_module.IndicatorCache())
+    fresh = client.get(url).get_json()["indicators"]
+    for spec, points in fresh.items():
+        assert [p["time"] for p in points] == [p["time"] for p in second[spec]]
+        for got, want in zip(second[spec], points):
+            assert got == pytest.approx(want)
+
+def test_indicators_reject_bad_specs(client, db):
+    assert client.get("/api/stocks/indicators?code=005930&tf=1m&ind=foo:3").status_code == 400
+    assert client.get("/api/stocks/indicators?code=005930&tf=1m&ind=macd:26:12").status_code == 400
+    assert client.get("/api/stocks/indicators?code=005930&tf=1d&ind=vwap").status_code == 400
+
+def test_batch_candles_sync_only_stale_codes(client, db, monkeypatch):
+    calls = []
+
+    def fake_columns(code, tf, start, end=None):
+        calls.append(code)
+        if code == "999999":
+            raise RuntimeError("upstream down")
+        return _columns([20240102, 20240103])
+
+    monkeypatch.setattr(app_module, "fetch_naver_stock_columns", fake_columns)
+
+    url = "/api/stocks/candles/batch?codes=005930,000660,999999,005930&tf=1d&count=30"
+    first = client.get(url).get_json()
+    assert sorted(calls) == ["000660", "005930", "999999"]
+    assert first["candles"]["005930"] == {
+        "time": ["2024-01-02", "2024-01-03"],
+        "open": [100.0, 100.0],
+        "high": [101.0, 101.0],
+        "low": [99.0, 99.0],
+        "close": [100.0, 101.0],
+        "volume": [1000.0, 1000.0],
+    }
+    assert first["errors"] == {"999999": "upstream down"}
+
+    calls.clear()
+    second = client.get(url).get_json()
+    assert calls == ["999999"]  # 나머지는 CANDLE_SYNC_INTERVAL 안이라 저장본에서
+    assert second["candles"]["000660"] == first["candles"]["000660"]
+    assert client.get("/api/stocks/candles/batch?codes=12345&tf=1d").status_code == 400
+
+def test_large_batch_does_not_starve_index_fan_out(client, db, monkeypatch):
+    release = threading.Event()
+
+    def blocked_columns(code, tf, start, end=None):
+        release.wait(5)
+        return _columns([20240102])
+
+    monkeypatch.setattr(app_module, "fetch_naver_stock_columns", blocked_columns)
+    monkeypatch.setattr(app_module, "fetch_naver_index", lambda code: {"price": 1.0, "change": 0.0, "changeRate": 0.0})
+    codes = ",".join(f"{100000 + i}" for i in range(app_module.FANOUT_WORKERS + app_module.BATCH_SYNC_WORKERS))
+    batch = threading.Thread(target=lambda: client.get(f"/api/stocks/candles/batch?codes={codes}&tf=1d"))
+    batch.start()
+    try:
+        time.sleep(0.1)  # 배치가 자기 풀의 worker 를 모두 잡을 때까지
+        t0 = time.perf_counter()
+        assert client.get("/api/index/current").status_code == 200
+        assert time.perf_counter() - t0 < 1
+    finally:
+        release.set()
+        batch.join()
+
+def test_candle_formats_are_negotiated_via_accept(client, db, monkeypatch):
+    _push_minutes(client, monkeypatch, "005930", datetime(2024, 1, 2, 9, 0), 400)
+    url = "/api/stocks/candles?code=005930&tf=1m&count=300"
+
+    plain = client.get(url)
+    assert plain.mimetype == "application/json" and "Accept" in plain.headers["Vary"]
+    bars = plain.get_json()["candles"]
+
+    cols = client.get(url, headers={"Accept": app_module.CANDLES_COLUMNS_MIMETYPE}).get_json(force=True)
+    assert cols["before"] == plain.get_json()["before"]
+    assert cols["candles"]["time"] == [b["time"] for b in bars]
+    assert cols["candles"]["close"] == [b["close"] for b in bars]
+
+    binary = client.get(url, headers={"Accept": app_module.CANDLES_BINARY_MIMETYPE, "Accept-Encoding": "gzip"})
+    assert binary.headers["Content-Encoding"] == "gzip"
+    decoded = app_module.unpack_candles(gzip.decompress(binary.data))
+    assert decoded["time"].tolist() == [b["time"] for b in bars]
+    assert decoded["volume"].tolist() == [b["volume"] for b in bars]
+    assert json.loads(binary.headers["X-Candles-Meta"])["tf"] == "1m"
+    assert len(binary.data) < len(plain.data) / 4
+
+def test_collector_prewarms_subscribed_codes_so_reads_skip_upstream(client, db, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from urllib.parse import parse_qs, urlsplit
+
+    def sisejson(path):
+        code = parse_qs(urlsplit(path).query)["symbol"][0]
+        rows = [f'["2024010{d}", 100, 110, 90, {100 + d}, 1000]' for d in (2, 3, 4)]
+        return (f"[['날짜', '시가', '고가', '저가', '종가', '거래량'],\n" + ",\n".join(rows) + "]").encode()
+
+    stub = _StubUpstream(body=sisejson)
+    try:
+        monkeypatch.setattr(app_module, "NAVER_SISEJSON_URL", stub.url + "siseJson.naver")
+        monkeypatch.setattr(app_module, "CANDLE_SYNC_INTERVAL", 0)  # 일반 종목은 매 읽기마다 동기화
+        for code in ("005930", "000660"):
+            assert client.post("/api/subscribe", json={"code": code}).status_code == 200
+        monkeypatch.setattr(app_module, "access_log", app_module.AccessLog())
+        app_module.access_log.record("000660")
+        app_module.access_log.flush()
+
+        assert collector.due_codes("1d") == ["000660", "005930"]  # 최근 조회된 종목 먼저
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            assert collector.collect_once(pool) == {"synced": 2, "failed": {}}
+        assert stub.requests == 2 and collector.due_codes("1d") == []
+
+        r = client.get("/api/stocks/candles?code=005930&tf=1d&count=30").get_json()
+        assert [c["close"] for c in r["candles"]] == [102, 103, 104]
+        assert client.get("/api/stocks/candles/batch?codes=005930,000660&tf=1d").status_code == 200
+        assert stub.requests == 2  # 구독 종목 읽기는 업스트림 없음
+
+        client.get("/api/stocks/candles?code=035720&tf=1d&count=30")
+        assert stub.requests == 3 and "symbol=035720" in stub.paths[-1]
+    finally:
+        stub.close()
+
+def test_host_rate_limiter_spaces_requests_per_host():
+    limiter = app_module.HostRateLimiter(rate=50)
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("a") > 0.01
+    assert limiter.acquire("b") == 0
+
+def test_asgi_routes_match_flask_contracts_and_share_upstream_calls(client, db, monkeypatch):
+    import asyncio
+
+    import httpx
+
+    import asgi
+
+    fixtures = os.path.join(os.path.dirname(__file__), "bench", "fixtures")
+    with open(os.path.join(fixtures, "naver_index_KOSPI_up.html"), "rb") as f:
+        index_html = f.read()
+    with open(os.path.join(fixtures, "sisejson_005930_day.txt"), "rb") as f:
+        sisejson = f.read()
+
+    def body(path):
+        time.sleep(0.05)
+        return index_html if path.startswith("/index") else sisejson
+
+    stub = _StubUpstream(body=body)
+    monkeypatch.setattr(app_module, "NAVER_INDEX_URLS", {c: f"{stub.url}index?code={c}" for c in app_module.INDEX_SYMBOLS})
+    monkeypatch.setattr(app_module, "NAVER_SISEJSON_URL", stub.url + "siseJson.naver")
+    monkeypatch.setattr(app_module, "access_log", app_module.AccessLog())
+    monkeypatch.setattr(asgi, "upstream_cache", asgi.AsyncUpstreamCache(app_module.UPSTREAM_CACHE_TTLS))
+
+    async def run():
+        monkeypatch.setattr(asgi, "http_client", asgi.make_async_client())
+        transport = httpx.ASGITransport(app=asgi.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://asgi") as ac:
+                url = "/api/stocks/candles?code=005930&tf=1d&count=30"
+                same = await asyncio.gather(*(ac.get(url) for _ in range(10)))
+                synced = stub.requests
+                paths = [
+                    "/api/index/current",
+                    "/api/index/minute",
+                    url,
+                    url + "&format=columns",
+                    url + "&since=2025-10-02",
+                    url + "&since=bad",
+                    "/api/stocks/candles?code=005930&tf=1m&count=10",
+                    "/api/stocks/candles?code=abc",
+                ]
+                return same, synced, [await ac.get(p) for p in paths], paths
+        finally:
+            await asgi.http_client.close()
+
+    try:
+        same, synced, responses, paths = asyncio.run(run())
+        assert synced == 1  # 동시 요청 10개 → 업스트림 동기화 1회
+        assert len({r.content for r in same}) == 1
+
+        for path, r in zip(paths, responses):
+            expected = client.get(path)
+            assert r.status_code == expected.status_code, path
+            assert r.headers["content-type"] == expected.headers["Content-Type"], path
+            assert r.content == expected.data, path
+    finally:
+        stub.close()
+
+def test_asgi_streams_do_not_hold_wsgi_threads(client, db, monkeypatch):
+    import asyncio
+
+    import httpx
+
+    import asgi
+
+    monkeypatch.setattr(app_module, "STREAM_HEARTBEAT", 0.05)
+    monkeypatch.setattr(app_module, "STREAM_MAX_SECONDS", 1.0)
+    start = datetime(2024, 1, 2, 9, 0)
+    _push_minutes(client, monkeypatch, "005930", start, 1)
+    bar = {"t": (start + timedelta(minutes=1)).isoformat(), "o": 2, "h": 9, "l": 2, "c": 8, "v": 5}
+
+    job = app_module.NewsSummaryJob("j1", [], "h")
+    jobs = app_module.NewsSummaryJobs()
+    jobs._jobs[job.id] = job
+    monkeypatch.setattr(app_module, "news_summary_jobs", jobs)
+
+    def produce():
+        time.sleep(0.2)
+        client.post("/api/internal/push/candles", headers={"X-PUSH-TOKEN": "t"}, json={"code": "005930", "candles": [bar]})
+        job.push("요약 ")
+        job.push("중")
+        job.finish({"summary": "요약 중"})
+
+    async def run():
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://asgi", timeout=5) as ac:
+            # WSGI 위임 스레드 수보다 많은 스트림을 열어 둔 채로 Flask 경로가 응답하는지
+            streams = [asyncio.ensure_future(ac.get("/api/stocks/stream?code=005930"))
+                       for _ in range(asgi.WSGI_THREADS + 4)]
+            summary = asyncio.ensure_future(ac.get("/api/news/summary/jobs/j1/stream"))
+            await asyncio.sleep(0.1)
+            t0 = time.perf_counter()
+            cal = await ac.get("/api/calendar/events?month=2024-01")
+            cal_elapsed = time.perf_counter() - t0
+            await asyncio.to_thread(produce)
+            return cal, cal_elapsed, await asyncio.gather(*streams), await summary, \
+                await ac.get("/api/stocks/stream?code=abc")
+
+    cal, cal_elapsed, streams, summary, bad = asyncio.run(run())
+    assert cal.status_code == 200 and cal_elapsed < 0.5
+    for r in streams:
+        assert r.headers["content-type"].startswith("text/event-stream")
+        assert [(d["time"], d["close"]) for _, d in _sse_events([r.text])] == [(app_module.iso_to_epoch_seconds(bar["t"]), 8)]
+    assert "event: delta" in summary.text and 'event: done\ndata: {"summary": "요약 중"}' in summary.text
+    assert bad.status_code == 400 and bad.json() == {"error": "code must be 6 digits"}
+
+def test_internal_metrics_prometheus_text(client, db, monkeypatch):
+    monkeypatch.setattr(app_module, "PUSH_TOKEN", "t")
+    assert client.get("/api/internal/metrics").status_code == 403
+
+    stub = _StubUpstream(body=lambda path: "[['날짜', '종가'],\n[\"20240102\", 2600.5]]".encode())
+    try:
+        monkeypatch.setattr(app_module, "NAVER_SISEJSON_URL", stub.url + "siseJson.naver")
+        assert app_module.fetch_naver_daily_points("KOSPI", days=5) == [{"t": "2024-01-02", "v": 2600.5}]
+    finally:
+        stub.close()
+    client.get("/api/calendar/events?month=2024-01")
+    app_module.get_db().execute("SELECT code FROM candles LIMIT 3").fetchall()
+
+    r = client.get("/api/internal/metrics", headers={"X-PUSH-TOKEN": "t"})
+    assert r.status_code == 200
+    assert r.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    text = r.get_data(as_text=True)
+    host = stub.url.split("/")[2]
+    assert f'upstream_requests_total{{host="{host}",status="200"}}' in text
+    assert f'upstream_response_bytes_total{{host="{host}"}}' in text
+    assert 'parse_duration_seconds_count{parser="sisejson"}' in text
+    assert 'http_requests_total{route="/api/calendar/events",method="GET",status="200"}' in text
+    assert 'http_request_duration_seconds_bucket{route="/api/calendar/events",method="GET",le="+Inf"}' in text
+    assert 'sqlite_query_duration_seconds_count{op="SELECT",table="candles"}' in text
+    assert 'upstream_cache_events_total{source="news",event="hit"}' in text
+
+def test_metrics_are_summed_across_processes(client, db, monkeypatch, tmp_path):
+    metrics_dir = tmp_path / "metrics"
+    metrics_dir.mkdir()
+    monkeypatch.setattr(app_module, "PUSH_TOKEN", "t")
+    monkeypatch.setattr(app_module, "METRICS_DIR", str(metrics_dir))
+    route = ("/api/calendar/events", "GET", "200")
+    client.get("/api/calendar/events?month=2024-01")
+
+    # 다른 워커가 남긴 snapshot (같은 이름의 series, 값만 다름)
+    other = app_module.MetricsRegistry()
+    other.counter("http_requests_total", "x", ("route", "method", "status")).inc(route, 5)
+    other.histogram("http_request_duration_seconds", "x", ("route", "method")).observe(route[:2], 0.003)
+    other.write_snapshot(str(metrics_dir))
+    os.replace(next(metrics_dir.glob("*.json")), metrics_dir / "otherhost-1.json")
+
+    text = client.get("/api/internal/metrics", headers={"X-PUSH-TOKEN": "t"}).get_data(as_text=True)
+    total = app_module.route_requests.value(route) + 5
+    assert f'http_requests_total{{route="/api/calendar/events",method="GET",status="200"}} {total}' in text
+    count = app_module.route_latency.count(route[:2]) + 1
+    assert f'http_request_duration_seconds_count{{route="/api/calendar/events",method="GET"}} {count}' in text
+    assert len(list(metrics_dir.glob("*.json"))) == 2  # scrape 받은 프로세스 자신의 snapshot 도 기록됨
+
+def test_histogram_buckets_are_cumulative():
+    h = app_module.Histogram("x_seconds", "x", ("k",), buckets=(0.1, 1.0))
+    for v in (0.05, 0.1, 0.5, 3.0):
+        h.observe(("a",), v)
+    assert h.render()[2:] == [
+        'x_seconds_bucket{k="a",le="0.1"} 2',
+        'x_seconds_bucket{k="a",le="1.0"} 3',
+        'x_seconds_bucket{k="a",le="+Inf"} 4',
+        'x_seconds_sum{k="a"} 3.65',
+        'x_seconds_count{k="a"} 4',
+    ]
+
+def test_bench_suite_fixtures_parse():
+    fixtures = os.path.join(os.path.dirname(__file__), "bench", "fixtures")
+
+    def read(name):
+        with open(os.path.join(fixtures, name), encoding="utf-8") as f:
+            return f.read()
+
+    assert len(app_module.parse_naver_econ_news(read("naver_news_section101.html"), limit=50)) == 40
+    assert app_module.stock_columns_from_sisejson(read("sisejson_005930_day.txt"))["t"]
+    master = json.loads(read("stocks_master.json"))
+    assert {"code": "005930", "name": "삼성전자"} in master